@@ -0,0 +1,84 @@
+"""Extract uploaded manuals in the background from the moment they are uploaded.
+
+submit() spools the upload (hashing it on the way) and starts extraction on a small process-wide thread
+pool; jobs are keyed by the file's SHA-256 and budgets, so the same manual uploaded twice, or in two
+sessions, is extracted once. The generate button then only waits for whatever is still running.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pdf_extraction
+import uploads
+
+WORKERS = int(os.environ.get("GAMECHANGER_BACKGROUND_EXTRACTIONS", "2"))
+MAX_JOBS = 32
+
+_executor = None
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="extract")
+    return _executor
+
+
+def _run(job, pdf_path, max_chars, max_images):
+    try:
+        return pdf_extraction.extract_pdf_file(pdf_path, max_chars=max_chars, max_images=max_images)
+    finally:
+        job["seconds"] = time.perf_counter() - job["started"]
+        try:
+            os.remove(pdf_path)
+        except OSError:
+            pass
+
+
+def _prune():
+    """Forget the oldest finished jobs past MAX_JOBS; their results stay in the disk cache."""
+    for key in list(_jobs):
+        if len(_jobs) <= MAX_JOBS:
+            break
+        if _jobs[key]["future"].done():
+            del _jobs[key]
+
+
+def submit(uploaded_file, directory, max_chars=None, max_images=None):
+    """Start extracting an upload (spooled into directory) and return its job.
+
+    A job is {"key", "name", "bytes", "started", "seconds", "future"}; seconds is set once it finishes.
+    """
+    digest = hashlib.sha256()
+    pdf_path = uploads.spool(uploaded_file, directory, digest=digest)
+    key = (digest.hexdigest(), max_chars, max_images)
+    with _lock:
+        job = _jobs.get(key)
+        # A failed job is retried rather than handed out again.
+        if job is not None and not (job["future"].done() and job["future"].exception() is not None):
+            _jobs.move_to_end(key)
+            os.remove(pdf_path)
+            return job
+        job = {"key": key, "name": uploaded_file.name, "bytes": uploaded_file.size, "started": time.perf_counter(),
+               "seconds": None}
+        job["future"] = _get_executor().submit(_run, job, pdf_path, max_chars, max_images)
+        _jobs[key] = job
+        _prune()
+    return job
+
+
+def status(job):
+    """"running", "ready" or "failed"."""
+    if not job["future"].done():
+        return "running"
+    return "failed" if job["future"].exception() is not None else "ready"
+
+
+def result(job, timeout=None):
+    """(text, images) for a job, waiting for it if needed; raises the extraction error if it failed."""
+    return job["future"].result(timeout)
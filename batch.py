@@ -0,0 +1,183 @@
+"""Headless batch generation over aircraft manuals x simulators x controllers.
+
+Examples:
+    python batch.py --manuals manuals/ --output profiles/ --concurrency 4 --rpm 15
+    python batch.py --manuals manuals/ --output profiles/ --simulators "DCS World" --backend fake
+
+Finished profiles are written as <output>/<aircraft>/<simulator>/<controller>.md; re-running the same command
+skips profiles that already exist, so an interrupted batch resumes where it stopped.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+import generator
+import instrumentation
+import pdf_extraction
+import rate_limiter
+from configs import SIMULATOR_CONFIGS, HOTAS_COMPONENTS
+
+
+def slugify(name):
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")
+
+
+def profile_path(output_dir, aircraft_name, simulator, hotas_name):
+    return os.path.join(output_dir, slugify(aircraft_name), slugify(simulator), f"{slugify(hotas_name)}.md")
+
+
+def build_jobs(manual_paths, simulators, controllers, output_dir):
+    jobs = []
+    for manual_path in manual_paths:
+        aircraft_name = os.path.splitext(os.path.basename(manual_path))[0]
+        for simulator in simulators:
+            for hotas_name in controllers:
+                jobs.append({
+                    "manual_path": manual_path,
+                    "aircraft_name": aircraft_name,
+                    "simulator": simulator,
+                    "hotas_name": hotas_name,
+                    "output_path": profile_path(output_dir, aircraft_name, simulator, hotas_name),
+                })
+    return jobs
+
+
+def extract_manual(manual_path):
+    return pdf_extraction.extract_pdf_file(manual_path, max_images=generator.AIRCRAFT_IMAGE_BUDGET)
+
+
+def _warning_notify(label):
+    def notify(level, message):
+        if level in ("warning", "error"):
+            print(f"[{level}] {label}: {message}", file=sys.stderr)
+    return notify
+
+
+def generate_profile(client, job, aircraft_text, aircraft_images, use_response_cache=True, limiter=None,
+                     sectioned=False, inventory=None):
+    hotas_info = HOTAS_COMPONENTS[job["hotas_name"]]
+    notify = _warning_notify(f"{job['aircraft_name']} / {job['simulator']} / {job['hotas_name']}")
+    # Extraction and the command inventory are shared between the jobs of a manual, so a job's trace starts
+    # at prompt building.
+    trace = instrumentation.Trace(aircraft=job["aircraft_name"], simulator=job["simulator"],
+                                  hotas=job["hotas_name"], mode="sectioned" if sectioned else "single",
+                                  two_stage=inventory is not None)
+    generate = generator.generate_sectioned_config if sectioned else generator.generate_adaptive_config
+    text = generate(
+        client, aircraft_text, aircraft_images, {}, None, [], job["hotas_name"], hotas_info["devices"],
+        job["aircraft_name"], job["simulator"], hotas_info.get("type", "multi_device"),
+        hotas_info.get("software_capable", False), hotas_info.get("software_name", ""),
+        use_response_cache=use_response_cache, notify=notify, limiter=limiter, trace=trace, inventory=inventory)
+    if text:
+        text = generator.repair_response(client, text, job["simulator"], job["hotas_name"], job["aircraft_name"],
+                                         use_response_cache, notify, limiter, trace=trace)
+    trace.emit()
+    return text
+
+
+def write_profile(output_path, text):
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # Atomic rename: a profile file only exists once it is complete, which is what resume relies on.
+    os.replace(tmp_path, output_path)
+
+
+async def run_batch(client, jobs, concurrency=4, limiter=None, use_response_cache=True, sectioned=False,
+                    two_stage=False):
+    """Run every pending job; returns {"done": [...], "skipped": [...], "failed": [...]}.
+
+    Generations run in worker threads and share `limiter`, the same per-key bucket the UI uses. With
+    `two_stage`, each manual's command inventory is extracted once and every job for it maps that instead.
+    """
+    results = {"done": [], "skipped": [], "failed": []}
+    pending = []
+    for job in jobs:
+        (results["skipped"] if os.path.exists(job["output_path"]) else pending).append(job)
+
+    extractions = {}
+    for manual_path in sorted({job["manual_path"] for job in pending}):
+        extractions[manual_path] = asyncio.ensure_future(asyncio.to_thread(extract_manual, manual_path))
+
+    inventories = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            try:
+                aircraft_text, aircraft_images = await extractions[job["manual_path"]]
+                inventory = None
+                if two_stage:
+                    if job["manual_path"] not in inventories:
+                        inventories[job["manual_path"]] = asyncio.ensure_future(asyncio.to_thread(
+                            generator.get_command_inventory, client, aircraft_text, aircraft_images,
+                            job["aircraft_name"], use_response_cache, _warning_notify(job["aircraft_name"]),
+                            limiter))
+                    inventory = await inventories[job["manual_path"]]
+                text = await asyncio.to_thread(generate_profile, client, job, aircraft_text, aircraft_images,
+                                               use_response_cache, limiter, sectioned, inventory)
+            except Exception as e:
+                print(f"[error] {job['output_path']}: {e}", file=sys.stderr)
+                text = None
+            if text:
+                write_profile(job["output_path"], text)
+                results["done"].append(job)
+                print(f"[done] {job['output_path']}")
+            else:
+                results["failed"].append(job)
+
+    await asyncio.gather(*(run(job) for job in pending))
+    return results
+
+
+def make_client(backend, api_key, fake_token_rate):
+    if backend == "fake":
+        from fake_client import FakeClient
+        return FakeClient(tokens_per_second=fake_token_rate)
+    import client_pool
+    if not api_key:
+        raise SystemExit("An API key is required for the gemini backend (--api-key or GOOGLE_API_KEY)")
+    return client_pool.get_client(api_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-generate HOTAS profiles without the Streamlit UI.")
+    parser.add_argument("--manuals", required=True, help="Folder of aircraft manual PDFs")
+    parser.add_argument("--output", required=True, help="Folder to write generated profiles to")
+    parser.add_argument("--simulators", nargs="*", default=list(SIMULATOR_CONFIGS), choices=list(SIMULATOR_CONFIGS))
+    parser.add_argument("--controllers", nargs="*", default=list(HOTAS_COMPONENTS), choices=list(HOTAS_COMPONENTS))
+    parser.add_argument("--concurrency", type=int, default=4, help="Generations in flight at once")
+    parser.add_argument("--rpm", type=float, default=rate_limiter.REQUESTS_PER_MINUTE,
+                        help="Maximum requests per minute for the API key (0 for no limit)")
+    parser.add_argument("--backend", choices=["gemini", "fake"], default="gemini")
+    parser.add_argument("--api-key", default=os.environ.get("GOOGLE_API_KEY"))
+    parser.add_argument("--fake-token-rate", type=float, default=0,
+                        help="Tokens per second streamed by the fake backend (0 for no delay)")
+    parser.add_argument("--no-response-cache", action="store_true", help="Bypass the response cache")
+    parser.add_argument("--sectioned", action="store_true",
+                        help="Generate the installation guide and config files as parallel requests after the table")
+    parser.add_argument("--two-stage", action="store_true",
+                        help="Extract each manual's command inventory once and map it for every controller and simulator")
+    args = parser.parse_args(argv)
+
+    manual_paths = sorted(os.path.join(args.manuals, name) for name in os.listdir(args.manuals)
+                          if name.lower().endswith(".pdf"))
+    if not manual_paths:
+        raise SystemExit(f"No PDF manuals found in {args.manuals}")
+    jobs = build_jobs(manual_paths, args.simulators, args.controllers, args.output)
+    client = make_client(args.backend, args.api_key, args.fake_token_rate)
+    start = time.perf_counter()
+    limiter = rate_limiter.get_limiter(args.api_key if args.backend == "gemini" else "fake", args.rpm)
+    results = asyncio.run(run_batch(client, jobs, args.concurrency, limiter, not args.no_response_cache,
+                                    args.sectioned, args.two_stage))
+    print(f"{len(results['done'])} generated, {len(results['skipped'])} already present, "
+          f"{len(results['failed'])} failed in {time.perf_counter() - start:.1f}s")
+    return 1 if results["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
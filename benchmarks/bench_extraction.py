@@ -0,0 +1,43 @@
+"""Pages/sec of the serial extraction path against the process-pool path.
+
+Run from the repository root:
+    python -m benchmarks.bench_extraction --pages 200 --workers 4
+"""
+import argparse
+import time
+
+import pdf_extraction
+from benchmarks.synthetic_pdf import build_pdf
+
+
+def _time(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=pdf_extraction.EXTRACT_WORKERS)
+    parser.add_argument("--images-per-page", type=int, default=1)
+    args = parser.parse_args()
+
+    pdf_bytes = build_pdf(pages=args.pages, unique_images_per_page=args.images_per_page)
+    print(f"Synthetic manual: {args.pages} pages, {len(pdf_bytes) / 1e6:.1f} MB")
+
+    serial_time, serial_result = _time(pdf_extraction.extract_serial, pdf_bytes)
+    print(f"serial:              {args.pages / serial_time:8.1f} pages/s ({serial_time:.2f}s)")
+
+    # Warm the pool first so worker start-up is not counted against steady-state throughput.
+    pdf_extraction.extract_parallel(pdf_bytes, args.workers)
+    parallel_time, parallel_result = _time(pdf_extraction.extract_parallel, pdf_bytes, args.workers)
+    print(f"parallel ({args.workers} workers): {args.pages / parallel_time:8.1f} pages/s ({parallel_time:.2f}s)")
+    print(f"speedup: {serial_time / parallel_time:.2f}x")
+
+    if serial_result != parallel_result:
+        raise SystemExit("Parallel output differs from serial output")
+
+
+if __name__ == "__main__":
+    main()
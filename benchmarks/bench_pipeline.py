@@ -0,0 +1,232 @@
+"""End-to-end pipeline benchmark on synthetic manuals: extraction, manual lookup, prompt, generation, parsing.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --pages 50 200 --words 400 --images unique repeated
+    python -m benchmarks.bench_pipeline --output results.json --compare baseline.json
+
+Each scenario runs in a fresh process so its peak RSS is its own. Generation uses the fake client streaming a
+synthetic (or --response-file) response at --token-rate; caches are redirected to a temporary directory, so
+every scenario measures cold paths first and the warm extraction cache second.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic_pdf import build_pdf
+
+IMAGE_MODES = {
+    "none": {"unique_images_per_page": 0, "repeated_images_per_page": 0},
+    "unique": {"unique_images_per_page": 2, "repeated_images_per_page": 0},
+    "repeated": {"unique_images_per_page": 0, "repeated_images_per_page": 2},
+    "mixed": {"unique_images_per_page": 1, "repeated_images_per_page": 1},
+    "cluttered": {"unique_images_per_page": 1, "repeated_images_per_page": 1, "icons_per_page": 6,
+                  "blank_images_per_page": 1},
+    "photos": {"unique_images_per_page": 2, "repeated_images_per_page": 0, "image_format": "JPEG"},
+}
+
+# Metrics where a larger value is worse; used by --compare. Changes smaller than the floor (seconds, or MB
+# for peak_rss_mb) are timer noise and never count as regressions.
+REGRESSION_FLOOR = {"peak_rss_mb": 5.0}
+DEFAULT_REGRESSION_FLOOR = 0.005
+TIMING_METRICS = ["extract_seconds", "extract_warm_seconds", "manual_index_seconds", "simulator_manual_seconds",
+                  "prompt_build_seconds", "ttfc_seconds", "generation_seconds", "stream_parse_seconds",
+                  "parse_profile_seconds", "validate_seconds", "peak_rss_mb"]
+
+
+def _peak_rss_mb():
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def run_scenario(scenario, pdf_bytes, token_rate, first_chunk_delay, response_text, workers):
+    """Run one scenario in the current (fresh) process and return its metrics."""
+    import config_validators
+    import generator
+    import manual_index
+    import pdf_cache
+    import pdf_extraction
+    import response_cache
+    import response_parser
+    from configs import SIMULATOR_CONFIGS, HOTAS_COMPONENTS
+    from fake_client import FakeClient
+
+    work_dir = tempfile.mkdtemp(prefix="gamechanger-bench-")
+    pdf_cache.CACHE_DIR = os.path.join(work_dir, "pdf")
+    manual_index.INDEX_DIR = os.path.join(work_dir, "manual_index")
+    response_cache.ENABLED = False
+
+    image_occurrences = scenario["pages"] * sum(count for name, count in IMAGE_MODES[scenario["images"]].items()
+                                                if name.endswith("_per_page"))
+    metrics = {"pdf_mb": round(len(pdf_bytes) / 1e6, 2)}
+
+    extract_seconds, (aircraft_text, aircraft_images) = _timed(pdf_extraction.extract_pdf_bytes, pdf_bytes, workers)
+    extract_warm_seconds, _ = _timed(pdf_extraction.extract_pdf_bytes, pdf_bytes, workers)
+    metrics.update({
+        "extract_seconds": extract_seconds,
+        "extract_warm_seconds": extract_warm_seconds,
+        "pages_per_sec": scenario["pages"] / extract_seconds,
+        "images_per_sec": image_occurrences / extract_seconds,
+        "images_kept": len(aircraft_images),
+        "text_chars": len(aircraft_text),
+    })
+
+    # The synthetic manual stands in for the bundled simulator manual.
+    manual_path = os.path.join(work_dir, "manual.pdf")
+    with open(manual_path, "wb") as f:
+        f.write(pdf_bytes)
+    simulator = "DCS World"
+    SIMULATOR_CONFIGS[simulator]["user_manual"] = manual_path
+    metrics["manual_index_seconds"], _ = _timed(generator.load_simulator_manual, simulator)
+    metrics["simulator_manual_seconds"], _ = _timed(generator.load_simulator_manual, simulator)
+
+    hotas_name = "Thrustmaster HOTAS Warthog"
+    hotas_info = HOTAS_COMPONENTS[hotas_name]
+    aircraft_images = aircraft_images[:generator.AIRCRAFT_IMAGE_BUDGET]
+    args = (aircraft_text, aircraft_images, {}, None, [], hotas_name, hotas_info["devices"], "Synthetic Aircraft",
+            simulator, hotas_info["type"], hotas_info["software_capable"], hotas_info["software_name"])
+    quiet = lambda level, message: None
+    metrics["prompt_build_seconds"], request = _timed(generator.build_request, *args, notify=quiet)
+    metrics["prompt_chars"] = len(request["prompt"])
+
+    client = FakeClient(response_text=response_text, tokens_per_second=token_rate,
+                        first_chunk_delay=first_chunk_delay)
+    chunks = []
+    first_chunk = []
+    start = time.perf_counter()
+
+    def on_chunk(chunk_text):
+        if not first_chunk:
+            first_chunk.append(time.perf_counter() - start)
+        chunks.append(chunk_text)
+
+    full_response = generator.generate_adaptive_config(client, *args, use_response_cache=False, notify=quiet,
+                                                       on_chunk=on_chunk)
+    metrics["generation_seconds"] = time.perf_counter() - start
+    metrics["ttfc_seconds"] = first_chunk[0] if first_chunk else None
+    metrics["response_chars"] = len(full_response or "")
+
+    def stream_parse():
+        parser = response_parser.StreamParser()
+        for chunk_text in chunks:
+            parser.feed(chunk_text)
+        parser.close()
+
+    sim_info = SIMULATOR_CONFIGS[simulator]
+    metrics["stream_parse_seconds"], _ = _timed(stream_parse)
+    metrics["parse_profile_seconds"], profile = _timed(response_parser.parse_profile, full_response or "",
+                                                       simulator, hotas_name, sim_info, "Synthetic Aircraft")
+    metrics["validate_seconds"], _ = _timed(config_validators.validate_profile, profile, hotas_name)
+    metrics["peak_rss_mb"] = _peak_rss_mb()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return metrics
+
+
+def scenario_name(scenario):
+    return f"{scenario['pages']}p-{scenario['words']}w-{scenario['images']}"
+
+
+def compare(results, baseline, threshold):
+    """Print per-metric changes against a baseline run; returns the number of regressions over threshold."""
+    baseline_by_name = {scenario["name"]: scenario for scenario in baseline["scenarios"]}
+    regressions = 0
+    for scenario in results["scenarios"]:
+        previous = baseline_by_name.get(scenario["name"])
+        if previous is None:
+            print(f"{scenario['name']}: not in baseline")
+            continue
+        for metric in TIMING_METRICS:
+            old, new = previous["metrics"].get(metric), scenario["metrics"].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            flag = ""
+            if change > threshold and new - old > REGRESSION_FLOOR.get(metric, DEFAULT_REGRESSION_FLOOR):
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{scenario['name']:>24} {metric:<24} {old:10.4f} -> {new:10.4f} ({change:+.0%}){flag}")
+    return regressions
+
+
+def print_table(results):
+    columns = [("pages/s", "pages_per_sec", "{:9.1f}"), ("images/s", "images_per_sec", "{:9.1f}"),
+               ("rss MB", "peak_rss_mb", "{:8.1f}"), ("prompt s", "prompt_build_seconds", "{:9.4f}"),
+               ("ttfc s", "ttfc_seconds", "{:8.3f}"), ("gen s", "generation_seconds", "{:7.2f}"),
+               ("parse s", "parse_profile_seconds", "{:8.4f}")]
+    print(f"{'scenario':>24} " + " ".join(f"{label:>{len(fmt.format(0))}}" for label, _, fmt in columns))
+    for scenario in results["scenarios"]:
+        metrics = scenario["metrics"]
+        cells = [fmt.format(metrics[key]) if metrics.get(key) is not None else " " * len(fmt.format(0))
+                 for _, key, fmt in columns]
+        print(f"{scenario['name']:>24} " + " ".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--words", type=int, nargs="+", default=[400], help="Words of text per page")
+    parser.add_argument("--images", nargs="+", default=["unique", "repeated"], choices=list(IMAGE_MODES))
+    parser.add_argument("--workers", type=int, default=None, help="Extraction workers (default: app setting)")
+    parser.add_argument("--token-rate", type=float, default=200, help="Fake client tokens/sec (0 for no delay)")
+    parser.add_argument("--first-chunk-delay", type=float, default=0.5, help="Fake client latency before the first chunk")
+    parser.add_argument("--response-file", help="Recorded response to stream instead of the synthetic one")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    response_text = None
+    if args.response_file:
+        with open(args.response_file, "r", encoding="utf-8") as f:
+            response_text = f.read()
+
+    scenarios = [{"pages": pages, "words": words, "images": images}
+                 for pages in args.pages for words in args.words for images in args.images]
+    results = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                 "token_rate": args.token_rate, "first_chunk_delay": args.first_chunk_delay,
+                 "response_file": args.response_file},
+        "scenarios": [],
+    }
+    context = multiprocessing.get_context("spawn")
+    for scenario in scenarios:
+        # Built here so the generator's own memory is not counted in the scenario's peak RSS.
+        pdf_bytes = build_pdf(pages=scenario["pages"], words_per_page=scenario["words"],
+                              **IMAGE_MODES[scenario["images"]])
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            metrics = pool.submit(run_scenario, scenario, pdf_bytes, args.token_rate, args.first_chunk_delay, response_text,
+                                  args.workers).result()
+        results["scenarios"].append({"name": scenario_name(scenario), **scenario, "metrics": metrics})
+        print(f"finished {scenario_name(scenario)}", file=sys.stderr)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import io
+import random
+
+import fitz
+from PIL import Image
+
+WORDS = ["throttle", "trigger", "weapon", "release", "radar", "TDC", "countermeasures", "master", "arm",
+         "hat", "switch", "slew", "cursor", "sensor", "designate", "gear", "flaps", "speedbrake", "trim",
+         "autopilot", "HOTAS", "cockpit", "pilot", "display", "mode", "select", "target", "lock", "missile"]
+
+
+def _png(width, height, seed, image_format="PNG"):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    pixels = image.load()
+    # Noise stripes keep the images from compressing to nothing.
+    for y in range(0, height, 8):
+        for x in range(width):
+            pixels[x, y] = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+    buffered = io.BytesIO()
+    image.save(buffered, format=image_format)
+    return buffered.getvalue()
+
+
+def _flat_png(width, height, color):
+    buffered = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def build_pdf(pages=100, words_per_page=400, unique_images_per_page=1, repeated_images_per_page=1,
+              image_size=(640, 480), seed=0, icons_per_page=0, blank_images_per_page=0, image_format="PNG"):
+    """Build a synthetic manual in memory and return its bytes.
+
+    Icons are small unique glyph-sized images and blank images are large solid fills, the clutter real
+    manuals carry besides their diagrams; image_format ("PNG" or "JPEG") applies to the unique images.
+    """
+    rng = random.Random(seed)
+    repeated = _png(image_size[0], image_size[1], seed=-1)
+    pdf_document = fitz.open()
+    for page_num in range(pages):
+        page = pdf_document.new_page()
+        text = " ".join(rng.choice(WORDS) for _ in range(words_per_page))
+        page.insert_textbox(fitz.Rect(36, 36, 576, 420), text, fontsize=8)
+        for idx in range(repeated_images_per_page):
+            page.insert_image(fitz.Rect(36 + idx * 60, 430, 86 + idx * 60, 470), stream=repeated)
+        for idx in range(unique_images_per_page):
+            top = 480 + idx * 100
+            page.insert_image(fitz.Rect(36, top, 276, top + 90),
+                              stream=_png(image_size[0], image_size[1], seed=seed * 100000 + page_num * 10 + idx,
+                                          image_format=image_format))
+        for idx in range(icons_per_page):
+            page.insert_image(fitz.Rect(300 + idx * 20, 430, 316 + idx * 20, 446),
+                              stream=_png(16, 16, seed=-(page_num * 100 + idx + 2)))
+        for idx in range(blank_images_per_page):
+            page.insert_image(fitz.Rect(300, 480 + idx * 100, 540, 570 + idx * 100),
+                              stream=_flat_png(image_size[0], image_size[1], (255, 255, 255 - page_num % 7)))
+    pdf_bytes = pdf_document.tobytes()
+    pdf_document.close()
+    return pdf_bytes
@@ -0,0 +1,43 @@
+"""Process-wide Gemini clients, one per API key.
+
+A client owns its HTTP session, so reusing it across Streamlit reruns, sessions and batch workers keeps
+connections alive instead of paying for client and TLS setup on every widget interaction. Keys are hashed
+so they are never held as registry keys. Past MAX_CLIENTS the least recently used client is only dropped
+from the registry, never closed, since another session may still be streaming through it.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from google import genai
+
+MAX_CLIENTS = int(os.environ.get("GAMECHANGER_MAX_CLIENTS", "32"))
+
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def _key_id(api_key):
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def get_client(api_key):
+    """The shared client for an API key; raises whatever genai.Client raises for an unusable key."""
+    key_id = _key_id(api_key)
+    with _clients_lock:
+        client = _clients.get(key_id)
+        if client is not None:
+            _clients.move_to_end(key_id)
+            return client
+        client = genai.Client(api_key=api_key)
+        _clients[key_id] = client
+        while len(_clients) > MAX_CLIENTS:
+            _clients.popitem(last=False)
+        return client
+
+
+def discard(api_key):
+    """Drop the client for a key (e.g. after the key was rejected) so the next call builds a fresh one."""
+    with _clients_lock:
+        _clients.pop(_key_id(api_key), None)
@@ -0,0 +1,150 @@
+"""Per-aircraft command inventory: the first stage of two-stage generation.
+
+The inventory is a compact, controller- and simulator-independent list of the aircraft's commands, extracted
+once from its manual and cached on disk by the manual's content hash:
+    {"aircraft": "F-16C", "commands": [{"name", "category", "kind", "priority", "notes"}, ...]}
+The second stage maps it onto a controller and simulator, so further variants for the same aircraft send the
+inventory instead of the manual excerpt and images.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import retrieval
+
+INVENTORY_DIR = os.environ.get("GAMECHANGER_INVENTORY_DIR", os.path.join(".cache", "command_inventory"))
+INVENTORY_VERSION = 1
+MANUAL_CHARS = 24000
+MAX_COMMANDS = 120
+
+KINDS = ["button", "axis", "hat", "switch"]
+PRIORITIES = ["primary", "secondary", "tertiary"]
+
+INVENTORY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "aircraft": {"type": "STRING"},
+        "commands": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "name": {"type": "STRING"},
+                    "category": {"type": "STRING"},
+                    "kind": {"type": "STRING", "enum": KINDS},
+                    "priority": {"type": "STRING", "enum": PRIORITIES},
+                    "notes": {"type": "STRING"},
+                },
+                "required": ["name", "category", "kind", "priority"],
+            },
+        },
+    },
+    "required": ["aircraft", "commands"],
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def manual_key(aircraft_text, aircraft_images=()):
+    """Content hash of an extracted manual (text and image bytes) plus the inventory format version."""
+    digest = hashlib.sha256(f"inventory-v{INVENTORY_VERSION}\n".encode("utf-8"))
+    digest.update((aircraft_text or "").encode("utf-8"))
+    for image in aircraft_images or ():
+        digest.update(hashlib.sha256(image["data"]).digest())
+    return digest.hexdigest()
+
+
+def _path(key):
+    return os.path.join(INVENTORY_DIR, f"{key}.json")
+
+
+def load(key):
+    """The cached inventory for a manual key, or None."""
+    inventory = _loaded.get(key)
+    if inventory is not None:
+        return inventory
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            inventory = json.load(f)
+    except (OSError, ValueError):
+        return None
+    with _lock:
+        _loaded[key] = inventory
+    return inventory
+
+
+def store(key, inventory):
+    with _lock:
+        _loaded[key] = inventory
+    try:
+        os.makedirs(INVENTORY_DIR, exist_ok=True)
+        tmp_path = f"{_path(key)}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(inventory, f)
+        os.replace(tmp_path, _path(key))
+    except OSError as e:
+        print(f"Could not store command inventory {key[:12]}: {e}")
+
+
+def manual_excerpt(aircraft_text, aircraft_name, max_chars=MANUAL_CHARS):
+    """Manual pages ranked for combat controls only; the controller plays no part in the inventory."""
+    return retrieval.relevant_text(aircraft_text, " ".join([retrieval.COMBAT_QUERY, aircraft_name]), max_chars)
+
+
+def inventory_prompt(aircraft_name, excerpt):
+    return f"""## SECTION: inventory
+## TASK: Extract the command inventory of {aircraft_name} from its manual.
+
+List every command a pilot would want on a HOTAS or controller, in JSON:
+{{"aircraft": "<aircraft designation>", "commands": [{{"name": "...", "category": "...", "kind": "...", "priority": "...", "notes": "..."}}, ...]}}
+- name: the command as the manual names it (e.g. "Weapon Release", "TMS Up", "Radar Elevation")
+- category: flight, weapons, sensors, countermeasures, navigation, systems or views
+- kind: {", ".join(KINDS)} (axis for continuous inputs, hat for 4/8-way directional controls)
+- priority: primary (combat-critical), secondary (important) or tertiary (convenience)
+- notes: at most one short clause, e.g. "hold to designate", "long press for auto mode"
+- At most {MAX_COMMANDS} commands; no controller or simulator specifics
+
+## AIRCRAFT MANUAL:
+{excerpt}"""
+
+
+def parse_inventory(text):
+    """Read the model's JSON inventory; raises ValueError when it is unusable."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    data = json.loads(text)
+    if not isinstance(data, dict) or not isinstance(data.get("commands"), list):
+        raise ValueError("Inventory must be an object with a commands list")
+    commands = []
+    for command in data["commands"][:MAX_COMMANDS]:
+        if not isinstance(command, dict) or not str(command.get("name", "")).strip():
+            continue
+        commands.append({
+            "name": str(command["name"]).strip(),
+            "category": str(command.get("category", "")).strip().lower() or "systems",
+            "kind": command.get("kind") if command.get("kind") in KINDS else "button",
+            "priority": command.get("priority") if command.get("priority") in PRIORITIES else "secondary",
+            "notes": str(command.get("notes", "") or "").strip(),
+        })
+    if not commands:
+        raise ValueError("Inventory has no commands")
+    return {"aircraft": str(data.get("aircraft", "") or "").strip(), "commands": commands}
+
+
+def format_inventory(inventory):
+    """Compact text for the mapping prompt: one line per command, grouped by priority."""
+    lines = [f"Command inventory{' for ' + inventory['aircraft'] if inventory.get('aircraft') else ''} "
+             "(extracted from the aircraft manual; map these, most important first):"]
+    for priority in PRIORITIES:
+        commands = [command for command in inventory["commands"] if command["priority"] == priority]
+        if not commands:
+            continue
+        lines.append(f"\n{priority.upper()}:")
+        for command in commands:
+            notes = f" - {command['notes']}" if command["notes"] else ""
+            lines.append(f"- [{command['category']}/{command['kind']}] {command['name']}{notes}")
+    return "\n".join(lines)
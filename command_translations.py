@@ -0,0 +1,143 @@
+"""Command-name translation tables for the offline exporters.
+
+A mapping-table command is first matched to a canonical command through COMMAND_ALIASES (phrases as they
+appear in tables generated for any simulator, matched after lowercasing and dropping punctuation), then
+looked up in the target simulator's table. Commands with no entry are exported under their table name and
+reported as untranslated.
+"""
+
+COMMAND_ALIASES = {
+    "pitch": ["pitch", "elevator", "stick y"],
+    "roll": ["roll", "aileron", "bank", "stick x"],
+    "yaw": ["yaw", "rudder"],
+    "throttle": ["throttle", "thrust", "engine power"],
+    "gun": ["gun", "cannon", "machine gun", "mguns", "trigger"],
+    "weapon_release": ["weapon release", "pickle", "bomb release", "release weapon", "fire missile", "missile launch",
+                       "launch missile", "secondary fire", "drop bomb", "bombs"],
+    "weapon_cycle": ["weapon select", "cycle weapon", "next weapon", "weapon cycle", "select weapon"],
+    "target_lock": ["target lock", "lock target", "lock on", "designate", "target designate", "tdc depress"],
+    "target_next": ["next target", "cycle target", "target cycle", "select target"],
+    "radar": ["radar toggle", "radar on", "radar mode", "radar"],
+    "chaff": ["chaff"],
+    "flare": ["flare"],
+    "countermeasures": ["countermeasure", "cms", "dispense"],
+    "gear": ["landing gear", "gear"],
+    "flaps_down": ["flaps down", "flaps extend", "lower flaps", "flaps increase"],
+    "flaps_up": ["flaps up", "flaps retract", "raise flaps", "flaps decrease"],
+    "airbrake": ["air brake", "airbrake", "speed brake", "speedbrake", "spoilers"],
+    "wheel_brakes": ["wheel brake", "wheel brakes", "brakes"],
+    "trim_up": ["trim nose up", "trim up", "pitch trim up"],
+    "trim_down": ["trim nose down", "trim down", "pitch trim down"],
+    "trim_left": ["trim left", "roll trim left", "trim wing left"],
+    "trim_right": ["trim right", "roll trim right", "trim wing right"],
+    "autopilot": ["autopilot"],
+    "view_center": ["center view", "view center", "reset view", "recenter"],
+    "zoom_in": ["zoom in"],
+    "zoom_out": ["zoom out"],
+    "eject": ["eject"],
+}
+
+AXIS_COMMANDS = {"pitch", "roll", "yaw", "throttle"}
+
+# Simulator -> canonical command -> native command. DCS binds by per-aircraft command id, so only its
+# generic axis ids are listed; its buttons keep the command name from the table.
+TRANSLATIONS = {
+    "DCS World": {
+        "pitch": "a2001cdnil", "roll": "a2002cdnil", "yaw": "a2003cdnil", "throttle": "a2004cdnil",
+    },
+    "Microsoft Flight Simulator 2020": {
+        "pitch": "AXIS_ELEVATOR_SET", "roll": "AXIS_AILERONS_SET", "yaw": "AXIS_RUDDER_SET",
+        "throttle": "AXIS_THROTTLE_SET", "gear": "GEAR_TOGGLE", "flaps_down": "FLAPS_INCR",
+        "flaps_up": "FLAPS_DECR", "airbrake": "SPOILERS_TOGGLE", "wheel_brakes": "BRAKES",
+        "trim_up": "ELEV_TRIM_UP", "trim_down": "ELEV_TRIM_DN", "trim_left": "AILERON_TRIM_LEFT",
+        "trim_right": "AILERON_TRIM_RIGHT", "autopilot": "AP_MASTER", "view_center": "VIEW_RESET",
+        "zoom_in": "ZOOM_IN", "zoom_out": "ZOOM_OUT",
+    },
+    "IL-2 Sturmovik": {
+        "pitch": "rpc_pitch", "roll": "rpc_roll", "yaw": "rpc_yaw", "throttle": "rpc_throttle",
+        "gun": "rpc_fire_mguns", "weapon_release": "rpc_fire_bombs", "gear": "rpc_gear_toggle",
+        "flaps_down": "rpc_flaps_down", "flaps_up": "rpc_flaps_up", "airbrake": "rpc_airbrake",
+        "wheel_brakes": "rpc_wheel_brakes", "trim_up": "rpc_trim_pitch_up", "trim_down": "rpc_trim_pitch_down",
+        "trim_left": "rpc_trim_roll_left", "trim_right": "rpc_trim_roll_right", "view_center": "rpc_view_reset",
+        "zoom_in": "rpc_zoom_in", "zoom_out": "rpc_zoom_out", "eject": "rpc_bailout",
+    },
+    "Falcon BMS": {
+        "gun": "SimTriggerSecondDet", "weapon_release": "SimPickle", "weapon_cycle": "SimCycleWeapon",
+        "target_lock": "SimCursorEnable", "radar": "SimRadarToggle", "chaff": "SimDropChaff",
+        "flare": "SimDropFlare", "countermeasures": "SimDropProgrammed", "gear": "SimToggleGear",
+        "airbrake": "SimToggleSpeedBrake", "wheel_brakes": "SimWheelBrakes", "trim_up": "SimTrimNoseUp",
+        "trim_down": "SimTrimNoseDown", "trim_left": "SimTrimRollLeft", "trim_right": "SimTrimRollRight",
+        "autopilot": "SimAPToggle", "eject": "SimEject",
+    },
+    "War Thunder": {
+        "pitch": "elevator", "roll": "ailerons", "yaw": "rudder", "throttle": "throttle",
+        "gun": "ID_FIRE_MGUNS", "weapon_release": "ID_BOMBS", "weapon_cycle": "ID_SWITCH_SHOOTING_CYCLE_SECONDARY",
+        "target_lock": "ID_LOCK_TARGET", "radar": "ID_SENSOR_SWITCH", "flare": "ID_FLARES",
+        "countermeasures": "ID_FLARES", "gear": "ID_GEAR", "flaps_down": "ID_FLAPS_DOWN", "flaps_up": "ID_FLAPS_UP",
+        "airbrake": "ID_AIR_BRAKE", "wheel_brakes": "ID_WHEEL_BRAKE", "trim_up": "ID_TRIM_UP",
+        "trim_down": "ID_TRIM_DOWN", "view_center": "ID_CAMERA_RESET", "zoom_in": "ID_ZOOM_TOGGLE",
+    },
+    "X-Plane 11/12": {
+        "pitch": "1", "roll": "2", "yaw": "3", "throttle": "4",
+        "gun": "sim/weapons/fire_guns", "weapon_release": "sim/weapons/fire_any_armed",
+        "weapon_cycle": "sim/weapons/weapon_select_up", "target_next": "sim/weapons/weapon_target_up",
+        "chaff": "sim/weapons/deploy_chaff", "flare": "sim/weapons/deploy_flares",
+        "countermeasures": "sim/weapons/deploy_chaff_flare", "gear": "sim/flight_controls/landing_gear_toggle",
+        "flaps_down": "sim/flight_controls/flaps_down", "flaps_up": "sim/flight_controls/flaps_up",
+        "airbrake": "sim/flight_controls/speed_brakes_toggle",
+        "wheel_brakes": "sim/flight_controls/brakes_toggle_regular",
+        "trim_up": "sim/flight_controls/pitch_trim_up", "trim_down": "sim/flight_controls/pitch_trim_down",
+        "trim_left": "sim/flight_controls/aileron_trim_left", "trim_right": "sim/flight_controls/aileron_trim_right",
+        "autopilot": "sim/autopilot/servos_toggle", "view_center": "sim/view/default_view",
+        "zoom_in": "sim/general/zoom_in", "zoom_out": "sim/general/zoom_out", "eject": "sim/operation/eject",
+    },
+    "Elite Dangerous": {
+        "pitch": "PitchAxisRaw", "roll": "RollAxisRaw", "yaw": "YawAxisRaw", "throttle": "ThrottleAxis",
+        "gun": "PrimaryFire", "weapon_release": "SecondaryFire", "weapon_cycle": "CycleFireGroupNext",
+        "target_lock": "SelectTarget", "target_next": "CycleNextTarget", "chaff": "FireChaffLauncher",
+        "countermeasures": "FireChaffLauncher", "gear": "LandingGearToggle", "airbrake": "ToggleFlightAssist",
+        "view_center": "HeadLookReset", "zoom_in": "CamZoomIn", "zoom_out": "CamZoomOut",
+    },
+    "Star Citizen": {
+        "pitch": "v_pitch", "roll": "v_roll", "yaw": "v_yaw", "throttle": "v_strafe_longitudinal",
+        "gun": "v_attack1", "weapon_release": "v_weapon_launch_missile", "weapon_cycle": "v_weapon_cycle_missile_fwd",
+        "target_lock": "v_target_lock_selected", "target_next": "v_target_cycle_all_fwd",
+        "chaff": "v_weapon_countermeasure_chaff_launch", "flare": "v_weapon_countermeasure_flare_launch",
+        "countermeasures": "v_weapon_countermeasure_decoy_launch", "gear": "v_toggle_landing_system",
+        "airbrake": "v_space_brake", "autopilot": "v_toggle_cruise_control", "view_center": "v_view_look_behind",
+        "zoom_in": "v_view_zoom_in", "zoom_out": "v_view_zoom_out", "eject": "v_eject",
+    },
+}
+
+_ORDERED_ALIASES = sorted(((alias, canonical) for canonical, aliases in COMMAND_ALIASES.items() for alias in aliases),
+                          key=lambda item: -len(item[0]))
+
+
+def _normalize(text):
+    return " ".join("".join(char if char.isalnum() else " " for char in text.lower()).split())
+
+
+def canonical_command(command):
+    """The canonical command a table command stands for, or None; the longest matching alias wins."""
+    normalized = f" {_normalize(command)} "
+    for alias, canonical in _ORDERED_ALIASES:
+        if f" {alias} " in normalized:
+            return canonical
+    return None
+
+
+def translate(command, simulator, source_simulator=None, axis=False):
+    """(native command, translated) for a table command in the target simulator.
+
+    axis says whether the command is bound to an axis; a canonical command of the other kind (e.g. "Radar
+    Elevation" on a slider matching "radar") is not used. A command with no table entry is kept as-is; it
+    only counts as translated when the table was generated for the same simulator, where it is already the
+    native name.
+    """
+    canonical = canonical_command(command)
+    if (canonical in AXIS_COMMANDS) != axis:
+        canonical = None
+    native = TRANSLATIONS.get(simulator, {}).get(canonical)
+    if native:
+        return native, True
+    return command, source_simulator == simulator
@@ -0,0 +1,212 @@
+"""Fast local checks for generated configuration files and mapping tables.
+
+Each issue is {"level": "error" | "warning", "kind", "message", "line"}; kind is one of "syntax",
+"truncated", "duplicate" or "unmapped", and line is 1-based or None. Errors mean the file will not load
+and are worth a repair request; warnings are shown to the user as-is.
+"""
+import re
+import xml.etree.ElementTree as ET
+
+import template_renderer
+from configs import HOTAS_COMPONENTS
+
+_OPENERS = {"{": "}", "[": "]", "(": ")"}
+_CLOSERS = {"}": "{", "]": "[", ")": "("}
+_LUA_LONG_BRACKET = re.compile(r"\[(=*)\[")
+_LINE_NUMBER = re.compile(r"line (\d+)")
+
+
+def _issue(level, kind, message, line=None):
+    return {"level": level, "kind": kind, "message": message, "line": line}
+
+
+def check_lua(code):
+    """Bracket balance outside strings and comments, and files that stop inside a string or table."""
+    stack = []
+    line = 1
+    pos = 0
+    length = len(code)
+    while pos < length:
+        char = code[pos]
+        if char == "\n":
+            line += 1
+            pos += 1
+        elif code.startswith("--", pos):
+            long_bracket = _LUA_LONG_BRACKET.match(code, pos + 2)
+            if long_bracket:
+                end = code.find(f"]{long_bracket.group(1)}]", long_bracket.end())
+                if end < 0:
+                    return [_issue("error", "truncated", "File ends inside a block comment", line)]
+                line += code.count("\n", pos, end)
+                pos = end + len(long_bracket.group(1)) + 2
+            else:
+                end = code.find("\n", pos)
+                pos = length if end < 0 else end
+        elif char in "\"'":
+            start_line = line
+            pos += 1
+            while pos < length and code[pos] != char:
+                if code[pos] == "\\":
+                    pos += 1
+                elif code[pos] == "\n":
+                    return [_issue("error", "syntax", "Unfinished string", start_line)]
+                pos += 1
+            if pos >= length:
+                return [_issue("error", "truncated", "File ends inside a string", start_line)]
+            pos += 1
+        elif char == "[" and _LUA_LONG_BRACKET.match(code, pos):
+            long_bracket = _LUA_LONG_BRACKET.match(code, pos)
+            end = code.find(f"]{long_bracket.group(1)}]", long_bracket.end())
+            if end < 0:
+                return [_issue("error", "truncated", "File ends inside a long string", line)]
+            line += code.count("\n", pos, end)
+            pos = end + len(long_bracket.group(1)) + 2
+        else:
+            if char in _OPENERS:
+                stack.append((char, line))
+            elif char in _CLOSERS:
+                if not stack or stack[-1][0] != _CLOSERS[char]:
+                    expected = f"expected '{_OPENERS[stack[-1][0]]}' for line {stack[-1][1]}" if stack else "nothing open"
+                    return [_issue("error", "syntax", f"Unexpected '{char}' ({expected})", line)]
+                stack.pop()
+            pos += 1
+    if stack:
+        opener, opened_line = stack[-1]
+        return [_issue("error", "truncated",
+                       f"File ends with {len(stack)} unclosed bracket(s); innermost '{opener}' opened on line {opened_line}",
+                       opened_line)]
+    return []
+
+
+def check_xml(code):
+    try:
+        ET.fromstring(code.strip())
+    except ET.ParseError as e:
+        line = e.position[0] if getattr(e, "position", None) else None
+        kind = "truncated" if "no element found" in str(e) or "unclosed token" in str(e) else "syntax"
+        return [_issue("error", kind, f"XML is not well-formed: {e}", line)]
+    return []
+
+
+def check_blk(code):
+    try:
+        template_renderer.parse_blk(code)
+    except template_renderer.TemplateError as e:
+        match = _LINE_NUMBER.search(str(e))
+        line = int(match.group(1)) if match else None
+        if str(e).startswith("Unclosed"):
+            return [_issue("error", "truncated", str(e), line)]
+        if str(e).startswith("Unbalanced"):
+            return [_issue("error", "syntax", str(e), line)]
+        # The tokenizer only knows common DataBlock forms; text it cannot read may still load in the game.
+        return [_issue("warning", "syntax", str(e), line)]
+    return []
+
+
+def check_lines(code, separator=None):
+    """Line-oriented formats: balanced quotes on every line and, with a separator, key/value lines."""
+    issues = []
+    lines = code.splitlines()
+    for number, text in enumerate(lines, 1):
+        stripped = text.strip()
+        if not stripped or stripped.startswith(("#", "//", ";", "[")):
+            continue
+        if stripped.count('"') % 2:
+            kind = "truncated" if number == len(lines) else "syntax"
+            issues.append(_issue("error", kind, "Unbalanced quotes", number))
+        elif separator and separator not in stripped:
+            issues.append(_issue("warning", "syntax", f"Line has no '{separator}'", number))
+    return issues
+
+
+CHECKERS = {
+    "lua": check_lua,
+    "xml": check_xml,
+    "binds": check_xml,
+    "blk": check_blk,
+    "map": lambda code: check_lines(code, "="),
+    "key": check_lines,
+    "txt": check_lines,
+}
+
+
+def check_syntax(file_format, code):
+    checker = CHECKERS.get(file_format)
+    if not code.strip():
+        return [_issue("error", "truncated", "File is empty")]
+    return checker(code) if checker else []
+
+
+def column(header, *names):
+    """Index of the first header cell containing one of names (lowercase, tried in order), or None."""
+    lowered = [cell.lower() for cell in header]
+    for name in names:
+        for idx, cell in enumerate(lowered):
+            if name in cell:
+                return idx
+    return None
+
+
+def check_mapping(mapping_rows, header, hotas_name):
+    """Duplicate device inputs in the mapping table and controller components with no mappings at all."""
+    issues = []
+    device_col = column(header, "device id")
+    component_col = column(header, "component")
+    if device_col is not None:
+        seen = {}
+        for row in mapping_rows:
+            if device_col >= len(row) or not row[device_col]:
+                continue
+            component = row[component_col] if component_col is not None and component_col < len(row) else ""
+            key = (component.lower(), row[device_col].upper())
+            seen.setdefault(key, []).append(row)
+        for (component, device_id), rows in seen.items():
+            if len(rows) > 1:
+                where = f" on {rows[0][component_col]}" if component else ""
+                issues.append(_issue("warning", "duplicate", f"{device_id}{where} is bound {len(rows)} times"))
+    hotas_info = HOTAS_COMPONENTS.get(hotas_name, {})
+    if component_col is not None and mapping_rows:
+        mapped = {row[component_col].lower() for row in mapping_rows if component_col < len(row)}
+        for component in hotas_info.get("components", []):
+            if "optional" in component.lower():
+                continue
+            if not any(component.lower() in name or name in component.lower() for name in mapped if name):
+                issues.append(_issue("warning", "unmapped", f"No inputs mapped for {component}"))
+    return issues
+
+
+def check_file_coverage(code, mapping_rows, header):
+    """Device IDs from the mapping table that never appear in a file using the same naming."""
+    device_col = column(header, "device id")
+    if device_col is None:
+        return []
+    device_ids = {row[device_col] for row in mapping_rows if device_col < len(row) and row[device_col]}
+    lowered = code.lower()
+    missing = sorted(device_id for device_id in device_ids if device_id.lower() not in lowered)
+    # A file that uses none of the table's identifiers names inputs differently (e.g. rendered templates).
+    if not missing or len(missing) == len(device_ids):
+        return []
+    shown = ", ".join(missing[:8]) + ("..." if len(missing) > 8 else "")
+    return [_issue("warning", "unmapped", f"{len(missing)} mapped input(s) not found in the file: {shown}")]
+
+
+def validate_profile(profile, hotas_name):
+    """Validate a response_parser.parse_profile result.
+
+    Returns {"mapping": [issues], "files": {file index: [issues]}}.
+    """
+    header = profile["mapping_header"]
+    result = {"mapping": check_mapping(profile["mapping_rows"], header, hotas_name), "files": {}}
+    for file in profile["files"]:
+        file_format = file["file_ext"].lstrip(".")
+        result["files"][file["index"]] = (check_syntax(file_format, file["code"]) +
+                                          check_file_coverage(file["code"], profile["mapping_rows"], header))
+    return result
+
+
+def errors(issues):
+    return [issue for issue in issues if issue["level"] == "error"]
+
+
+def format_issue(issue):
+    return f"line {issue['line']}: {issue['message']}" if issue["line"] else issue["message"]
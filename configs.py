@@ -0,0 +1,164 @@
+SIMULATOR_CONFIGS = {
+    "DCS World": {
+        "file_format": "lua",
+        "file_extension": ".lua",
+        "config_location": "Saved Games/DCS/Config/Input/",
+        "description": "Lua script with device tables and command assignments",
+        "multi_device_support": True,
+        "user_manual": "DCS_User_Manual_EN_2020.pdf"
+    },
+    "Microsoft Flight Simulator 2020": {
+        "file_format": "xml",
+        "file_extension": ".xml",
+        "config_location": "AppData/Local/Packages/Microsoft.FlightSimulator_*/LocalCache/",
+        "description": "XML profile with action mappings",
+        "multi_device_support": True,
+    },
+    "IL-2 Sturmovik": {
+        "file_format": "map",
+        "file_extension": ".map",
+        "config_location": "IL-2 Sturmovik Great Battles/data/input/",
+        "description": "Key=Value format with device IDs",
+        "multi_device_support": True,
+    },
+    "Falcon BMS": {
+        "file_format": "key",
+        "file_extension": ".key",
+        "config_location": "Falcon BMS 4.37/User/Config/",
+        "description": "Binary key file (text representation)",
+        "multi_device_support": True,
+    },
+    "War Thunder": {
+        "file_format": "blk",
+        "file_extension": ".blk",
+        "config_location": "War Thunder/UserPresets/",
+        "description": "Config format with axis and button assignments",
+        "multi_device_support": True,
+        "template_files": {
+            "Thrustmaster HOTAS Warthog": {
+                "blk": "War Thunder for Warthog TARGET mapping configuration_blk.txt",
+                "fcf": "War Thunder_fcf.txt"
+            }
+        }
+    },
+    "X-Plane 11/12": {
+        "file_format": "txt",
+        "file_extension": ".txt",
+        "config_location": "X-Plane 12/Output/preferences/",
+        "description": "Joystick configuration text file",
+        "multi_device_support": True,
+    },
+    "Elite Dangerous": {
+        "file_format": "binds",
+        "file_extension": ".binds",
+        "config_location": "AppData/Local/Frontier Developments/Elite Dangerous/Options/Bindings/",
+        "description": "XML bindings file",
+        "multi_device_support": True,
+    },
+    "Star Citizen": {
+        "file_format": "xml",
+        "file_extension": ".xml",
+        "config_location": "Star Citizen/LIVE/USER/Client/0/Controls/Mappings/",
+        "description": "ActionMaps XML format",
+        "multi_device_support": True,
+    },
+}
+
+HOTAS_COMPONENTS = {
+    "Thrustmaster HOTAS Warthog": {
+        "type": "multi_device",
+        "components": ["Flight Stick", "Throttle"],
+        "description": "A-10C replica HOTAS with separate stick and throttle units",
+        "software_capable": True,
+        "software_name": "TARGET Script Editor",
+        "devices": {
+            "Flight Stick": "Thrustmaster Hotas Warthog Joystick (Replica A-10C stick with multiple hats, two-stage trigger)",
+            "Throttle": "Thrustmaster Hotas Warthog Throttle (Dual throttles, slew control, multiple switches)"
+        }
+    },
+    "VelocityOne Flightstick": {
+        "type": "unified",
+        "components": ["Unified HOTAS"],
+        "description": "All-in-one HOTAS with integrated throttle levers",
+        "software_capable": False,
+        "devices": {
+            "Unified HOTAS": "Turtle Beach VelocityOne Flightstick (Stick + integrated throttles, analog TDC, trim wheel)"
+        }
+    },
+    "Thrustmaster T.16000M FCS": {
+        "type": "multi_device",
+        "components": ["Joystick", "Throttle", "Rudder Pedals (Optional)"],
+        "description": "Complete HOTAS setup with optional pedals",
+        "software_capable": True,
+        "software_name": "TARGET Script Editor",
+        "devices": {
+            "Joystick": "Thrustmaster T.16000M Joystick (Ambidextrous with 16 buttons)",
+            "Throttle": "Thrustmaster TWCS Throttle (Throttle with ministick, slider, 14 buttons)",
+            "Rudder Pedals (Optional)": "Thrustmaster TFRP Rudder Pedals"
+        }
+    },
+    "Logitech X56": {
+        "type": "multi_device",
+        "components": ["Joystick", "Throttle"],
+        "description": "Professional HOTAS with RGB and extensive controls",
+        "software_capable": True,
+        "software_name": "Logitech Gaming Software",
+        "devices": {
+            "Joystick": "Logitech X56 Stick (Multiple hats, analog ministick, RGB, 189 commands)",
+            "Throttle": "Logitech X56 Throttle (Dual throttles, multiple hats, RGB)"
+        }
+    },
+    "Winwing Orion 2 F/A-18": {
+        "type": "multi_device",
+        "components": ["Joystick", "Throttle", "Control Panel (Optional)"],
+        "description": "F/A-18 replica HOTAS with optional UFC panel",
+        "software_capable": True,
+        "software_name": "SimAppPro",
+        "devices": {
+            "Joystick": "Winwing Orion 2 F/A-18 Stick (1:1 scale F/A-18 grip)",
+            "Throttle": "Winwing Orion 2 F/A-18 Throttle (Dual throttles with TDC)",
+            "Control Panel (Optional)": "Winwing Super Taurus UFC"
+        }
+    },
+    "VKB Gladiator NXT + TWCS": {
+        "type": "multi_device",
+        "components": ["Joystick", "Throttle"],
+        "description": "Popular combo: VKB stick + Thrustmaster throttle",
+        "software_capable": True,
+        "software_name": "VKBDevCfg / TARGET Script Editor",
+        "devices": {
+            "Joystick": "VKB Gladiator NXT (High-precision with multiple hats)",
+            "Throttle": "Thrustmaster TWCS Throttle"
+        }
+    },
+    "Virpil Constellation": {
+        "type": "multi_device",
+        "components": ["Joystick", "Throttle", "Control Panel (Optional)"],
+        "description": "Premium modular HOTAS system",
+        "software_capable": True,
+        "software_name": "VPC Configuration Tool",
+        "devices": {
+            "Joystick": "Virpil VPC Constellation ALPHA Grip",
+            "Throttle": "Virpil VPC MongoosT-50CM3 Throttle",
+            "Control Panel (Optional)": "Virpil VPC Control Panel"
+        }
+    },
+    "Xbox Controller": {
+        "type": "gamepad",
+        "components": ["Gamepad"],
+        "description": "Xbox wireless controller with dual analog sticks",
+        "software_capable": False,
+        "devices": {
+            "Gamepad": "Xbox Wireless Controller (Dual analog sticks, triggers, face buttons, D-pad)"
+        }
+    },
+    "Logitech Extreme 3D Pro": {
+        "type": "joystick_only",
+        "components": ["Joystick"],
+        "description": "Single joystick with twist rudder and throttle slider",
+        "software_capable": False,
+        "devices": {
+            "Joystick": "Logitech Extreme 3D Pro (Twist rudder, throttle slider, 12 buttons)"
+        }
+    },
+}
@@ -0,0 +1,375 @@
+"""Offline exporters: native configuration files for every simulator from one parsed mapping table.
+
+export() takes a response_parser.parse_profile result and writes the files the target simulator loads,
+translating commands through command_translations. No model call is made, so a variant of a profile for
+another simulator takes milliseconds. Rows whose device ID cannot be read, or whose input kind the target
+format cannot hold, are skipped; commands with no translation are written under their table name. Both are
+listed in the returned report.
+
+    python exporters.py response.md --aircraft F-16C --hotas "Logitech X56" --simulator "Star Citizen"
+"""
+import argparse
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+
+import command_translations
+import config_validators
+import response_parser
+from configs import HOTAS_COMPONENTS, SIMULATOR_CONFIGS
+
+_HAT_ID = re.compile(r"(?:JOY_)?(?:BTN_)?(?:POV|HAT)_?([1-9]\d*)?_?(UP|DOWN|LEFT|RIGHT|UR|UL|DR|DL|U|D|L|R)$")
+_BUTTON_ID = re.compile(r"(?:JOY_)?(?:BTN|BUTTON|B)_?([1-9]\d*)$")
+_AXIS_ID = re.compile(r"(?:JOY_)?(RX|RY|RZ|X|Y|Z|SLIDER[12]?)(?:_?AXIS)?$")
+_DIRECTIONS = {"UP": "U", "DOWN": "D", "LEFT": "L", "RIGHT": "R"}
+_HAT_NAMES = {"U": "Up", "D": "Down", "L": "Left", "R": "Right"}
+_HAT_ANGLES = {"U": 0, "UR": 45, "R": 90, "DR": 135, "D": 180, "DL": 225, "L": 270, "UL": 315}
+_AXES = ["X", "Y", "Z", "RX", "RY", "RZ", "SLIDER1", "SLIDER2"]
+
+
+def parse_device_id(device_id):
+    """{"kind": "button", "number"}, {"kind": "axis", "axis"} or {"kind": "hat", "number", "direction"} for
+    a table device ID such as JOY_BTN3, JOY_RZ or JOY_BTN_POV1_U; None when it cannot be read, including
+    numbers no exporter can write (button or hat 0, sliders other than 1 and 2)."""
+    text = re.sub(r"[\s\-]+", "_", device_id.strip().strip("`").upper())
+    match = _HAT_ID.match(text)
+    if match:
+        direction = match.group(2)
+        return {"kind": "hat", "number": int(match.group(1) or 1), "direction": _DIRECTIONS.get(direction, direction)}
+    match = _BUTTON_ID.match(text)
+    if match:
+        return {"kind": "button", "number": int(match.group(1))}
+    match = _AXIS_ID.match(text)
+    if match:
+        axis = match.group(1)
+        return {"kind": "axis", "axis": "SLIDER1" if axis == "SLIDER" else axis}
+    return None
+
+
+def _device_index(component, devices):
+    component = component.lower()
+    for idx, name in enumerate(devices):
+        if component and (component in name.lower() or name.lower() in component):
+            return idx
+    return 0
+
+
+def _slug(text, separator="_"):
+    return separator.join(re.findall(r"[A-Za-z0-9]+", text))
+
+
+def _camel(text):
+    return "".join(word[:1].upper() + word[1:] for word in re.findall(r"[A-Za-z0-9]+", text)) or "Command"
+
+
+def bindings(profile, hotas_name):
+    """(source simulator, [binding]) read from a parsed profile's mapping table.
+
+    Each binding is {"device", "component", "device_id", "input", "command"}; device is the index of the
+    controller component in HOTAS_COMPONENTS and input is parse_device_id's result (None if unreadable).
+    """
+    header = profile.get("mapping_header") or []
+    component_col = config_validators.column(header, "component")
+    device_col = config_validators.column(header, "device id")
+    command_col = config_validators.column(header, "command")
+    if device_col is None or command_col is None:
+        return None, []
+    source_simulator = re.sub(r"\s*command\s*$", "", header[command_col], flags=re.IGNORECASE)
+    devices = list(HOTAS_COMPONENTS.get(hotas_name, {}).get("devices", {}))
+    result = []
+    for row in profile["mapping_rows"]:
+        if max(device_col, command_col) >= len(row) or not row[device_col] or not row[command_col]:
+            continue
+        component = row[component_col] if component_col is not None and component_col < len(row) else ""
+        result.append({"device": _device_index(component, devices), "component": component,
+                       "device_id": row[device_col], "input": parse_device_id(row[device_col]),
+                       "command": row[command_col].strip("`* ")})
+    return source_simulator, result
+
+
+def _lua_string(text):
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _dcs_input(entry):
+    source = entry["input"]
+    if source["kind"] == "button":
+        return f"JOY_BTN{source['number']}"
+    if source["kind"] == "axis":
+        return f"JOY_{source['axis']}"
+    return f"JOY_BTN_POV{source['number']}_{source['direction']}"
+
+
+def write_dcs(entries, context):
+    """One diff.lua per device, as DCS keeps them; commands without a DCS id are keyed by a name slug."""
+    files = []
+    for device in sorted({entry["device"] for entry in entries}):
+        sections = {"axisDiffs": {}, "keyDiffs": {}}
+        for entry in entries:
+            if entry["device"] != device:
+                continue
+            section = "axisDiffs" if entry["input"]["kind"] == "axis" else "keyDiffs"
+            native = entry["native"]
+            diff_id = native if re.match(r"[ad]\d", native) else f"{section[0]}_{_slug(native).lower()}"
+            diff = sections[section].setdefault(diff_id, {"name": entry["command"], "keys": []})
+            diff["keys"].append(_dcs_input(entry))
+        lines = [f"-- {context['aircraft_name']}: {context['devices'][device]}", "local diff = {"]
+        for section, diffs in sections.items():
+            if not diffs:
+                continue
+            lines.append(f"\t[{_lua_string(section)}] = {{")
+            for diff_id, diff in diffs.items():
+                added = " ".join(f"[{idx}] = {{ [\"key\"] = {_lua_string(key)} }},"
+                                 for idx, key in enumerate(diff["keys"], 1))
+                lines.append(f"\t\t[{_lua_string(diff_id)}] = {{ [\"added\"] = {{ {added} }}, "
+                             f"[\"name\"] = {_lua_string(diff['name'])} }},")
+            lines.append("\t},")
+        lines += ["}", "return diff"]
+        files.append(("\n".join(lines), context["devices"][device] if len(context["devices"]) > 1 else None))
+    return files, []
+
+
+def _xml_text(root):
+    ET.indent(root, space="  ")
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(root, encoding="unicode")
+
+
+def write_msfs(entries, context):
+    root = ET.Element("Version", Num="1660")
+    ET.SubElement(root, "FriendlyName").text = f"{context['aircraft_name']} - {context['hotas_name']}"
+    for device in sorted({entry["device"] for entry in entries}):
+        device_element = ET.SubElement(root, "Device", DeviceName=context["devices"][device])
+        plane = ET.SubElement(device_element, "Context", ContextName="PLANE")
+        for entry in entries:
+            if entry["device"] != device:
+                continue
+            source = entry["input"]
+            if source["kind"] == "button":
+                information, value = f"Joystick Button {source['number']}", source["number"] - 1
+            elif source["kind"] == "axis":
+                information, value = f"Joystick Axis {source['axis']}", _AXES.index(source["axis"])
+            else:
+                angle = _HAT_ANGLES[source["direction"]]
+                information, value = f"Joystick Pov {source['number']} {angle}", angle
+            action = ET.SubElement(plane, "Action", ActionName=_slug(entry["native"]).upper(), Flag="2")
+            ET.SubElement(ET.SubElement(action, "Primary"), "KEY", Information=information).text = str(value)
+    return [(_xml_text(root), None)], []
+
+
+def write_il2(entries, context):
+    lines = [f"// {context['aircraft_name']} - {context['hotas_name']}"]
+    for entry in entries:
+        source = entry["input"]
+        joystick = f"joy{entry['device']}"
+        if source["kind"] == "button":
+            key = f"{joystick}_b{source['number'] - 1}"
+        elif source["kind"] == "axis":
+            key = f"{joystick}_axis_{source['axis'].lower()}"
+        else:
+            key = f"{joystick}_pov{source['number'] - 1}_{_HAT_ANGLES[source['direction']]}"
+        lines.append(f"{_slug(entry['native']).lower()}={key}")
+    return [("\n".join(lines), None)], []
+
+
+def write_bms(entries, context):
+    """Buttons and hats as DX bindings (32 buttons per device); BMS reads axes from its own setup screen."""
+    lines = [f"# {context['aircraft_name']} - {context['hotas_name']}"]
+    skipped = []
+    for entry in entries:
+        source = entry["input"]
+        callback = _camel(entry["native"])
+        if source["kind"] == "button":
+            lines.append(f"{callback} {entry['device'] * 32 + source['number'] - 1} -1 -2 0 0x0 0")
+        elif source["kind"] == "hat":
+            lines.append(f"{callback} {source['number'] - 1} -1 -3 {_HAT_ANGLES[source['direction']] // 45} 0x0 0")
+        else:
+            skipped.append((entry, "axes are assigned in the BMS setup screen"))
+    return [("\n".join(lines), None)], skipped
+
+
+def write_war_thunder(entries, context):
+    hotkeys = []
+    axes = []
+    for entry in entries:
+        source = entry["input"]
+        name = _slug(entry["native"])
+        if source["kind"] == "axis":
+            axes.append(f"    {name}{{\n      axisId:i={_AXES.index(source['axis'])}\n      deviceId:i={entry['device']}\n    }}")
+        elif source["kind"] == "button":
+            hotkeys.append(f"    {name}{{\n      joyButton:i={source['number'] - 1}\n      deviceId:i={entry['device']}\n    }}")
+        else:
+            hotkeys.append(f"    {name}{{\n      joyPov:i={source['number'] - 1}\n"
+                           f"      povAngle:i={_HAT_ANGLES[source['direction']]}\n      deviceId:i={entry['device']}\n    }}")
+    text = (f"// {context['aircraft_name']} - {context['hotas_name']}\ncontrols{{\n  hotkeys{{\n" + "\n".join(hotkeys)
+            + "\n  }\n  axes{\n" + "\n".join(axes) + "\n  }\n}")
+    return [(text, None)], []
+
+
+def write_xplane(entries, context):
+    """Joystick preference lines; X-Plane numbers buttons 160 and axes 25 to a device."""
+    lines = ["I", "1100 Version", f"# {context['aircraft_name']} - {context['hotas_name']}"]
+    skipped = []
+    for entry in entries:
+        source = entry["input"]
+        if source["kind"] == "button":
+            lines.append(f"_joy_BUTN_use{entry['device'] * 160 + source['number'] - 1} {entry['native']}")
+        elif source["kind"] == "axis" and entry["native"].isdigit():
+            lines.append(f"_joy_AXIS_use{entry['device'] * 25 + _AXES.index(source['axis'])} {entry['native']}")
+        elif source["kind"] == "axis":
+            skipped.append((entry, "no X-Plane axis assignment for this command"))
+        else:
+            skipped.append((entry, "X-Plane numbers hat directions as buttons per device"))
+    return [("\n".join(lines), None)], skipped
+
+
+def _elite_key(source):
+    if source["kind"] == "button":
+        return f"Joy_{source['number']}"
+    if source["kind"] == "axis":
+        return "Joy_UAxis" if source["axis"].startswith("SLIDER") else f"Joy_{source['axis']}Axis"
+    return f"Joy_POV{source['number']}{_HAT_NAMES[source['direction']]}"
+
+
+def write_elite(entries, context):
+    root = ET.Element("Root", PresetName=f"{context['aircraft_name']} {context['hotas_name']}", MajorVersion="4",
+                      MinorVersion="0")
+    commands = {}
+    skipped = []
+    for entry in entries:
+        if entry["input"]["kind"] == "hat" and entry["input"]["direction"] not in _HAT_NAMES:
+            skipped.append((entry, "Elite binds only the four main hat directions"))
+            continue
+        device = _camel(context["devices"][entry["device"]])
+        name = _camel(entry["native"])
+        element = commands.get(name)
+        if element is None:
+            element = commands[name] = ET.SubElement(root, name)
+            if entry["input"]["kind"] == "axis":
+                ET.SubElement(element, "Binding", Device=device, Key=_elite_key(entry["input"]))
+                ET.SubElement(element, "Inverted", Value="0")
+                ET.SubElement(element, "Deadzone", Value="0.00000000")
+            else:
+                ET.SubElement(element, "Primary", Device=device, Key=_elite_key(entry["input"]))
+                ET.SubElement(element, "Secondary", Device="{NoDevice}", Key="")
+        elif element.find("Secondary") is not None and element.find("Secondary").get("Key") == "":
+            element.find("Secondary").attrib.update(Device=device, Key=_elite_key(entry["input"]))
+        else:
+            skipped.append((entry, "Elite holds one axis or two buttons per command"))
+    return [(_xml_text(root), None)], skipped
+
+
+_SC_ACTIONMAPS = [
+    ("v_weapon_countermeasure", "spaceship_defensive"), ("v_attack", "spaceship_weapons"),
+    ("v_weapon", "spaceship_missiles"), ("v_target", "spaceship_targeting"), ("v_view", "spaceship_view"),
+    ("v_pitch", "spaceship_movement"), ("v_roll", "spaceship_movement"), ("v_yaw", "spaceship_movement"),
+    ("v_strafe", "spaceship_movement"), ("v_space_brake", "spaceship_movement"),
+]
+_SC_AXES = {"X": "x", "Y": "y", "Z": "z", "RX": "rotx", "RY": "roty", "RZ": "rotz", "SLIDER1": "slider1",
+            "SLIDER2": "slider2"}
+
+
+def write_star_citizen(entries, context):
+    root = ET.Element("ActionMaps", version="1", optionsVersion="2", rebindVersion="2",
+                      profileName=_slug(f"{context['aircraft_name']} {context['hotas_name']}"))
+    for device in sorted({entry["device"] for entry in entries}):
+        ET.SubElement(root, "options", type="joystick", instance=str(device + 1), Product=context["devices"][device])
+    actionmaps = {}
+    skipped = []
+    for entry in entries:
+        source = entry["input"]
+        if source["kind"] == "hat" and source["direction"] not in _HAT_NAMES:
+            skipped.append((entry, "Star Citizen binds only the four main hat directions"))
+            continue
+        native = entry["native"] if entry["native"].startswith("v_") else f"v_{_slug(entry['native']).lower()}"
+        group = next((group for prefix, group in _SC_ACTIONMAPS if native.startswith(prefix)), "spaceship_general")
+        if group not in actionmaps:
+            actionmaps[group] = ET.SubElement(root, "actionmap", name=group)
+        joystick = f"js{entry['device'] + 1}"
+        if source["kind"] == "button":
+            rebind = f"{joystick}_button{source['number']}"
+        elif source["kind"] == "axis":
+            rebind = f"{joystick}_{_SC_AXES[source['axis']]}"
+        else:
+            rebind = f"{joystick}_hat{source['number']}_{_HAT_NAMES[source['direction']].lower()}"
+        ET.SubElement(ET.SubElement(actionmaps[group], "action", name=native), "rebind", input=rebind)
+    return [(_xml_text(root), None)], skipped
+
+
+WRITERS = {
+    "DCS World": write_dcs,
+    "Microsoft Flight Simulator 2020": write_msfs,
+    "IL-2 Sturmovik": write_il2,
+    "Falcon BMS": write_bms,
+    "War Thunder": write_war_thunder,
+    "X-Plane 11/12": write_xplane,
+    "Elite Dangerous": write_elite,
+    "Star Citizen": write_star_citizen,
+}
+
+
+def export(profile, simulator, hotas_name, aircraft_name):
+    """Native files for simulator from a parsed profile's mapping table.
+
+    Returns {"files": [{"file_name", "file_format", "code"}], "report"}; the report is {"source_simulator",
+    "exported", "untranslated": [commands], "skipped": [(device ID, command, reason)], "seconds"}.
+    """
+    started = time.perf_counter()
+    sim_info = SIMULATOR_CONFIGS[simulator]
+    source_simulator, rows = bindings(profile, hotas_name)
+    devices = list(HOTAS_COMPONENTS.get(hotas_name, {}).get("devices", {})) or [hotas_name]
+    entries = []
+    skipped = []
+    for row in rows:
+        if row["input"] is None:
+            skipped.append((row["device_id"], row["command"], "unrecognized device ID"))
+            continue
+        native, translated = command_translations.translate(row["command"], simulator, source_simulator,
+                                                               axis=row["input"]["kind"] == "axis")
+        entries.append(dict(row, native=native, translated=translated))
+    context = {"aircraft_name": aircraft_name, "hotas_name": hotas_name, "devices": devices}
+    written, unsupported = WRITERS[simulator](entries, context) if entries else ([], [])
+    skipped += [(entry["device_id"], entry["command"], reason) for entry, reason in unsupported]
+    unsupported_ids = {id(entry) for entry, _ in unsupported}
+    exported = [entry for entry in entries if id(entry) not in unsupported_ids]
+    untranslated = list(dict.fromkeys(entry["command"] for entry in exported if not entry["translated"]))
+    files = []
+    for code, device_name in written:
+        suffix = f"_{_slug(simulator)}" + (f"_{_slug(device_name)}" if device_name else "")
+        files.append({"file_name": response_parser.profile_file_name(aircraft_name, hotas_name, suffix,
+                                                                     sim_info["file_extension"]),
+                      "file_format": sim_info["file_format"], "code": code})
+    return {"files": files, "report": {"source_simulator": source_simulator, "exported": len(exported),
+                                       "untranslated": untranslated, "skipped": skipped,
+                                       "seconds": time.perf_counter() - started}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a generated profile's mapping table to other simulators.")
+    parser.add_argument("response", help="Saved model response (markdown with the Part 1 mapping table)")
+    parser.add_argument("--aircraft", required=True)
+    parser.add_argument("--hotas", required=True, choices=list(HOTAS_COMPONENTS))
+    parser.add_argument("--simulator", action="append", choices=list(SIMULATOR_CONFIGS),
+                        help="Target simulator (repeatable; default: all)")
+    parser.add_argument("--output", default="exports")
+    args = parser.parse_args()
+
+    with open(args.response, "r", encoding="utf-8") as f:
+        response_text = f.read()
+    # Only the mapping table is read, so any simulator's naming works for parsing.
+    profile = response_parser.parse_profile(response_text, "DCS World", args.hotas, SIMULATOR_CONFIGS["DCS World"],
+                                            args.aircraft)
+    os.makedirs(args.output, exist_ok=True)
+    for simulator in args.simulator or list(SIMULATOR_CONFIGS):
+        exported = export(profile, simulator, args.hotas, args.aircraft)
+        report = exported["report"]
+        for file in exported["files"]:
+            with open(os.path.join(args.output, file["file_name"]), "w", encoding="utf-8") as f:
+                f.write(file["code"])
+        print(f"{simulator}: {report['exported']} binding(s) in {len(exported['files'])} file(s), "
+              f"{len(report['untranslated'])} untranslated, {len(report['skipped'])} skipped "
+              f"({report['seconds'] * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Offline stand-in for genai.Client, for the batch CLI, benchmarks and local testing.
+
+Only the surface generator.py uses is implemented: client.models.generate_content_stream(...) yielding
+chunks with a .text attribute.
+"""
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+CHARS_PER_TOKEN = 4
+
+_FORMAT_PATTERN = re.compile(r"Generate a COMPLETE (\w+) configuration file")
+_SECTION_PATTERN = re.compile(r"^## SECTION: (\S+)", re.MULTILINE)
+_SLOT_PATTERN = re.compile(r"^(\S+) \{ ([\w.\-]+):i=", re.MULTILINE)
+
+
+def synthetic_section(section, file_format="lua", rows=30, slot_listing=None):
+    """One part of a synthetic response: "mapping", "installation", "file" (a fenced config file),
+    "assignments" (JSON bindings for the blocks in a template_renderer.describe_slots listing) or
+    "inventory" (a JSON command inventory)."""
+    if section == "mapping":
+        table = ["| Physical Input | Device ID | Command | Function & Rationale |",
+                 "|----------------|-----------|---------|----------------------|"]
+        for idx in range(1, rows + 1):
+            table.append(f"| Button {idx} | JOY_BTN{idx} | Command {idx} | Synthetic binding {idx} |")
+        return "\n".join(table) + "\n"
+    if section == "assignments":
+        # Bind the first integer parameter of each listed template block.
+        slots = _SLOT_PATTERN.findall(slot_listing or "")[:rows]
+        return json.dumps([{"path": path, "param": param, "value": str(idx)}
+                           for idx, (path, param) in enumerate(slots, 1)])
+    if section == "inventory":
+        return json.dumps({"aircraft": "Synthetic Aircraft", "commands": [
+            {"name": f"Command {idx}", "category": "weapons" if idx % 2 else "sensors",
+             "kind": "axis" if idx <= 3 else "button", "priority": "primary" if idx <= rows // 2 else "secondary",
+             "notes": ""} for idx in range(1, rows + 1)]})
+    if section == "installation":
+        return "1. Copy the file to the config location.\n2. Load the profile.\n3. Calibrate all axes.\n"
+    return f"```{file_format}\n" + "\n".join(_config_lines(file_format, rows)) + "\n```\n"
+
+
+def _config_lines(file_format, rows):
+    """A small but syntactically valid file in the given format, so local validation passes."""
+    if file_format == "lua":
+        return (["local diff = {", '\t["keyDiffs"] = {'] +
+                [f'\t\t["d{idx}"] = {{ ["added"] = {{ [1] = {{ ["key"] = "JOY_BTN{idx}" }} }}, ["name"] = "Command {idx}" }},'
+                 for idx in range(1, rows + 1)] +
+                ["\t},", "}", "return diff"])
+    if file_format in ("xml", "binds"):
+        return (["<Bindings>"] + [f'  <Command{idx}><Primary Device="Joystick" Key="JOY_BTN{idx}" /></Command{idx}>'
+                                  for idx in range(1, rows + 1)] + ["</Bindings>"])
+    if file_format == "blk":
+        return (["controls{", "  hotkeys{"] + [f"    ID_COMMAND_{idx}{{ joyButton:i={idx} }}" for idx in range(1, rows + 1)]
+                + ["  }", "}"])
+    return [f"Command{idx}=JOY_BTN{idx}" for idx in range(1, rows + 1)]
+
+
+def synthetic_response(file_format="lua", rows=30):
+    """A response shaped like a real generation: mapping table, installation steps and one config file."""
+    return (
+        "### Part 1: Complete Technical Mapping Table\n\n" + synthetic_section("mapping", rows=rows) + "\n"
+        "### Part 2: Installation Instructions\n\n" + synthetic_section("installation") + "\n"
+        "### Part 3: COMPLETE Configuration Files\n\n" + synthetic_section("file", file_format, rows)
+    )
+
+
+class FakeAPIError(Exception):
+    """Mimics google.genai.errors.APIError closely enough for retry handling (a numeric .code)."""
+
+    def __init__(self, code=429, message="RESOURCE_EXHAUSTED"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content_stream(self, model, contents, config=None):
+        client = self._client
+        client.calls.append({"model": model, "contents": contents, "config": config})
+        with client.failures_lock:
+            failure = client.failures.pop(0) if client.failures else None
+        if failure is not None:
+            raise failure
+        response_text = client.response_text
+        if response_text is None:
+            prompt = contents[0].parts[0].text if contents and contents[0].parts else ""
+            match = _FORMAT_PATTERN.search(prompt or "")
+            file_format = match.group(1).lower() if match else "lua"
+            section = _SECTION_PATTERN.search(prompt or "")
+            if section:
+                response_text = synthetic_section(section.group(1).split(":")[0], file_format, slot_listing=prompt)
+            else:
+                response_text = synthetic_response(file_format)
+        return self._stream(response_text)
+
+    def _stream(self, response_text):
+        client = self._client
+        if client.first_chunk_delay:
+            time.sleep(client.first_chunk_delay)
+        chunk_chars = client.chunk_tokens * CHARS_PER_TOKEN
+        for start in range(0, len(response_text), chunk_chars):
+            if client.tokens_per_second:
+                time.sleep(client.chunk_tokens / client.tokens_per_second)
+            yield SimpleNamespace(text=response_text[start:start + chunk_chars])
+
+
+class FakeClient:
+    """Streams `response_text` (or a synthetic response) at `tokens_per_second` (0 means no delay).
+
+    Exceptions queued in `failures` are raised by the next calls, in order, before any chunk is streamed.
+    """
+
+    def __init__(self, response_text=None, tokens_per_second=0, chunk_tokens=20, first_chunk_delay=0.0,
+                 failures=None):
+        self.response_text = response_text
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = chunk_tokens
+        self.first_chunk_delay = first_chunk_delay
+        self.failures = list(failures or [])
+        # Streams are requested from worker threads (batch, sectioned generation).
+        self.failures_lock = threading.Lock()
+        self.calls = []
+        self.models = FakeModels(self)
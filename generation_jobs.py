@@ -0,0 +1,141 @@
+"""Process-wide queue for generations, so they outlive the Streamlit script run that started them.
+
+A generation runs on a bounded worker pool as a job with an unguessable id. The job records its progress,
+messages and streamed output as it goes, so any session holding the id (the one that started it, or the same
+browser after a reload) can poll it and pick the stream up where it is. Finished jobs are kept for
+RESULT_TTL seconds. submit() raises QueueFull once WORKERS jobs are running and MAX_QUEUED more are waiting,
+so a crowd of users waits its turn instead of piling onto the API.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS = int(os.environ.get("GAMECHANGER_GENERATION_WORKERS", "4"))
+MAX_QUEUED = int(os.environ.get("GAMECHANGER_GENERATION_QUEUE", "8"))
+RESULT_TTL = int(os.environ.get("GAMECHANGER_JOB_TTL", "3600"))
+
+
+class QueueFull(Exception):
+    pass
+
+
+_executor = None
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="generate")
+    return _executor
+
+
+def _run(job, work):
+    with _lock:
+        job["state"] = "running"
+        job["started"] = time.time()
+    try:
+        result = work(job)
+    except Exception as e:
+        print(f"Generation job {job['id']} failed: {e}")
+        with _lock:
+            job["error"] = str(e)
+            job["state"] = "failed"
+            job["finished"] = time.time()
+    else:
+        with _lock:
+            job["result"] = result
+            job["state"] = "done"
+            job["finished"] = time.time()
+
+
+def _prune(now):
+    """Forget finished jobs older than RESULT_TTL; queued and running jobs are always kept."""
+    for job_id in list(_jobs):
+        finished = _jobs[job_id]["finished"]
+        if finished is not None and now - finished > RESULT_TTL:
+            del _jobs[job_id]
+
+
+def _pending():
+    return sum(1 for job in _jobs.values() if job["state"] in ("queued", "running"))
+
+
+def submit(work, label="", info=None):
+    """Queue work(job) on the worker pool and return the job; raises QueueFull when the queue is full.
+
+    A job is {"id", "label", "info", "state", "created", "started", "finished", "progress", "notices",
+    "stream", "output", "result", "error"}; info is whatever a viewer needs to render the job, state is
+    "queued", "running", "done" or "failed", and result is whatever work returned. work reports through
+    set_progress, add_notice, start_stream and add_output, never the UI.
+    """
+    with _lock:
+        _prune(time.time())
+        pending = _pending()
+        if pending >= WORKERS + MAX_QUEUED:
+            raise QueueFull(f"{pending} generations are already running or waiting")
+        job = {"id": secrets.token_urlsafe(16), "label": label, "info": info or {}, "state": "queued",
+               "created": time.time(), "started": None, "finished": None, "progress": "", "notices": [],
+               "stream": 0, "output": [], "result": None, "error": None}
+        _jobs[job["id"]] = job
+        _get_executor().submit(_run, job, work)
+    return job
+
+
+def get(job_id):
+    """The job with this id, or None once it has expired (or never existed)."""
+    with _lock:
+        _prune(time.time())
+        return _jobs.get(job_id)
+
+
+def queue_position(job):
+    """How many queued jobs are ahead of a queued job."""
+    with _lock:
+        ahead = 0
+        for other in _jobs.values():
+            if other is job:
+                return ahead
+            if other["state"] == "queued":
+                ahead += 1
+        return ahead
+
+
+def set_progress(job, message):
+    with _lock:
+        job["progress"] = message
+
+
+def add_notice(job, level, message):
+    with _lock:
+        job["notices"].append((level, message))
+
+
+def start_stream(job):
+    """Discard the output so far; called when a stream (re)starts, e.g. on a retry."""
+    with _lock:
+        job["stream"] += 1
+        job["output"] = []
+
+
+def add_output(job, text):
+    with _lock:
+        job["output"].append(text)
+
+
+def output_since(job, stream, count):
+    """(stream, new chunks, chunk count) since a reader's last poll; a restarted stream is read from the start."""
+    with _lock:
+        if job["stream"] != stream:
+            count = 0
+        chunks = job["output"][count:]
+        return job["stream"], chunks, count + len(chunks)
+
+
+def notices(job):
+    with _lock:
+        return list(job["notices"])
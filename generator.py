@@ -0,0 +1,947 @@
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from google.genai import types
+
+import command_inventory
+import config_validators
+import instrumentation
+import manual_index
+import rate_limiter
+import response_cache
+import response_parser
+import template_renderer
+import retrieval
+import token_budget
+from configs import SIMULATOR_CONFIGS
+
+MODEL = "gemini-2.0-flash-exp"
+
+# Prompt budgets: extraction stops reading a document once its share of the prompt is filled.
+# The aircraft manual is the exception for text: all pages are read so the most relevant ones can be ranked.
+AIRCRAFT_TEXT_BUDGET = 12000
+AIRCRAFT_IMAGE_BUDGET = 5
+CONTROLLER_TEXT_BUDGET = 2000
+CONTROLLER_IMAGE_BUDGET = 2
+SOFTWARE_TEXT_BUDGET = 3000
+SOFTWARE_IMAGE_BUDGET = 3
+
+
+def _print_notify(level, message):
+    print(f"[{level}] {message}")
+
+
+def load_simulator_manual(simulator):
+    sim_config = SIMULATOR_CONFIGS.get(simulator, {})
+    manual_file = sim_config.get("user_manual")
+    try:
+        sections = manual_index.get_sections(manual_file)
+    except Exception as e:
+        print(f"Could not load simulator manual: {e}")
+        return None
+    if not sections:
+        return None
+    return "".join(sections.values())[:5000]
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def _read_template(file_path):
+    """Template text, read once per process and again only when the file changes on disk."""
+    stat = os.stat(file_path)
+    fingerprint = (stat.st_size, stat.st_mtime)
+    cached = _templates.get(file_path)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        content = f.read()
+    with _templates_lock:
+        _templates[file_path] = (fingerprint, content)
+    return content
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_template(file_type, content):
+    # Trees are only read after parsing, so one parse is shared by every request using the template.
+    return template_renderer.parse(file_type, content)
+
+
+def load_template_files(simulator, hotas_name, notify=_print_notify):
+    """Load template configuration files if available for the simulator and controller combination."""
+    sim_config = SIMULATOR_CONFIGS.get(simulator, {})
+    template_files = sim_config.get("template_files", {})
+
+    if hotas_name in template_files:
+        templates = {}
+        for file_type, file_path in template_files[hotas_name].items():
+            if os.path.exists(file_path):
+                try:
+                    content = _read_template(file_path)
+                    templates[file_type] = content
+                    notify("success", f"✅ Loaded {file_type.upper()} template ({len(content)} chars): {file_path}")
+                except Exception as e:
+                    notify("warning", f"⚠️ Could not load template {file_path}: {e}")
+            else:
+                notify("warning", f"⚠️ Template file not found: {file_path}")
+        return templates
+    return {}
+
+
+def _consume_stream(chunk_texts, on_progress, on_chunk, on_stream_start):
+    if on_stream_start:
+        on_stream_start()
+    chunks = []
+    char_count = 0
+    for chunk_text in chunk_texts:
+        if chunk_text:
+            chunks.append(chunk_text)
+            char_count += len(chunk_text)
+            if on_chunk:
+                on_chunk(chunk_text)
+            if on_progress:
+                on_progress(char_count)
+    return chunks
+
+
+_TEMPLATE_DESCRIPTIONS = {"blk": "controls configuration", "fcf": "TARGET configuration"}
+
+_ASSIGNMENT_INSTRUCTIONS = """
+**🎯 TEMPLATE ASSIGNMENTS (rendered locally):**
+Templates marked "rendered from your assignments" are NOT to be written out. For each of them, respond with
+ONLY a ```json code block holding a list of control assignments for {aircraft_name}:
+[{{"path": "<block path from the listing>", "param": "<parameter name>", "value": "<new value>"}}, ...]
+- Use ONLY block paths from the listing (including any "#2"-style suffix) and parameter names from its "Parameters" line
+- Values must match the parameter type (i = integer, r = number, b = yes/no, t = text, p2/p3/p4 = comma-separated numbers)
+- Include one assignment per binding you change; every block and value you do not mention is kept as-is
+- Bind EVERY button/axis that appears in the mapping table
+"""
+
+
+def _template_file_line(idx, file_type, rendered):
+    description = _TEMPLATE_DESCRIPTIONS.get(file_type, "configuration")
+    if rendered:
+        return (f"- File {idx + 1}: .{file_type} format ({description}) - ```json assignments ONLY, as "
+                f'{{"file": "{file_type}", "assignments": [...]}}; the file is rendered from the template')
+    return f"- File {idx + 1}: .{file_type} format ({description}) - FOLLOW TEMPLATE EXACTLY"
+
+
+def build_request(aircraft_text, aircraft_images, controller_manuals, software_manual_text, software_manual_images,
+                  hotas_name, hotas_devices, aircraft_name, simulator, controller_type, software_capable,
+                  software_name, notify=_print_notify, trace=None, inventory=None):
+    """Assemble the budgeted prompt sections and the full single-request prompt.
+
+    With an `inventory` (see get_command_inventory) the aircraft is described by its command inventory instead
+    of the manual excerpt and images. Returns a dict with the full "prompt" plus the pieces the sectioned mode
+    recombines into smaller prompts.
+    """
+    model = MODEL
+    sim_config = SIMULATOR_CONFIGS.get(simulator, {})
+    file_format = sim_config.get("file_format", "txt")
+    config_location = sim_config.get("config_location", "")
+    with instrumentation.stage(trace, "simulator_manual") as record:
+        simulator_manual_text = load_simulator_manual(simulator)
+        record["chars"] = len(simulator_manual_text or "")
+
+    with instrumentation.stage(trace, "template_files") as record:
+        template_files = load_template_files(simulator, hotas_name, notify)
+        record["files"] = len(template_files)
+        record["chars"] = sum(len(content) for content in template_files.values())
+    template_trees = {}
+    for file_type, content in template_files.items():
+        if template_renderer.can_render(file_type):
+            try:
+                template_trees[file_type] = _parse_template(file_type, content)
+            except template_renderer.TemplateError as e:
+                notify("warning", f"⚠️ Could not parse {file_type.upper()} template, it will be generated in full: {e}")
+
+    provided_manual_count = sum(1 for component in hotas_devices
+                                if controller_manuals.get(component, {}).get('text'))
+    inventory_text = command_inventory.format_inventory(inventory) if inventory else None
+    prompt_images = [] if inventory else list(aircraft_images or [])[:AIRCRAFT_IMAGE_BUDGET]
+    for manual_data in controller_manuals.values():
+        prompt_images.extend((manual_data.get('images') or [])[:CONTROLLER_IMAGE_BUDGET])
+    prompt_images.extend((software_manual_images or [])[:SOFTWARE_IMAGE_BUDGET])
+    template_tokens = sum(token_budget.estimate_tokens(template_renderer.describe_slots(template_trees[file_type])
+                                                       if file_type in template_trees else content)
+                          for file_type, content in template_files.items())
+    budget_sections = [
+        token_budget.section("instructions", token_budget.INSTRUCTION_TOKENS, 0, token_budget.INSTRUCTION_TOKENS),
+        token_budget.section("template_section", template_tokens, 1, template_tokens),
+        token_budget.section("devices_text", sum(
+            token_budget.estimate_tokens((controller_manuals.get(component, {}).get('text') or "")[:CONTROLLER_TEXT_BUDGET])
+            for component in hotas_devices), 2),
+        token_budget.section("aircraft_manual", token_budget.estimate_tokens(
+            inventory_text or (aircraft_text or "")[:AIRCRAFT_TEXT_BUDGET]), 3, 1000),
+        token_budget.section("software_section", token_budget.estimate_tokens(
+            software_manual_text[:SOFTWARE_TEXT_BUDGET]) if software_capable and software_manual_text else 0, 4),
+        token_budget.section("images", len(prompt_images) * token_budget.IMAGE_TOKENS, 5),
+        token_budget.section("manual_excerpt", token_budget.estimate_tokens(simulator_manual_text), 6),
+    ]
+    with instrumentation.stage(trace, "token_budget") as record:
+        allocation = token_budget.plan(budget_sections)
+        record["prompt_tokens"] = sum(allocation.values())
+        record["plan"] = token_budget.format_allocation(budget_sections, allocation)
+    device_manual_chars = token_budget.tokens_to_chars(allocation["devices_text"]) // max(1, provided_manual_count)
+    if simulator_manual_text:
+        simulator_manual_text = simulator_manual_text[:token_budget.tokens_to_chars(allocation["manual_excerpt"])]
+    prompt_images = prompt_images[:allocation["images"] // token_budget.IMAGE_TOKENS]
+
+    device_descriptions = []
+    for component, device_desc in hotas_devices.items():
+        manual_info = controller_manuals.get(component, {})
+        manual_text = manual_info.get('text', 'No manual provided')
+        if manual_text and manual_text != 'No manual provided':
+            device_descriptions.append(
+                f"\n### {component}\n- Hardware: {device_desc}\n- Manual Content: {manual_text[:min(CONTROLLER_TEXT_BUDGET, device_manual_chars)]}")
+        else:
+            device_descriptions.append(
+                f"\n### {component}\n- Hardware: {device_desc}\n- Manual Content: No manual provided")
+    devices_text = "\n".join(device_descriptions)
+
+    software_section = ""
+    if software_capable and software_manual_text:
+        software_section = f"""
+## CONTROLLER SOFTWARE CAPABILITIES:
+Software: {software_name}
+The controller supports advanced scripting and programming capabilities.
+
+Software Manual Content:
+{software_manual_text[:token_budget.tokens_to_chars(allocation['software_section'])]}
+
+**IMPORTANT:** Generate configurations that leverage software capabilities like:
+- Multi-stage button presses
+- Conditional logic
+- Macros and sequences
+- Virtual button combinations
+- Axis curves and dead zones
+- Shift states and layers
+"""
+    elif software_capable:
+        software_section = f"""
+## CONTROLLER SOFTWARE CAPABILITIES:
+Software: {software_name}
+The controller supports advanced scripting (manual not provided, use general knowledge of {software_name}).
+"""
+
+    template_section = ""
+    if template_files:
+        template_section = "\n## 📋 CONFIGURATION TEMPLATES (CRITICAL - FOLLOW EXACTLY):\n\n"
+        if len(template_trees) < len(template_files):
+            template_section += f"**CRITICAL IMPORTANCE:** These templates show the EXACT format, syntax, and structure required for {simulator} configurations.\n"
+            template_section += f"You MUST replicate this format precisely for {aircraft_name}.\n\n"
+
+        for file_type, content in template_files.items():
+            if file_type in template_trees:
+                template_section += f"### Template: {file_type.upper()} File Format (rendered from your assignments)\n"
+                template_section += f"**File Type:** {file_type} format for {simulator}\n"
+                template_section += f"**Bindable blocks and current values:**\n```\n{template_renderer.describe_slots(template_trees[file_type])}\n```\n\n"
+                continue
+            template_section += f"### Template: {file_type.upper()} File Format\n"
+            template_section += f"**File Type:** {file_type} format for {simulator}\n"
+            template_section += f"**Template Length:** {len(content)} characters\n"
+            template_section += f"**EXACT STRUCTURE TO FOLLOW:**\n```\n{content}\n```\n\n"
+
+        if template_trees:
+            template_section += _ASSIGNMENT_INSTRUCTIONS.format(aircraft_name=aircraft_name)
+        if len(template_trees) < len(template_files):
+            template_section += f"""
+**🎯 CRITICAL TEMPLATE REQUIREMENTS:**
+1. ✅ Copy the EXACT structure, nesting, and hierarchy from the template above
+2. ✅ Use the SAME syntax for all entries (keys, values, brackets, semicolons)
+3. ✅ Maintain the SAME sectioning (axes{{}}, buttons{{}}, triggers{{}}, etc.)
+4. ✅ Follow the SAME naming conventions for controls
+5. ✅ Keep the SAME formatting style (indentation, spacing, line breaks)
+6. ✅ Generate a COMPLETE file with ALL sections present in the template
+7. ✅ Replace control assignments with ones appropriate for {aircraft_name}
+8. ✅ Ensure EVERY button/axis from the Thrustmaster HOTAS Warthog is mapped
+9. ✅ Match the device naming convention exactly as shown in template
+10. ✅ Preserve all structural elements like device IDs, axis ranges, button numbers
+
+**❌ DO NOT:**
+- Truncate or abbreviate any part of the configuration
+- Change the file structure or format from the template
+- Skip any sections that exist in the template
+- Invent new syntax not shown in the template
+- Alter the indentation or bracketing style
+- Modify device identification patterns
+
+**📝 GENERATION INSTRUCTIONS:**
+Follow the template structure line-by-line, section-by-section. Generate the COMPLETE configuration matching the template's format exactly while adapting the control assignments for {aircraft_name}'s specific combat needs.
+"""
+
+    if controller_type == "unified":
+        table_format = "| Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|----------------|-----------|---------------------|----------------------|"
+        mapping_instructions = "**UNIFIED DEVICE** - Single physical unit with all controls integrated."
+    elif controller_type == "multi_device":
+        table_format = "| HOTAS Component | Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|-----------------|----------------|-----------|---------------------|----------------------|"
+        mapping_instructions = "**MULTI-DEVICE** - Separate physical devices requiring unique identification."
+    elif controller_type == "joystick_only":
+        table_format = "| Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|----------------|-----------|---------------------|----------------------|"
+        mapping_instructions = "**JOYSTICK-ONLY** - Single joystick with limited controls."
+    elif controller_type == "gamepad":
+        table_format = "| Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|----------------|-----------|---------------------|----------------------|"
+        mapping_instructions = "**GAMEPAD** - Standard gamepad with dual sticks."
+    else:
+        table_format = "| HOTAS Component | Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|-----------------|----------------|-----------|---------------------|----------------------|"
+        mapping_instructions = ""
+
+    manual_excerpt_section = ""
+    if simulator_manual_text:
+        manual_excerpt_section = f"\nMANUAL EXCERPT:\n{simulator_manual_text}\n"
+
+    aircraft_manual_section = ""
+    if inventory_text:
+        aircraft_manual_section = inventory_text[:token_budget.tokens_to_chars(allocation["aircraft_manual"])]
+    elif aircraft_text:
+        relevance_query = " ".join([retrieval.COMBAT_QUERY, aircraft_name, hotas_name, *hotas_devices.keys(),
+                                    *hotas_devices.values()])
+        aircraft_chars = token_budget.tokens_to_chars(allocation["aircraft_manual"])
+        aircraft_manual_section = f"Manual:\n{retrieval.relevant_text(aircraft_text, relevance_query, aircraft_chars)}"
+    else:
+        aircraft_manual_section = "Use standard combat aircraft controls."
+
+    controller_label = f"{hotas_name} - {controller_type.upper().replace('_', ' ')} ({len(hotas_devices)} device{'s' if len(hotas_devices) > 1 else ''})"
+    prompt = f"""## TASK: Generate a COMPLETE COMBAT-FOCUSED controller configuration for {aircraft_name} in {simulator}.
+
+## CONTROLLER TYPE:
+{controller_label}
+
+{template_section}
+
+{software_section}
+
+## RESPONSE FORMAT (3 parts):
+
+### Part 1: Complete Technical Mapping Table
+{table_format}
+
+{mapping_instructions}
+- Generate AT LEAST 30-40 comprehensive mappings
+- Device ID column: ONLY the identifier (JOY_Y, JOY_BTN1, etc.)
+- Cover ALL combat-critical controls
+{f"- Leverage {software_name} capabilities where applicable (note in Function & Rationale column)" if software_capable else ""}
+
+### Part 2: Installation Instructions
+{"Based on official documentation:" if simulator_manual_text else "Step-by-step installation:"}
+{manual_excerpt_section}- File location: {config_location}
+- How to load/import profile
+- Device detection & calibration
+- Testing & verification
+{f"- {software_name} setup steps (if applicable)" if software_capable else ""}
+
+### Part 3: COMPLETE Configuration Files
+{f"Generate {len(template_files)} COMPLETE configuration files following the template formats EXACTLY:" if template_files else f"Generate a COMPLETE {file_format.upper()} configuration file."}
+{chr(10).join(_template_file_line(idx, file_type, file_type in template_trees) for idx, file_type in enumerate(template_files))}
+
+⚠️ CRITICAL GENERATION REQUIREMENTS:
+- Generate the ENTIRE files from start to finish following the template structure
+- Do NOT truncate, abbreviate, or skip ANY sections
+- Include ALL necessary sections, headers, footers, and structural elements
+- Use the EXACT syntax and formatting from the templates
+- The files MUST be immediately usable without any modifications
+- Match the template length and completeness
+{f"- Include {software_name} script code if beneficial for combat effectiveness" if software_capable and software_manual_text else ""}
+
+---
+## HARDWARE:
+{hotas_name}
+{devices_text}
+
+## AIRCRAFT:
+{aircraft_name}
+{aircraft_manual_section}
+
+---
+
+## FINAL CRITICAL REQUIREMENTS:
+1. ✅ COMPLETE table (30-40+ rows minimum)
+2. ✅ Device ID column - identifier ONLY
+3. ✅ Physical input - exact names from manuals
+4. ✅ ACCURATE installation from manual
+5. ✅ COMPLETE, UNTRUNCATED configuration files (NO ABBREVIATIONS)
+6. ✅ Follow template format EXACTLY if provided
+7. ✅ COMBAT-focused prioritization
+8. ✅ ALL buttons and axes mapped
+{f"9. ✅ Leverage {software_name} for enhanced capabilities" if software_capable else ""}
+
+Generate the COMPLETE response now. Do not truncate, abbreviate, or skip any sections of the configuration files."""
+
+    return {
+        "model": model,
+        "prompt": prompt,
+        "images": prompt_images,
+        "template_files": template_files,
+        "template_trees": template_trees,
+        "simulator": simulator,
+        "file_format": file_format,
+        "config_location": config_location,
+        "aircraft_name": aircraft_name,
+        "hotas_name": hotas_name,
+        "controller_type": controller_type,
+        "controller_label": controller_label,
+        "software_capable": software_capable,
+        "software_name": software_name,
+        "software_section": software_section,
+        "devices_text": devices_text,
+        "aircraft_manual_section": aircraft_manual_section,
+        "manual_excerpt_section": manual_excerpt_section,
+        "simulator_manual_text": simulator_manual_text,
+        "table_format": table_format,
+        "mapping_instructions": mapping_instructions,
+    }
+
+
+def _contents(prompt, images=()):
+    content_parts = [types.Part.from_text(text=prompt)]
+    for img_data in images:
+        content_parts.append(types.Part.from_bytes(data=img_data['data'], mime_type=img_data['mime_type']))
+    return [types.Content(role="user", parts=content_parts)]
+
+
+def _generation_config(max_output_tokens=30000, response_schema=None):
+    if response_schema is not None:
+        return types.GenerateContentConfig(
+            temperature=0.7,
+            top_p=0.95,
+            max_output_tokens=max_output_tokens,
+            response_mime_type="application/json",
+            response_schema=response_schema,
+        )
+    return types.GenerateContentConfig(
+        temperature=0.7,
+        top_p=0.95,
+        max_output_tokens=max_output_tokens,
+    )
+
+
+def stream_generation(client, model, contents, config, use_response_cache=True, notify=_print_notify,
+                      on_progress=None, limiter=None, on_wait=None, on_chunk=None, on_stream_start=None, trace=None,
+                      stage_name="generation", cache_if=None):
+    """Stream one request (or replay it from the response cache) and return the full text; errors propagate.
+
+    A fresh response is cached only if cache_if(text) is true (always, without cache_if).
+
+    With a `trace` (see instrumentation), the request is recorded as `stage_name` with its cache outcome,
+    attempts, rate-limit wait, chunk and char counts, time to first chunk and decode rate.
+    """
+    with instrumentation.stage(trace, stage_name) as record:
+        timing = {}
+
+        def stream_start():
+            timing["start"] = time.perf_counter()
+            timing.pop("first_chunk", None)
+            record["attempts"] = record.get("attempts", 0) + 1
+            if on_stream_start:
+                on_stream_start()
+
+        def chunk_received(chunk_text):
+            timing.setdefault("first_chunk", time.perf_counter())
+            if on_chunk:
+                on_chunk(chunk_text)
+
+        cache_key = response_cache.cache_key(model, contents, config)
+        cached_chunks = response_cache.load(cache_key) if use_response_cache else None
+        record["cache"] = "bypass" if not use_response_cache else "hit" if cached_chunks is not None else "miss"
+        if cached_chunks is not None:
+            notify("caption", "♻️ Replaying cached response for identical inputs")
+            chunks = _consume_stream(iter(cached_chunks), on_progress, chunk_received, stream_start)
+        else:
+            def attempt():
+                if limiter:
+                    wait_start = time.perf_counter()
+                    limiter.acquire(on_wait)
+                    record["rate_limit_wait_ms"] = round(record.get("rate_limit_wait_ms", 0) +
+                                                         (time.perf_counter() - wait_start) * 1000, 1)
+                stream = client.models.generate_content_stream(model=model, contents=contents, config=config)
+                return _consume_stream((chunk.text for chunk in stream), on_progress, chunk_received, stream_start)
+
+            def on_retry(attempt_number, delay, error):
+                notify("warning", f"⚠️ API busy ({error}); retrying in {delay:.1f}s "
+                                  f"(attempt {attempt_number + 1} of {rate_limiter.MAX_ATTEMPTS})")
+
+            chunks = rate_limiter.call_with_retry(attempt, on_retry=on_retry)
+            # A bypassed request still refreshes the cached entry for next time.
+            if chunks and response_cache.ENABLED and (cache_if is None or cache_if("".join(chunks))):
+                response_cache.store(cache_key, chunks)
+
+        end = time.perf_counter()
+        record["chunks"] = len(chunks)
+        record["chars"] = sum(len(chunk_text) for chunk_text in chunks)
+        if "first_chunk" in timing:
+            record["ttfc_ms"] = round((timing["first_chunk"] - timing["start"]) * 1000, 1)
+            decode_seconds = end - timing["first_chunk"]
+            record["chars_per_sec"] = round(record["chars"] / decode_seconds) if decode_seconds > 0 else None
+        return "".join(chunks)
+
+
+def render_template_file(request, file_type, assignments_text, notify=_print_notify):
+    """Render one templated file from the model's JSON assignments; returns None if they cannot be read."""
+    try:
+        assignments = template_renderer.parse_assignments(assignments_text)
+    except ValueError as e:
+        notify("warning", f"⚠️ Could not read {file_type.upper()} assignments: {e}")
+        return None
+    rendered, rejected = template_renderer.render(request["template_files"][file_type],
+                                                  request["template_trees"][file_type], assignments)
+    notify("caption", f"Rendered {file_type.upper()} from template: {len(assignments) - len(rejected)} "
+                      f"assignments applied, {len(rejected)} rejected")
+    for assignment, reason in rejected[:5]:
+        notify("caption", f"Rejected {file_type.upper()} assignment {assignment.get('path')}/"
+                          f"{assignment.get('param')}: {reason}")
+    return rendered
+
+
+def render_templates(request, response_text, notify=_print_notify):
+    """Replace the JSON assignment blocks of templated files in a response with the rendered files.
+
+    A block goes to the template named by its "file" key, else to the next templated file still without
+    assignments. Blocks that hold no assignments (prose examples, other files) are left as they are.
+    """
+    file_types = list(request["template_files"])
+    pending = [file_type for file_type in file_types if file_type in request["template_trees"]]
+    matched = []
+    for start, end, lang, code in response_parser.code_blocks(response_text):
+        if lang in file_types:
+            # The model wrote the file out in full instead; keep it.
+            if lang in pending:
+                pending.remove(lang)
+            continue
+        if lang and lang != "json":
+            continue
+        try:
+            declared, _ = template_renderer.parse_assignment_block(code)
+        except ValueError:
+            continue
+        file_type = declared if declared else pending[0] if pending else None
+        if file_type not in pending:
+            continue
+        pending.remove(file_type)
+        matched.append((start, end, file_type, code))
+    for start, end, file_type, code in reversed(matched):
+        rendered = render_template_file(request, file_type, code, notify)
+        if rendered is not None:
+            response_text = f"{response_text[:start]}```{file_type}\n{rendered.strip()}\n```{response_text[end:]}"
+    return response_text
+
+
+def _generating_message(request):
+    template_files = request["template_files"]
+    controller_type_label = request["controller_type"].replace('_', ' ').title()
+    template_info = f" (using {len(template_files)} template{'s' if len(template_files) > 1 else ''})" if template_files else ""
+    return f" Generating {request['simulator']} {controller_type_label} configuration for {request['hotas_name']}{template_info}..."
+
+
+def generate_adaptive_config(client, aircraft_text, aircraft_images, controller_manuals, software_manual_text,
+                             software_manual_images, hotas_name, hotas_devices, aircraft_name, simulator,
+                             controller_type, software_capable, software_name, use_response_cache=True,
+                             notify=_print_notify, on_progress=None, limiter=None, on_wait=None, on_chunk=None,
+                             on_stream_start=None, trace=None, inventory=None):
+    """Build the prompt and stream the model's response; returns the full text, or None on failure.
+
+    `notify(level, message)` receives status messages ("info", "success", "warning", "error", "caption") and
+    `on_progress(char_count)` is called as chunks arrive, so the same pipeline serves the UI and the batch CLI.
+    With a `limiter` (see rate_limiter.get_limiter), each attempt waits for a token first and reports its
+    queue position through `on_wait(position, seconds)`; throttled and transient failures are retried.
+    `on_chunk(text)` receives each streamed chunk (e.g. for response_parser.StreamParser) and
+    `on_stream_start()` is called before each stream, so consumers can reset when a retry restarts it.
+    Files with a parseable template come back as JSON assignments and are rendered locally from the template
+    once the stream ends (see template_renderer), so `on_chunk` sees the assignments, not the file.
+    A `trace` (instrumentation.Trace) records the manual lookup, template loading, prompt build and stream.
+    An `inventory` from get_command_inventory replaces the aircraft manual in the prompt (two-stage mode).
+    """
+    with instrumentation.stage(trace, "prompt_build") as record:
+        request = build_request(aircraft_text, aircraft_images, controller_manuals, software_manual_text,
+                                software_manual_images, hotas_name, hotas_devices, aircraft_name, simulator,
+                                controller_type, software_capable, software_name, notify, trace, inventory)
+        record["prompt_chars"] = len(request["prompt"])
+        record["images"] = len(request["images"])
+    try:
+        notify("info", _generating_message(request))
+        response_text = stream_generation(client, request["model"], _contents(request["prompt"], request["images"]),
+                                          _generation_config(), use_response_cache, notify, on_progress, limiter,
+                                          on_wait, on_chunk, on_stream_start, trace)
+        if request["template_trees"]:
+            with instrumentation.stage(trace, "render_templates"):
+                response_text = render_templates(request, response_text, notify)
+        return response_text
+    except Exception as e:
+        notify("error", f"An error occurred during API call: {e}")
+        return None
+
+
+INVENTORY_TOKENS = 8000
+
+
+def get_command_inventory(client, aircraft_text, aircraft_images, aircraft_name, use_response_cache=True,
+                          notify=_print_notify, limiter=None, on_wait=None, trace=None):
+    """Stage 1 of two-stage generation: the aircraft's command inventory (see command_inventory).
+
+    Cached by the extracted manual's content hash, so every controller and simulator variant for the same
+    manual reuses one extraction. Returns None when there is no manual or the inventory cannot be produced;
+    callers then fall back to sending the manual itself.
+    """
+    if not aircraft_text:
+        return None
+    key = command_inventory.manual_key(aircraft_text, aircraft_images)
+    with instrumentation.stage(trace, "command_inventory") as record:
+        inventory = command_inventory.load(key)
+        record["cache"] = "hit" if inventory is not None else "miss"
+        if inventory is None:
+            notify("info", f" Extracting the command inventory for {aircraft_name}...")
+            prompt = command_inventory.inventory_prompt(aircraft_name, command_inventory.manual_excerpt(
+                aircraft_text, aircraft_name))
+            try:
+                text = stream_generation(client, MODEL, _contents(prompt, list(aircraft_images or [])[:AIRCRAFT_IMAGE_BUDGET]),
+                                         _generation_config(INVENTORY_TOKENS, command_inventory.INVENTORY_SCHEMA),
+                                         use_response_cache, notify, limiter=limiter, on_wait=on_wait, trace=trace,
+                                         stage_name="generation:inventory")
+                inventory = command_inventory.parse_inventory(text)
+            except Exception as e:
+                notify("warning", f"⚠️ Could not extract a command inventory, sending the manual instead: {e}")
+                record["error"] = str(e)[:200]
+                return None
+            command_inventory.store(key, inventory)
+        record["commands"] = len(inventory["commands"])
+    notify("caption", f"Command inventory: {len(inventory['commands'])} commands "
+                      f"({'cached' if record['cache'] == 'hit' else 'extracted'})")
+    return inventory
+
+
+MAPPING_SECTION_TOKENS = 8000
+INSTALLATION_SECTION_TOKENS = 4000
+FILE_SECTION_TOKENS = 24000
+ASSIGNMENT_SECTION_TOKENS = 4000
+SECTION_POLL_SECONDS = 0.2
+
+
+def _section_context(request):
+    return f"""## CONTROLLER TYPE:
+{request['controller_label']}
+
+{request['software_section']}
+
+---
+## HARDWARE:
+{request['hotas_name']}
+{request['devices_text']}
+
+## AIRCRAFT:
+{request['aircraft_name']}
+{request['aircraft_manual_section']}"""
+
+
+def _mapping_prompt(request):
+    software_name = request["software_name"]
+    return f"""## TASK: Generate the COMPLETE COMBAT-FOCUSED control mapping table for {request['aircraft_name']} in {request['simulator']}.
+## SECTION: mapping
+
+{_section_context(request)}
+
+---
+
+## RESPONSE FORMAT:
+Respond with ONLY the markdown table below (header row, separator row, one row per mapping), no headings or commentary.
+{request['table_format']}
+
+{request['mapping_instructions']}
+- Generate AT LEAST 30-40 comprehensive mappings
+- Device ID column: ONLY the identifier (JOY_Y, JOY_BTN1, etc.)
+- Physical input: exact names from the manuals
+- Cover ALL combat-critical controls; ALL buttons and axes mapped
+{f"- Leverage {software_name} capabilities where applicable (note in Function & Rationale column)" if request['software_capable'] else ""}"""
+
+
+def _installation_prompt(request, file_names):
+    software_name = request["software_name"]
+    return f"""## TASK: Write installation instructions for a {request['simulator']} controller profile for {request['aircraft_name']}.
+## SECTION: installation
+
+## CONTROLLER:
+{request['controller_label']}
+{request['hotas_name']}
+
+## FILES TO INSTALL:
+{chr(10).join(f"- {name}" for name in file_names)}
+
+## RESPONSE FORMAT:
+Respond with ONLY a numbered list of steps, no headings.
+{"Based on official documentation:" if request['simulator_manual_text'] else "Step-by-step installation:"}
+{request['manual_excerpt_section']}- File location: {request['config_location']}
+- How to load/import profile
+- Device detection & calibration
+- Testing & verification
+{f"- {software_name} setup steps (if applicable)" if request['software_capable'] else ""}"""
+
+
+def _file_prompt(request, file_type, template, mapping_table):
+    aircraft_name = request["aircraft_name"]
+    simulator = request["simulator"]
+    software_name = request["software_name"]
+    template_section = ""
+    if template is not None:
+        template_section = f"""
+## 📋 CONFIGURATION TEMPLATE (CRITICAL - FOLLOW EXACTLY):
+**File Type:** {file_type} format for {simulator}
+**Template Length:** {len(template)} characters
+**EXACT STRUCTURE TO FOLLOW:**
+```
+{template}
+```
+Copy the EXACT structure, nesting, syntax, sectioning, naming and formatting of the template. Keep device IDs,
+axis ranges and button numbers; replace only the control assignments with the mappings below.
+"""
+    return f"""## TASK: Generate a COMPLETE {file_type.upper()} configuration file for {aircraft_name} in {simulator}.
+## SECTION: file:{file_type}
+
+## CONTROLLER TYPE:
+{request['controller_label']}
+{template_section}
+## MAPPINGS TO IMPLEMENT (every row must appear in the file):
+{mapping_table}
+
+## RESPONSE FORMAT:
+Respond with ONLY the file inside a single ```{file_type} fenced code block.
+- Generate the ENTIRE file from start to finish; do NOT truncate, abbreviate, or skip ANY sections
+- The file MUST be immediately usable without any modifications
+{f"- Include {software_name} script code if beneficial for combat effectiveness" if request['software_capable'] and request['software_section'] else ""}"""
+
+
+def _assignments_prompt(request, file_type, mapping_table):
+    return f"""## TASK: Bind the {file_type.upper()} template for {request['aircraft_name']} in {request['simulator']}.
+## SECTION: assignments:{file_type}
+
+## CONTROLLER TYPE:
+{request['controller_label']}
+
+## TEMPLATE (bindable blocks and current values):
+```
+{template_renderer.describe_slots(request['template_trees'][file_type])}
+```
+{_ASSIGNMENT_INSTRUCTIONS.format(aircraft_name=request['aircraft_name'])}
+## MAPPINGS TO IMPLEMENT:
+{mapping_table}
+
+## RESPONSE FORMAT:
+Respond with ONLY the JSON list of assignments."""
+
+
+def _file_types(request):
+    template_files = request["template_files"]
+    if template_files:
+        return [(file_type, content) for file_type, content in template_files.items()]
+    return [(request["file_format"], None)]
+
+
+def generate_sectioned_config(client, aircraft_text, aircraft_images, controller_manuals, software_manual_text,
+                              software_manual_images, hotas_name, hotas_devices, aircraft_name, simulator,
+                              controller_type, software_capable, software_name, use_response_cache=True,
+                              notify=_print_notify, on_progress=None, limiter=None, on_wait=None, on_chunk=None,
+                              on_stream_start=None, max_workers=None, trace=None, inventory=None):
+    """Generate the same three-part response as generate_adaptive_config, split into concurrent requests.
+
+    The mapping table is streamed first (with the manual images); the installation guide and one request per
+    configuration file then run in parallel, each conditioned on the finished table, so the wall time is the
+    table plus the slowest of the rest instead of the sum of every part. Callbacks have the same meaning as
+    in generate_adaptive_config and are only ever called from the calling thread; parallel sections reach
+    `on_chunk` whole, in document order, as each one completes. Files with a parseable template are requested
+    as schema-constrained JSON assignments and rendered locally. Returns the merged text, or None on failure.
+    """
+    with instrumentation.stage(trace, "prompt_build") as record:
+        request = build_request(aircraft_text, aircraft_images, controller_manuals, software_manual_text,
+                                software_manual_images, hotas_name, hotas_devices, aircraft_name, simulator,
+                                controller_type, software_capable, software_name, notify, trace, inventory)
+        record["prompt_chars"] = len(request["prompt"])
+        record["images"] = len(request["images"])
+    model = request["model"]
+    mapping_heading = "### Part 1: Complete Technical Mapping Table\n\n"
+
+    def start_mapping():
+        if on_stream_start:
+            on_stream_start()
+        if on_chunk:
+            on_chunk(mapping_heading)
+
+    try:
+        notify("info", _generating_message(request) + " (sectioned)")
+        mapping_table = stream_generation(client, model, _contents(_mapping_prompt(request), request["images"]),
+                                          _generation_config(MAPPING_SECTION_TOKENS), use_response_cache, notify,
+                                          on_progress, limiter, on_wait, on_chunk, start_mapping, trace,
+                                          "generation:mapping")
+        # Kept exactly as streamed so the merged text matches what on_chunk has already seen.
+        mapping_text = mapping_heading + mapping_table
+        mapping_table = mapping_table.strip()
+
+        sim_info = SIMULATOR_CONFIGS.get(simulator, {})
+        file_types = _file_types(request)
+        file_names = []
+        for idx in range(len(file_types)):
+            file_ext, file_suffix, _ = response_parser.file_naming(simulator, hotas_name, sim_info, idx)
+            file_names.append(response_parser.profile_file_name(aircraft_name, hotas_name, file_suffix, file_ext))
+        tasks = [("installation", _installation_prompt(request, file_names), INSTALLATION_SECTION_TOKENS, None)]
+        for file_type, template in file_types:
+            if file_type in request["template_trees"]:
+                tasks.append((file_type, _assignments_prompt(request, file_type, mapping_table),
+                              ASSIGNMENT_SECTION_TOKENS, template_renderer.ASSIGNMENTS_SCHEMA))
+            else:
+                tasks.append((file_type, _file_prompt(request, file_type, template, mapping_table),
+                              FILE_SECTION_TOKENS, None))
+
+        # Worker threads must not touch the UI: they record progress and messages for this thread to relay.
+        section_chars = {}
+        messages = []
+
+        def run_section(name, prompt, max_output_tokens, response_schema):
+            return stream_generation(client, model, _contents(prompt),
+                                     _generation_config(max_output_tokens, response_schema),
+                                     use_response_cache, lambda level, message: messages.append((level, message)),
+                                     lambda char_count: section_chars.__setitem__(name, char_count), limiter,
+                                     trace=trace, stage_name=f"generation:{name}")
+
+        def relay():
+            while messages:
+                notify(*messages.pop(0))
+            if on_progress:
+                on_progress(len(mapping_text) + sum(section_chars.values()))
+
+        parts = []
+        with ThreadPoolExecutor(max_workers=max_workers or len(tasks)) as pool:
+            futures = [pool.submit(run_section, *task) for task in tasks]
+            for idx, future in enumerate(futures):
+                while not wait([future], timeout=SECTION_POLL_SECONDS).done:
+                    relay()
+                relay()
+                if idx == 0:
+                    part = f"\n\n### Part 2: Installation Instructions\n\n{future.result().strip()}\n\n"
+                elif tasks[idx][0] in request["template_trees"]:
+                    lang = tasks[idx][0]
+                    code = render_template_file(request, lang, future.result(), notify)
+                    if code is None:
+                        raise template_renderer.TemplateError(f"no usable {lang.upper()} assignments")
+                    code = code.strip()
+                else:
+                    lang, code = response_parser.first_code_block(future.result())
+                if idx > 0:
+                    part = ("### Part 3: COMPLETE Configuration Files\n\n" if idx == 1 else "") + \
+                        f"```{lang or tasks[idx][0]}\n{code}\n```\n\n"
+                parts.append(part)
+                if on_chunk:
+                    on_chunk(part)
+        return mapping_text + "".join(parts)
+    except Exception as e:
+        notify("error", f"An error occurred during API call: {e}")
+        return None
+
+
+REPAIR_CONTEXT_LINES = 20
+REPAIR_TAIL_LINES = 60
+REPAIR_SECTION_TOKENS = 4000
+REPAIR_FILE_TOKENS = 16000
+
+
+def _repair_prompt(task, simulator, aircraft_name, file, issues, excerpt, mapping_section):
+    issue_lines = "\n".join(f"- {config_validators.format_issue(issue)}" for issue in issues)
+    return f"""## TASK: {task}
+## SECTION: repair
+
+The {file['file_type_name']} configuration file for {aircraft_name} in {simulator} failed validation:
+{issue_lines}
+
+{excerpt}
+
+## MAPPINGS THE FILE IMPLEMENTS:
+{mapping_section or "(not available)"}
+
+## RESPONSE FORMAT:
+Respond with ONLY a single ```{file['lang']} fenced code block. Do not repeat anything outside the requested lines."""
+
+
+def repair_file(client, file, issues, mapping_section, simulator, aircraft_name, use_response_cache=True,
+                notify=_print_notify, limiter=None, on_wait=None, trace=None):
+    """Ask for the smallest fix for a file that failed validation; returns the repaired code or None.
+
+    A truncated file is continued from its last lines, an error on a known line has only the surrounding
+    lines rewritten, and anything else has the file (without the manuals) regenerated.
+    """
+    file_format = file["file_ext"].lstrip(".")
+    code_lines = file["code"].splitlines()
+    first_error = config_validators.errors(issues)[0]
+    if first_error["kind"] == "truncated":
+        tail = code_lines[-REPAIR_TAIL_LINES:]
+        task = "Continue the truncated file below exactly where it stops and finish it."
+        excerpt = f"## LAST {len(tail)} LINES OF THE FILE:\n```{file['lang']}\n" + "\n".join(tail) + "\n```\n" \
+                  "Return ONLY the missing remainder, starting right after the last line shown."
+        max_output_tokens = REPAIR_FILE_TOKENS
+    elif first_error["line"]:
+        start = max(0, first_error["line"] - 1 - REPAIR_CONTEXT_LINES)
+        end = min(len(code_lines), first_error["line"] + REPAIR_CONTEXT_LINES)
+        task = f"Fix lines {start + 1}-{end} of the file below."
+        excerpt = f"## LINES {start + 1}-{end} OF THE FILE:\n```{file['lang']}\n" + \
+                  "\n".join(code_lines[start:end]) + "\n```\n" \
+                  "Return the corrected replacement for exactly these lines."
+        max_output_tokens = REPAIR_SECTION_TOKENS
+    else:
+        task = "Rewrite the file below so it is valid and complete."
+        excerpt = f"## FILE:\n```{file['lang']}\n{file['code']}\n```"
+        max_output_tokens = REPAIR_FILE_TOKENS
+
+    def splice(response_text):
+        _, fix = response_parser.first_code_block(response_text)
+        if first_error["kind"] == "truncated":
+            return file["code"] + "\n" + fix
+        if first_error["line"]:
+            return "\n".join(code_lines[:start] + fix.splitlines() + code_lines[end:])
+        return fix
+
+    def remaining_errors(repaired):
+        return config_validators.errors(config_validators.check_syntax(file_format, repaired))
+
+    prompt = _repair_prompt(task, simulator, aircraft_name, file, issues, excerpt, mapping_section)
+    try:
+        # A fix that does not validate is not cached, so a retry asks the model again instead of replaying it.
+        response_text = stream_generation(client, MODEL, _contents(prompt),
+                                          _generation_config(max_output_tokens), use_response_cache, notify,
+                                          limiter=limiter, on_wait=on_wait, trace=trace,
+                                          stage_name=f"repair:{first_error['kind']}",
+                                          cache_if=lambda text: not remaining_errors(splice(text)))
+    except Exception as e:
+        notify("warning", f"⚠️ Repair request for {file['file_type_name']} failed: {e}")
+        return None
+    repaired = splice(response_text)
+    remaining = remaining_errors(repaired)
+    if remaining:
+        notify("warning", f"⚠️ Repair did not fix {file['file_type_name']}: "
+                          f"{config_validators.format_issue(remaining[0])}")
+        return None
+    notify("success", f"🔧 Repaired {file['file_type_name']} with a {len(response_text)}-character fix instead of a "
+                      f"full regeneration")
+    return repaired
+
+
+def repair_response(client, response_text, simulator, hotas_name, aircraft_name, use_response_cache=True,
+                    notify=_print_notify, limiter=None, on_wait=None, trace=None):
+    """Validate every file in a finished response and splice in repairs for the ones with errors."""
+    sim_info = SIMULATOR_CONFIGS.get(simulator, {})
+    with instrumentation.stage(trace, "validate") as record:
+        profile = response_parser.parse_profile(response_text, simulator, hotas_name, sim_info, aircraft_name)
+        validation = config_validators.validate_profile(profile, hotas_name)
+        record["files"] = len(profile["files"])
+        record["errors"] = sum(len(config_validators.errors(issues)) for issues in validation["files"].values())
+    blocks = response_parser.code_blocks(response_text)
+    for file in reversed(profile["files"]):
+        issues = validation["files"][file["index"]]
+        if not config_validators.errors(issues):
+            continue
+        notify("warning", f"⚠️ {file['file_type_name']} failed validation: "
+                          f"{config_validators.format_issue(config_validators.errors(issues)[0])}")
+        repaired = repair_file(client, file, issues, profile["mapping_section"], simulator, aircraft_name,
+                               use_response_cache, notify, limiter, on_wait, trace)
+        if repaired is None:
+            continue
+        start, end, lang, _ = blocks[file["index"]]
+        response_text = f"{response_text[:start]}```{lang or file['lang']}\n{repaired.strip()}\n```{response_text[end:]}"
+    return response_text
@@ -0,0 +1,97 @@
+"""Per-stage timing and resource counters for one generation run.
+
+A Trace collects one record per stage (duration, offset from the start of the run, peak RSS and whatever
+counts the stage adds); the UI shows it in the diagnostics expander and emit() appends it to a JSON-lines
+log, one line per stage, so runs can be aggregated later:
+    jq -s 'group_by(.stage) | map({stage: .[0].stage, p50_ms: (map(.duration_ms) | sort | .[length / 2 | floor])})' .cache/diagnostics.jsonl
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LOG_PATH = os.environ.get("GAMECHANGER_DIAGNOSTICS_LOG", os.path.join(".cache", "diagnostics.jsonl"))
+
+_log_lock = threading.Lock()
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return round(usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024, 1)
+
+
+class Trace:
+    """Stage records for one run; safe to use from worker threads."""
+
+    def __init__(self, **context):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.context = context
+        self.started = time.perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time a block; the yielded dict takes extra fields (counts, sizes) to store with the record."""
+        record = {"stage": name, **fields}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            end = time.perf_counter()
+            record["offset_ms"] = round((start - self.started) * 1000, 1)
+            record["duration_ms"] = round((end - start) * 1000, 1)
+            record["peak_rss_mb"] = peak_rss_mb()
+            with self._lock:
+                self.stages.append(record)
+
+    def total_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def rows(self):
+        """Stage records in start order, for display."""
+        with self._lock:
+            return sorted(self.stages, key=lambda record: record["offset_ms"])
+
+    def emit(self, path=None):
+        """Append one JSON line per stage plus a "total" line; an empty LOG_PATH disables logging."""
+        path = LOG_PATH if path is None else path
+        if not path:
+            return
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        lines = [{"ts": timestamp, "run_id": self.run_id, **self.context, **record} for record in self.rows()]
+        lines.append({"ts": timestamp, "run_id": self.run_id, **self.context, "stage": "total",
+                      "duration_ms": self.total_ms(), "peak_rss_mb": peak_rss_mb()})
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with _log_lock, open(path, "a", encoding="utf-8") as f:
+                for line in lines:
+                    f.write(json.dumps(line, default=str) + "\n")
+        except OSError as e:
+            print(f"Could not write diagnostics log {path}: {e}")
+
+
+@contextmanager
+def stage(trace, name, **fields):
+    """Trace.stage when a trace is given, otherwise a no-op that still yields a dict to fill in."""
+    if trace is None:
+        yield dict(fields)
+        return
+    with trace.stage(name, **fields) as record:
+        yield record
@@ -1,12 +1,18 @@
 import streamlit as st
 import os
-from google import genai
-from google.genai import types
-import fitz
-from PIL import Image
-import io
-import re
-import base64
+import background_extraction
+import client_pool
+import config_validators
+import exporters
+import generation_jobs
+import instrumentation
+import pdf_cache
+import response_cache
+import generator
+import rate_limiter
+import response_parser
+import uploads
+from configs import SIMULATOR_CONFIGS, HOTAS_COMPONENTS
 
 st.set_page_config(page_title="GAMECHANGER - AI Enabled Controller Configurations", page_icon="✈️", layout="wide")
 
@@ -22,10 +28,18 @@ Generate **ready-to-use** controller profiles for any flight simulator. Automati
 col_title, col_reset = st.columns([5, 1])
 with col_reset:
     if st.button(" Start New", type="secondary", use_container_width=True, help="Clear all and start fresh"):
+        if 'upload_dir' in st.session_state:
+            uploads.clear_session(st.session_state.upload_dir)
         for key in list(st.session_state.keys()):
             del st.session_state[key]
+        st.query_params.clear()
         st.rerun()
 
+if 'upload_dir' not in st.session_state:
+    # Uploads are spooled here and opened by path; directories of sessions that have gone away are swept.
+    uploads.sweep()
+    st.session_state.upload_dir = uploads.session_dir()
+
 st.markdown("---")
 
 st.subheader(" Google Gemini API Configuration")
@@ -51,10 +65,11 @@ with col_key2:
     if st.button("✅ Validate Key", use_container_width=True):
         if user_api_key:
             try:
-                test_client = genai.Client(api_key=user_api_key)
+                client_pool.get_client(user_api_key)
                 st.session_state.api_key = user_api_key
                 st.success("✅ API key validated successfully!")
             except Exception as e:
+                client_pool.discard(user_api_key)
                 st.error(f"❌ Invalid API key: {e}")
                 st.session_state.api_key = None
         else:
@@ -74,471 +89,263 @@ if not user_api_key:
     st.stop()
 
 try:
-    client = genai.Client(api_key=user_api_key)
+    # Shared across reruns and sessions, so its HTTP connections are reused.
+    client = client_pool.get_client(user_api_key)
 except Exception as e:
     st.error(f"Error configuring Gemini API: {e}")
     st.stop()
 
 st.markdown("---")
 
-SIMULATOR_CONFIGS = {
-    "DCS World": {
-        "file_format": "lua",
-        "file_extension": ".lua",
-        "config_location": "Saved Games/DCS/Config/Input/",
-        "description": "Lua script with device tables and command assignments",
-        "multi_device_support": True,
-        "user_manual": "DCS_User_Manual_EN_2020.pdf"
-    },
-    "Microsoft Flight Simulator 2020": {
-        "file_format": "xml",
-        "file_extension": ".xml",
-        "config_location": "AppData/Local/Packages/Microsoft.FlightSimulator_*/LocalCache/",
-        "description": "XML profile with action mappings",
-        "multi_device_support": True,
-    },
-    "IL-2 Sturmovik": {
-        "file_format": "map",
-        "file_extension": ".map",
-        "config_location": "IL-2 Sturmovik Great Battles/data/input/",
-        "description": "Key=Value format with device IDs",
-        "multi_device_support": True,
-    },
-    "Falcon BMS": {
-        "file_format": "key",
-        "file_extension": ".key",
-        "config_location": "Falcon BMS 4.37/User/Config/",
-        "description": "Binary key file (text representation)",
-        "multi_device_support": True,
-    },
-    "War Thunder": {
-        "file_format": "blk",
-        "file_extension": ".blk",
-        "config_location": "War Thunder/UserPresets/",
-        "description": "Config format with axis and button assignments",
-        "multi_device_support": True,
-        "template_files": {
-            "Thrustmaster HOTAS Warthog": {
-                "blk": "War Thunder for Warthog TARGET mapping configuration_blk.txt",
-                "fcf": "War Thunder_fcf.txt"
-            }
-        }
-    },
-    "X-Plane 11/12": {
-        "file_format": "txt",
-        "file_extension": ".txt",
-        "config_location": "X-Plane 12/Output/preferences/",
-        "description": "Joystick configuration text file",
-        "multi_device_support": True,
-    },
-    "Elite Dangerous": {
-        "file_format": "binds",
-        "file_extension": ".binds",
-        "config_location": "AppData/Local/Frontier Developments/Elite Dangerous/Options/Bindings/",
-        "description": "XML bindings file",
-        "multi_device_support": True,
-    },
-    "Star Citizen": {
-        "file_format": "xml",
-        "file_extension": ".xml",
-        "config_location": "Star Citizen/LIVE/USER/Client/0/Controls/Mappings/",
-        "description": "ActionMaps XML format",
-        "multi_device_support": True,
-    },
-}
-
-HOTAS_COMPONENTS = {
-    "Thrustmaster HOTAS Warthog": {
-        "type": "multi_device",
-        "components": ["Flight Stick", "Throttle"],
-        "description": "A-10C replica HOTAS with separate stick and throttle units",
-        "software_capable": True,
-        "software_name": "TARGET Script Editor",
-        "devices": {
-            "Flight Stick": "Thrustmaster Hotas Warthog Joystick (Replica A-10C stick with multiple hats, two-stage trigger)",
-            "Throttle": "Thrustmaster Hotas Warthog Throttle (Dual throttles, slew control, multiple switches)"
-        }
-    },
-    "VelocityOne Flightstick": {
-        "type": "unified",
-        "components": ["Unified HOTAS"],
-        "description": "All-in-one HOTAS with integrated throttle levers",
-        "software_capable": False,
-        "devices": {
-            "Unified HOTAS": "Turtle Beach VelocityOne Flightstick (Stick + integrated throttles, analog TDC, trim wheel)"
-        }
-    },
-    "Thrustmaster T.16000M FCS": {
-        "type": "multi_device",
-        "components": ["Joystick", "Throttle", "Rudder Pedals (Optional)"],
-        "description": "Complete HOTAS setup with optional pedals",
-        "software_capable": True,
-        "software_name": "TARGET Script Editor",
-        "devices": {
-            "Joystick": "Thrustmaster T.16000M Joystick (Ambidextrous with 16 buttons)",
-            "Throttle": "Thrustmaster TWCS Throttle (Throttle with ministick, slider, 14 buttons)",
-            "Rudder Pedals (Optional)": "Thrustmaster TFRP Rudder Pedals"
-        }
-    },
-    "Logitech X56": {
-        "type": "multi_device",
-        "components": ["Joystick", "Throttle"],
-        "description": "Professional HOTAS with RGB and extensive controls",
-        "software_capable": True,
-        "software_name": "Logitech Gaming Software",
-        "devices": {
-            "Joystick": "Logitech X56 Stick (Multiple hats, analog ministick, RGB, 189 commands)",
-            "Throttle": "Logitech X56 Throttle (Dual throttles, multiple hats, RGB)"
-        }
-    },
-    "Winwing Orion 2 F/A-18": {
-        "type": "multi_device",
-        "components": ["Joystick", "Throttle", "Control Panel (Optional)"],
-        "description": "F/A-18 replica HOTAS with optional UFC panel",
-        "software_capable": True,
-        "software_name": "SimAppPro",
-        "devices": {
-            "Joystick": "Winwing Orion 2 F/A-18 Stick (1:1 scale F/A-18 grip)",
-            "Throttle": "Winwing Orion 2 F/A-18 Throttle (Dual throttles with TDC)",
-            "Control Panel (Optional)": "Winwing Super Taurus UFC"
-        }
-    },
-    "VKB Gladiator NXT + TWCS": {
-        "type": "multi_device",
-        "components": ["Joystick", "Throttle"],
-        "description": "Popular combo: VKB stick + Thrustmaster throttle",
-        "software_capable": True,
-        "software_name": "VKBDevCfg / TARGET Script Editor",
-        "devices": {
-            "Joystick": "VKB Gladiator NXT (High-precision with multiple hats)",
-            "Throttle": "Thrustmaster TWCS Throttle"
-        }
-    },
-    "Virpil Constellation": {
-        "type": "multi_device",
-        "components": ["Joystick", "Throttle", "Control Panel (Optional)"],
-        "description": "Premium modular HOTAS system",
-        "software_capable": True,
-        "software_name": "VPC Configuration Tool",
-        "devices": {
-            "Joystick": "Virpil VPC Constellation ALPHA Grip",
-            "Throttle": "Virpil VPC MongoosT-50CM3 Throttle",
-            "Control Panel (Optional)": "Virpil VPC Control Panel"
-        }
-    },
-    "Xbox Controller": {
-        "type": "gamepad",
-        "components": ["Gamepad"],
-        "description": "Xbox wireless controller with dual analog sticks",
-        "software_capable": False,
-        "devices": {
-            "Gamepad": "Xbox Wireless Controller (Dual analog sticks, triggers, face buttons, D-pad)"
-        }
-    },
-    "Logitech Extreme 3D Pro": {
-        "type": "joystick_only",
-        "components": ["Joystick"],
-        "description": "Single joystick with twist rudder and throttle slider",
-        "software_capable": False,
-        "devices": {
-            "Joystick": "Logitech Extreme 3D Pro (Twist rudder, throttle slider, 12 buttons)"
-        }
-    },
-}
-
 
-def extract_pdf_content(uploaded_file):
+def start_extraction(uploaded_file, max_chars=None, max_images=None):
+    """Hand an upload to the background extractor the first time this session sees it; returns its job."""
     if uploaded_file is None:
-        return None, []
-    try:
-        pdf_bytes = uploaded_file.read()
-        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-        text_content = ""
-        image_parts = []
-        for page_num in range(len(pdf_document)):
-            page = pdf_document[page_num]
-            page_text = page.get_text()
-            text_content += f"\n\n--- Page {page_num + 1} ---\n\n{page_text}"
-            image_list = page.get_images()
-            for img_index, img in enumerate(image_list):
-                try:
-                    xref = img[0]
-                    base_image = pdf_document.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    pil_image = Image.open(io.BytesIO(image_bytes))
-                    pil_image.thumbnail((800, 800), Image.Resampling.LANCZOS)
-                    buffered = io.BytesIO()
-                    pil_image.convert('RGB').save(buffered, format="JPEG", quality=85, optimize=True)
-                    img_base64 = base64.b64encode(buffered.getvalue()).decode()
-                    if len(img_base64) < 4 * 1024 * 1024:
-                        image_parts.append({'mime_type': 'image/jpeg', 'data': img_base64})
-                except Exception as e:
-                    print(f"Could not extract image {img_index} from page {page_num + 1}: {e}")
-        pdf_document.close()
-        return text_content, image_parts
-    except Exception as e:
-        st.error(f"Error reading PDF: {e}")
-        return None, []
+        return None
+    jobs = st.session_state.setdefault('extraction_jobs', {})
+    job_key = (uploaded_file.file_id, max_chars, max_images)
+    # Jobs are shared between sessions, and a shared job's spooled file can disappear with the session that
+    # submitted it (e.g. on "Start New"); such a job is submitted again from this session's upload.
+    if job_key not in jobs or (background_extraction.status(jobs[job_key]) == "failed" and
+                               isinstance(jobs[job_key]['future'].exception(), FileNotFoundError)):
+        try:
+            jobs[job_key] = background_extraction.submit(uploaded_file, st.session_state.upload_dir, max_chars,
+                                                         max_images)
+        except OSError as e:
+            st.error(f"Error reading PDF: {e}")
+            return None
+    return jobs[job_key]
+
+
+def _extraction_status_caption(job):
+    state = background_extraction.status(job)
+    if state == "running":
+        st.caption(f"⏳ Extracting {job['name']}...")
+    elif state == "failed":
+        st.caption(f"❌ Could not read {job['name']}: {job['future'].exception()}")
+    else:
+        text, images = background_extraction.result(job)
+        st.caption(f"✅ Ready: {len(text or '')} characters, {len(images)} images")
+
 
+@st.fragment(run_every=1)
+def _poll_extraction_status(job):
+    _extraction_status_caption(job)
 
-def load_simulator_manual(simulator):
-    sim_config = SIMULATOR_CONFIGS.get(simulator, {})
-    manual_file = sim_config.get("user_manual")
-    if manual_file and os.path.exists(manual_file):
+
+def show_extraction_status(job):
+    if job is None:
+        return
+    # Only unfinished jobs poll; a finished one is shown once per rerun.
+    if background_extraction.status(job) == "running":
+        _poll_extraction_status(job)
+    else:
+        _extraction_status_caption(job)
+
+
+def wait_for_extraction(job, notify, trace=None, stage_name="extract"):
+    """(text, images) for a background job, waiting only for whatever is still running."""
+    if job is None:
+        return None, []
+    with instrumentation.stage(trace, stage_name, bytes=job['bytes'],
+                               ready=background_extraction.status(job) != "running") as record:
         try:
-            with open(manual_file, 'rb') as f:
-                pdf_document = fitz.open(stream=f.read(), filetype="pdf")
-                text_content = ""
-                for page_num in range(min(len(pdf_document), 50)):
-                    page = pdf_document[page_num]
-                    page_text = page.get_text()
-                    if any(keyword in page_text.lower() for keyword in
-                           ['control', 'input', 'joystick', 'hotas', 'configuration', 'mapping']):
-                        text_content += f"\n\n--- Page {page_num + 1} ---\n\n{page_text}"
-                pdf_document.close()
-                return text_content[:5000]
+            text_content, images = background_extraction.result(job)
         except Exception as e:
-            print(f"Could not load simulator manual: {e}")
-            return None
-    return None
-
-
-def load_template_files(simulator, hotas_name):
-    """Load template configuration files if available for the simulator and controller combination."""
-    sim_config = SIMULATOR_CONFIGS.get(simulator, {})
-    template_files = sim_config.get("template_files", {})
-
-    if hotas_name in template_files:
-        templates = {}
-        for file_type, file_path in template_files[hotas_name].items():
-            if os.path.exists(file_path):
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        templates[file_type] = content
-                    st.success(f"✅ Loaded {file_type.upper()} template ({len(content)} chars): {file_path}")
-                except Exception as e:
-                    st.warning(f"⚠️ Could not load template {file_path}: {e}")
-            else:
-                st.warning(f"⚠️ Template file not found: {file_path}")
-        return templates
-    return {}
-
-
-def generate_adaptive_config(aircraft_text, aircraft_images, controller_manuals, software_manual_text,
-                             software_manual_images, hotas_name, hotas_devices, aircraft_name, simulator,
-                             controller_type, software_capable, software_name):
-    model = "gemini-2.0-flash-exp"
-    sim_config = SIMULATOR_CONFIGS.get(simulator, {})
-    file_format = sim_config.get("file_format", "txt")
-    config_location = sim_config.get("config_location", "")
-    simulator_manual_text = load_simulator_manual(simulator)
-
-    template_files = load_template_files(simulator, hotas_name)
-
-    device_descriptions = []
-    for component, device_desc in hotas_devices.items():
-        manual_info = controller_manuals.get(component, {})
-        manual_text = manual_info.get('text', 'No manual provided')
-        if manual_text and manual_text != 'No manual provided':
-            device_descriptions.append(
-                f"\n### {component}\n- Hardware: {device_desc}\n- Manual Content: {manual_text[:2000]}")
-        else:
-            device_descriptions.append(
-                f"\n### {component}\n- Hardware: {device_desc}\n- Manual Content: No manual provided")
-    devices_text = "\n".join(device_descriptions)
-
-    software_section = ""
-    if software_capable and software_manual_text:
-        software_section = f"""
-## CONTROLLER SOFTWARE CAPABILITIES:
-Software: {software_name}
-The controller supports advanced scripting and programming capabilities.
-
-Software Manual Content:
-{software_manual_text[:3000]}
-
-**IMPORTANT:** Generate configurations that leverage software capabilities like:
-- Multi-stage button presses
-- Conditional logic
-- Macros and sequences
-- Virtual button combinations
-- Axis curves and dead zones
-- Shift states and layers
-"""
-    elif software_capable:
-        software_section = f"""
-## CONTROLLER SOFTWARE CAPABILITIES:
-Software: {software_name}
-The controller supports advanced scripting (manual not provided, use general knowledge of {software_name}).
-"""
-
-    template_section = ""
-    if template_files:
-        template_section = "\n## 📋 CONFIGURATION TEMPLATES (CRITICAL - FOLLOW EXACTLY):\n\n"
-        template_section += f"**CRITICAL IMPORTANCE:** These templates show the EXACT format, syntax, and structure required for {simulator} configurations.\n"
-        template_section += f"You MUST replicate this format precisely for {aircraft_name}.\n\n"
-
-        for file_type, content in template_files.items():
-            template_section += f"### Template: {file_type.upper()} File Format\n"
-            template_section += f"**File Type:** {file_type} format for {simulator}\n"
-            template_section += f"**Template Length:** {len(content)} characters\n"
-            template_section += f"**EXACT STRUCTURE TO FOLLOW:**\n```\n{content}\n```\n\n"
-
-        template_section += f"""
-**🎯 CRITICAL TEMPLATE REQUIREMENTS:**
-1. ✅ Copy the EXACT structure, nesting, and hierarchy from the template above
-2. ✅ Use the SAME syntax for all entries (keys, values, brackets, semicolons)
-3. ✅ Maintain the SAME sectioning (axes{{}}, buttons{{}}, triggers{{}}, etc.)
-4. ✅ Follow the SAME naming conventions for controls
-5. ✅ Keep the SAME formatting style (indentation, spacing, line breaks)
-6. ✅ Generate a COMPLETE file with ALL sections present in the template
-7. ✅ Replace control assignments with ones appropriate for {aircraft_name}
-8. ✅ Ensure EVERY button/axis from the Thrustmaster HOTAS Warthog is mapped
-9. ✅ Match the device naming convention exactly as shown in template
-10. ✅ Preserve all structural elements like device IDs, axis ranges, button numbers
-
-**❌ DO NOT:**
-- Truncate or abbreviate any part of the configuration
-- Change the file structure or format from the template
-- Skip any sections that exist in the template
-- Invent new syntax not shown in the template
-- Alter the indentation or bracketing style
-- Modify device identification patterns
-
-**📝 GENERATION INSTRUCTIONS:**
-Follow the template structure line-by-line, section-by-section. Generate the COMPLETE configuration matching the template's format exactly while adapting the control assignments for {aircraft_name}'s specific combat needs.
-"""
-
-    if controller_type == "unified":
-        table_format = "| Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|----------------|-----------|---------------------|----------------------|"
-        mapping_instructions = "**UNIFIED DEVICE** - Single physical unit with all controls integrated."
-    elif controller_type == "multi_device":
-        table_format = "| HOTAS Component | Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|-----------------|----------------|-----------|---------------------|----------------------|"
-        mapping_instructions = "**MULTI-DEVICE** - Separate physical devices requiring unique identification."
-    elif controller_type == "joystick_only":
-        table_format = "| Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|----------------|-----------|---------------------|----------------------|"
-        mapping_instructions = "**JOYSTICK-ONLY** - Single joystick with limited controls."
-    elif controller_type == "gamepad":
-        table_format = "| Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|----------------|-----------|---------------------|----------------------|"
-        mapping_instructions = "**GAMEPAD** - Standard gamepad with dual sticks."
-    else:
-        table_format = "| HOTAS Component | Physical Input | Device ID | {simulator} Command | Function & Rationale |\n|-----------------|----------------|-----------|---------------------|----------------------|"
-        mapping_instructions = ""
+            notify("error", f"Error reading PDF: {e}")
+            record['error'] = str(e)[:200]
+            return None, []
+        record['extract_ms'] = round(job['seconds'] * 1000, 1)
+        record['chars'] = len(text_content or "")
+        record['images'] = len(images)
+        return text_content, images
+
+
+def notify(level, message):
+    getattr(st, level)(message)
+
+
+def show_live_output(parser, simulator, hotas_name, sim_info, aircraft_name):
+    """The mapping table and the files streamed so far; redrawn whole on every poll of a running job."""
+    if parser.table_rows:
+        st.markdown("\n".join(parser.table_rows))
+    for file in parser.files:
+        file_ext, file_suffix, file_type_name = response_parser.file_naming(simulator, hotas_name, sim_info,
+                                                                            file['index'])
+        if file['lang'] == "json" and sim_info['file_format'] != "json":
+            # Template assignments: the file itself is rendered once the response is complete.
+            st.caption(f"⚙️ Configuration File #{file['index'] + 1}: {file_type_name} assignments "
+                       f"received, rendering from template...")
+            continue
+        with st.expander(f"⚙️ Configuration File #{file['index'] + 1}: {file_type_name} ({len(file['code'])} chars)"):
+            st.code(file['code'], language=file['lang'] or sim_info['file_format'])
+        # on_click="ignore" keeps the download from rerunning the whole script mid-stream.
+        st.download_button(
+            f"📥 Download {file_type_name} File",
+            data=file['code'],
+            file_name=response_parser.profile_file_name(aircraft_name, hotas_name, file_suffix, file_ext),
+            mime="text/plain",
+            key=f"live_dl_btn_{file['index']}",
+            on_click="ignore"
+        )
+
 
-    manual_excerpt_section = ""
-    if simulator_manual_text:
-        manual_excerpt_section = f"\nMANUAL EXCERPT:\n{simulator_manual_text}\n"
+def run_generation(job, request):
+    """Body of a generation job. It runs on the generation_jobs pool, outside any script run, so it reports
+    through the job and returns the session state keys the results view reads."""
+    def job_notify(level, message):
+        generation_jobs.add_notice(job, level, message)
 
-    aircraft_manual_section = ""
+    trace = instrumentation.Trace(simulator=request['simulator'], hotas=request['hotas_name'],
+                                  mode="sectioned" if request['sectioned'] else "single",
+                                  two_stage=request['two_stage'])
+    generation_jobs.set_progress(job, "Reading manuals...")
+    aircraft_text, aircraft_images = wait_for_extraction(request['aircraft_job'], job_notify, trace,
+                                                         "extract:aircraft")
     if aircraft_text:
-        aircraft_manual_section = f"Manual:\n{aircraft_text[:12000]}"
+        job_notify("success", f"✅ Extracted aircraft manual: {len(aircraft_text)} characters, "
+                              f"{len(aircraft_images)} images")
+    controller_manuals = {}
+    for component, extraction in request['controller_jobs'].items():
+        text, images = wait_for_extraction(extraction, job_notify, trace, f"extract:{component}")
+        controller_manuals[component] = {'text': text, 'images': images}
+        if text:
+            job_notify("success", f"✅ Extracted {component} manual")
+    software_manual_text, software_manual_images = wait_for_extraction(request['software_job'], job_notify, trace,
+                                                                       "extract:software")
+    cache_stats = pdf_cache.get_stats()
+    job_notify("caption", f"Extraction cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
+    client = request['client']
+    limiter = rate_limiter.get_limiter(request['api_key'])
+    use_response_cache = request['use_response_cache']
+    aircraft_name = request['aircraft_name']
+    inventory = None
+    if request['two_stage']:
+        inventory = generator.get_command_inventory(
+            client, aircraft_text, aircraft_images, aircraft_name, use_response_cache=use_response_cache,
+            notify=job_notify, limiter=limiter, trace=trace)
+    generate = generator.generate_sectioned_config if request['sectioned'] else generator.generate_adaptive_config
+    full_response = generate(
+        client, aircraft_text, aircraft_images, controller_manuals, software_manual_text, software_manual_images,
+        request['hotas_name'], request['hotas_devices'], aircraft_name, request['simulator'],
+        request['controller_type'], request['software_capable'], request['software_name'],
+        use_response_cache=use_response_cache, notify=job_notify,
+        on_progress=lambda char_count: generation_jobs.set_progress(job, f"Generating... {char_count} characters"),
+        limiter=limiter,
+        on_wait=lambda position, wait: generation_jobs.set_progress(
+            job, f"⏳ Waiting for the API rate limit: position {position + 1} in queue, about {wait:.0f}s"),
+        on_stream_start=lambda: generation_jobs.start_stream(job),
+        on_chunk=lambda chunk_text: generation_jobs.add_output(job, chunk_text),
+        trace=trace, inventory=inventory)
+
+    result = {}
+    if full_response:
+        generation_jobs.set_progress(job, "Checking the generated files...")
+        # Files that fail local validation get a small repair request instead of a full regeneration.
+        full_response = generator.repair_response(
+            client, full_response, request['simulator'], request['hotas_name'], aircraft_name,
+            use_response_cache=use_response_cache, notify=job_notify, limiter=limiter, trace=trace)
+        with trace.stage("parse_profile") as record:
+            profile = response_parser.parse_profile(full_response, request['simulator'], request['hotas_name'],
+                                                    request['sim_info'], aircraft_name)
+            validation = config_validators.validate_profile(profile, request['hotas_name'])
+            record['files'] = len(profile['files'])
+        result = {
+            'generated_response': full_response,
+            'profile': profile,
+            'validation': validation,
+            'sim_info': request['sim_info'],
+            'aircraft_name': aircraft_name,
+            'selected_hotas': request['hotas_name'],
+            'selected_simulator': request['simulator'],
+            'controller_type': request['controller_type'],
+            'software_capable': request['software_capable'],
+            'software_name': request['software_name'],
+            'software_enhanced': bool(request['software_capable'] and software_manual_text),
+            'hotas_devices': request['hotas_devices'],
+        }
+    trace.emit()
+    result['diagnostics'] = {"run_id": trace.run_id, "rows": trace.rows(), "total_ms": trace.total_ms()}
+    return result
+
+
+def _forget_generation(keep_url=False):
+    st.session_state.pop('generation_job_id', None)
+    st.session_state.pop('generation_view', None)
+    if 'job' in st.query_params and not keep_url:
+        del st.query_params['job']
+
+
+def _show_generation_progress(job):
+    info = job['info']
+    if job['state'] == "queued":
+        st.info(f"⏳ Waiting for a free generation slot ({generation_jobs.queue_position(job)} ahead)...")
+    for level, message in generation_jobs.notices(job):
+        notify(level, message)
+    if job['progress']:
+        st.markdown(f"*{job['progress']}*")
+    # Only the output added since the last poll is parsed.
+    view = st.session_state.get('generation_view')
+    if view is None or view['id'] != job['id']:
+        view = {'id': job['id'], 'stream': 0, 'count': 0, 'parser': response_parser.StreamParser()}
+    stream, chunks, view['count'] = generation_jobs.output_since(job, view['stream'], view['count'])
+    if stream != view['stream']:
+        view['stream'] = stream
+        view['parser'] = response_parser.StreamParser()
+    for chunk_text in chunks:
+        view['parser'].feed(chunk_text)
+    st.session_state.generation_view = view
+    show_live_output(view['parser'], info['simulator'], info['hotas_name'], info['sim_info'], info['aircraft_name'])
+
+
+@st.fragment(run_every=1)
+def _poll_generation(job_id):
+    job = generation_jobs.get(job_id)
+    if job is None or job['state'] in ("done", "failed"):
+        # A full rerun picks up the result and renders the profile.
+        st.rerun()
+    _show_generation_progress(job)
+
+
+def _generation_job_id():
+    # The URL names the job after a reload, when the new session has no state yet.
+    return st.session_state.get('generation_job_id') or st.query_params.get('job')
+
+
+def generation_running():
+    job = generation_jobs.get(_generation_job_id() or "")
+    return job is not None and job['state'] in ("queued", "running")
+
+
+def show_generation_job():
+    """Reattach to this session's generation, poll it while it runs and adopt its result once it is done."""
+    job_id = _generation_job_id()
+    if not job_id or st.session_state.get('generation_adopted') == job_id:
+        return
+    job = generation_jobs.get(job_id)
+    if job is None:
+        st.warning("⚠️ This generation is no longer available (finished too long ago, or the server restarted). "
+                   "Please generate again.")
+        _forget_generation()
+    elif job['state'] == "failed":
+        for level, message in generation_jobs.notices(job):
+            notify(level, message)
+        st.error(f"❌ Failed to generate configuration: {job['error']}")
+        _forget_generation()
+    elif job['state'] == "done":
+        for key, value in job['result'].items():
+            st.session_state[key] = value
+        for level, message in generation_jobs.notices(job):
+            notify(level, message)
+        if 'profile' not in job['result']:
+            st.error("❌ Failed to generate configuration.")
+        # The URL keeps naming the job until the next one starts, so a reload adopts the result again.
+        st.session_state.generation_adopted = job_id
+        _forget_generation(keep_url=True)
     else:
-        aircraft_manual_section = "Use standard combat aircraft controls."
-
-    prompt = f"""## TASK: Generate a COMPLETE COMBAT-FOCUSED controller configuration for {aircraft_name} in {simulator}.
-
-## CONTROLLER TYPE:
-{hotas_name} - {controller_type.upper().replace('_', ' ')} ({len(hotas_devices)} device{'s' if len(hotas_devices) > 1 else ''})
-
-{template_section}
-
-{software_section}
-
-## RESPONSE FORMAT (3 parts):
-
-### Part 1: Complete Technical Mapping Table
-{table_format}
-
-{mapping_instructions}
-- Generate AT LEAST 30-40 comprehensive mappings
-- Device ID column: ONLY the identifier (JOY_Y, JOY_BTN1, etc.)
-- Cover ALL combat-critical controls
-{f"- Leverage {software_name} capabilities where applicable (note in Function & Rationale column)" if software_capable else ""}
-
-### Part 2: Installation Instructions
-{"Based on official documentation:" if simulator_manual_text else "Step-by-step installation:"}
-{manual_excerpt_section}- File location: {config_location}
-- How to load/import profile
-- Device detection & calibration
-- Testing & verification
-{f"- {software_name} setup steps (if applicable)" if software_capable else ""}
-
-### Part 3: COMPLETE Configuration Files
-{f"Generate {len(template_files)} COMPLETE configuration files following the template formats EXACTLY:" if template_files else f"Generate a COMPLETE {file_format.upper()} configuration file."}
-{f"- File 1: .blk format (controls configuration) - FOLLOW TEMPLATE EXACTLY" if 'blk' in template_files else ""}
-{f"- File 2: .fcf format (TARGET configuration) - FOLLOW TEMPLATE EXACTLY" if 'fcf' in template_files else ""}
-
-⚠️ CRITICAL GENERATION REQUIREMENTS:
-- Generate the ENTIRE files from start to finish following the template structure
-- Do NOT truncate, abbreviate, or skip ANY sections
-- Include ALL necessary sections, headers, footers, and structural elements
-- Use the EXACT syntax and formatting from the templates
-- The files MUST be immediately usable without any modifications
-- Match the template length and completeness
-{f"- Include {software_name} script code if beneficial for combat effectiveness" if software_capable and software_manual_text else ""}
-
----
-## HARDWARE:
-{hotas_name}
-{devices_text}
-
-## AIRCRAFT:
-{aircraft_name}
-{aircraft_manual_section}
-
----
-
-## FINAL CRITICAL REQUIREMENTS:
-1. ✅ COMPLETE table (30-40+ rows minimum)
-2. ✅ Device ID column - identifier ONLY
-3. ✅ Physical input - exact names from manuals
-4. ✅ ACCURATE installation from manual
-5. ✅ COMPLETE, UNTRUNCATED configuration files (NO ABBREVIATIONS)
-6. ✅ Follow template format EXACTLY if provided
-7. ✅ COMBAT-focused prioritization
-8. ✅ ALL buttons and axes mapped
-{f"9. ✅ Leverage {software_name} for enhanced capabilities" if software_capable else ""}
-
-Generate the COMPLETE response now. Do not truncate, abbreviate, or skip any sections of the configuration files."""
-
-    content_parts = [types.Part.from_text(text=prompt)]
-    if aircraft_images:
-        for img_data in aircraft_images[:5]:
-            content_parts.append(
-                types.Part.from_bytes(data=base64.b64decode(img_data['data']), mime_type=img_data['mime_type']))
-    for component, manual_data in controller_manuals.items():
-        if manual_data.get('images'):
-            for img_data in manual_data['images'][:2]:
-                content_parts.append(
-                    types.Part.from_bytes(data=base64.b64decode(img_data['data']), mime_type=img_data['mime_type']))
-    if software_manual_images:
-        for img_data in software_manual_images[:3]:
-            content_parts.append(
-                types.Part.from_bytes(data=base64.b64decode(img_data['data']), mime_type=img_data['mime_type']))
-
-    contents = [types.Content(role="user", parts=content_parts)]
-    generate_content_config = types.GenerateContentConfig(
-        temperature=0.7,
-        top_p=0.95,
-        max_output_tokens=30000,
-    )
-    try:
-        controller_type_label = controller_type.replace('_', ' ').title()
-        template_info = f" (using {len(template_files)} template{'s' if len(template_files) > 1 else ''})" if template_files else ""
-        st.info(f" Generating {simulator} {controller_type_label} configuration for {hotas_name}{template_info}...")
-        response_text = ""
-        response_placeholder = st.empty()
-        for chunk in client.models.generate_content_stream(model=model, contents=contents,
-                                                           config=generate_content_config):
-            if chunk.text:
-                response_text += chunk.text
-                response_placeholder.markdown(f"*Generating... {len(response_text)} characters*")
-        response_placeholder.empty()
-        return response_text
-    except Exception as e:
-        st.error(f"An error occurred during API call: {e}")
-        return None
+        st.session_state.generation_job_id = job_id
+        _poll_generation(job_id)
 
 
 st.subheader("⚙️ Configuration Setup")
@@ -559,6 +366,9 @@ with col1:
     st.markdown("### 2️⃣ Upload Aircraft Manual")
     aircraft_pdf = st.file_uploader(" Upload Aircraft Manual (PDF)", type="pdf", key="aircraft_pdf",
                                     help="Upload aircraft flight manual with cockpit diagrams")
+    # Extraction starts as soon as the file arrives, so generating only waits for whatever is left.
+    aircraft_job = start_extraction(aircraft_pdf, max_images=generator.AIRCRAFT_IMAGE_BUDGET)
+    show_extraction_status(aircraft_job)
 
 with col2:
     st.markdown("### 3️⃣ Select Controller Setup")
@@ -586,8 +396,7 @@ with col2:
 
 st.markdown("---")
 
-software_manual_text = None
-software_manual_images = []
+software_job = None
 
 if selected_hotas:
     hotas_info = HOTAS_COMPONENTS[selected_hotas]
@@ -605,12 +414,8 @@ if selected_hotas:
             help=f"Upload the {software_name} manual to enable advanced configuration features like macros, conditional logic, and multi-stage buttons"
         )
 
-        if software_pdf:
-            with st.spinner(f"Extracting {software_name} manual..."):
-                software_manual_text, software_manual_images = extract_pdf_content(software_pdf)
-                if software_manual_text:
-                    st.success(
-                        f"✅ Extracted {software_name} manual: {len(software_manual_text)} characters, {len(software_manual_images)} images")
+        software_job = start_extraction(software_pdf, generator.SOFTWARE_TEXT_BUDGET, generator.SOFTWARE_IMAGE_BUDGET)
+        show_extraction_status(software_job)
 
         st.markdown("---")
 
@@ -626,83 +431,76 @@ if selected_hotas:
             st.caption(description[:100] + ("..." if len(description) > 100 else ""))
             uploaded = st.file_uploader(f"Upload {component} manual", type="pdf", key=f"manual_{component}",
                                         label_visibility="collapsed")
-            controller_manuals[component] = {'file': uploaded}
+            controller_manuals[component] = {'file': uploaded, 'job': start_extraction(
+                uploaded, generator.CONTROLLER_TEXT_BUDGET, generator.CONTROLLER_IMAGE_BUDGET)}
+            show_extraction_status(controller_manuals[component]['job'])
     st.markdown("---")
 
+bypass_response_cache = st.checkbox("Bypass response cache", value=not response_cache.ENABLED,
+                                    help="Always call Gemini, even if an identical request was answered before")
+sectioned_generation = st.checkbox("Sectioned generation", value=False,
+                                   help="Generate the mapping table first, then the installation guide and each "
+                                        "configuration file as parallel requests (faster, uses more requests)")
+two_stage_generation = st.checkbox("Reuse aircraft command inventory", value=False,
+                                   help="Extract the aircraft's commands from its manual once, then map that "
+                                        "inventory for each controller and simulator (later variants send far "
+                                        "less input)")
+
 if st.button(" GENERATE PROFILE", type="primary", use_container_width=True,
-             disabled=not (selected_simulator and selected_hotas and aircraft_pdf)):
+             disabled=not (selected_simulator and selected_hotas and aircraft_pdf)
+             or generation_running()):
     if not selected_simulator or not selected_hotas or not aircraft_pdf:
         st.warning("⚠️ Please select simulator, controller, and upload aircraft manual.")
     else:
-        with st.spinner(" Analyzing documents and generating configuration..."):
-            aircraft_text, aircraft_images = extract_pdf_content(aircraft_pdf)
-            if aircraft_text:
-                st.success(
-                    f"✅ Extracted aircraft manual: {len(aircraft_text)} characters, {len(aircraft_images)} images")
-            for component, data in controller_manuals.items():
-                if data['file']:
-                    text, images = extract_pdf_content(data['file'])
-                    data['text'] = text
-                    data['images'] = images
-                    if text:
-                        st.success(f"✅ Extracted {component} manual")
-                else:
-                    data['text'] = None
-                    data['images'] = []
-            aircraft_name = "Aircraft from Manual"
-            hotas_info = HOTAS_COMPONENTS[selected_hotas]
-            software_capable = hotas_info.get('software_capable', False)
-            software_name = hotas_info.get('software_name', '')
-            full_response = generate_adaptive_config(aircraft_text, aircraft_images, controller_manuals,
-                                                     software_manual_text, software_manual_images, selected_hotas,
-                                                     hotas_devices, aircraft_name, selected_simulator, controller_type,
-                                                     software_capable, software_name)
-
-            if full_response:
-                st.session_state.generated_response = full_response
-                st.session_state.sim_info = sim_info
-                st.session_state.aircraft_name = aircraft_name
-                st.session_state.selected_hotas = selected_hotas
-                st.session_state.selected_simulator = selected_simulator
-                st.session_state.controller_type = controller_type
-                st.session_state.software_capable = software_capable
-                st.session_state.software_name = software_name
-                st.session_state.software_manual_text = software_manual_text
-                st.session_state.hotas_devices = hotas_devices
-            else:
-                st.error("❌ Failed to generate configuration.")
-
-if 'generated_response' in st.session_state:
-    full_response = st.session_state.generated_response
+        hotas_info = HOTAS_COMPONENTS[selected_hotas]
+        # Everything the job needs is captured now: it runs on the shared pool, past this script run.
+        request = {
+            'client': client,
+            'api_key': user_api_key,
+            'simulator': selected_simulator,
+            'sim_info': sim_info,
+            'hotas_name': selected_hotas,
+            'hotas_devices': hotas_devices,
+            'controller_type': controller_type,
+            'software_capable': hotas_info.get('software_capable', False),
+            'software_name': hotas_info.get('software_name', ''),
+            'aircraft_name': "Aircraft from Manual",
+            'aircraft_job': aircraft_job,
+            'software_job': software_job,
+            'controller_jobs': {component: data['job'] for component, data in controller_manuals.items()},
+            'use_response_cache': not bypass_response_cache,
+            'sectioned': sectioned_generation,
+            'two_stage': two_stage_generation,
+        }
+        try:
+            job = generation_jobs.submit(
+                lambda job: run_generation(job, request), label=f"{selected_hotas} / {selected_simulator}",
+                info={key: request[key] for key in ('simulator', 'sim_info', 'hotas_name', 'aircraft_name')})
+        except generation_jobs.QueueFull as e:
+            st.warning(f"⏳ The server is busy ({e}). Please try again in a minute.")
+        else:
+            st.session_state.generation_job_id = job['id']
+            # Kept in the URL so a reloaded page reattaches to the same generation.
+            st.query_params['job'] = job['id']
+
+show_generation_job()
+
+if 'profile' in st.session_state:
+    # Rendered from the profile parsed once at generation time; reruns never re-scan the response text.
+    profile = st.session_state.profile
     sim_info = st.session_state.sim_info
     aircraft_name = st.session_state.aircraft_name
     selected_hotas = st.session_state.selected_hotas
     controller_type = st.session_state.controller_type
     software_capable = st.session_state.software_capable
     software_name = st.session_state.software_name
-    software_manual_text = st.session_state.software_manual_text
+    software_enhanced = st.session_state.software_enhanced
     hotas_devices = st.session_state.hotas_devices
 
     st.success("✅ Profile generated successfully!")
 
     # Debug: Show response length
-    st.info(f"📊 Generated response: {len(full_response)} characters")
-
-    # Try multiple regex patterns for code blocks
-    code_blocks = []
-
-    # Pattern 1: Standard triple backticks with optional language
-    pattern1 = re.finditer(r"```(\w+)?\s*\n(.*?)\n```", full_response, re.DOTALL)
-    code_blocks.extend(list(pattern1))
-
-    # Pattern 2: Code blocks without language specifier
-    if not code_blocks:
-        pattern2 = re.finditer(r"```\s*\n(.*?)\n```", full_response, re.DOTALL)
-        for match in pattern2:
-            code_blocks.append(match)
-
-    sections = full_response.split("###")
-    displayed_sections = set()
+    st.info(f"📊 Generated response: {profile['response_chars']} characters")
 
     type_labels = {'unified': 'Unified Device', 'multi_device': 'Multi-Device Setup',
                    'joystick_only': 'Single Joystick', 'gamepad': 'Gamepad'}
@@ -710,76 +508,52 @@ if 'generated_response' in st.session_state:
     st.markdown("---")
 
     # Display mapping table
-    for section in sections:
-        if "mapping" in section.lower() and "|" in section and "mapping_table" not in displayed_sections:
-            st.subheader(f"✈️ {aircraft_name} - {selected_hotas}")
-            caption_text = f"{type_labels.get(controller_type, 'Controller')} Configuration for {st.session_state.get('selected_simulator', 'Flight Simulator')}"
-            if software_capable and software_manual_text:
-                caption_text += f" | Enhanced with {software_name}"
-            st.caption(caption_text)
-            st.markdown("###" + section)
-            displayed_sections.add("mapping_table")
-            break
+    if profile['mapping_section']:
+        st.subheader(f"✈️ {aircraft_name} - {selected_hotas}")
+        caption_text = f"{type_labels.get(controller_type, 'Controller')} Configuration for {st.session_state.get('selected_simulator', 'Flight Simulator')}"
+        if software_enhanced:
+            caption_text += f" | Enhanced with {software_name}"
+        st.caption(caption_text)
+        st.markdown(profile['mapping_section'])
+        for issue in st.session_state.validation['mapping']:
+            st.caption(f"⚠️ {config_validators.format_issue(issue)}")
 
     st.markdown("---")
 
     # Display installation instructions
-    for section in sections:
-        if "installation" in section.lower() and "installation_instructions" not in displayed_sections:
-            st.subheader("📋 Installation Instructions")
-            st.markdown("###" + section)
-            displayed_sections.add("installation_instructions")
-            break
+    if profile['installation_section']:
+        st.subheader("📋 Installation Instructions")
+        st.markdown(profile['installation_section'])
 
     st.markdown("---")
 
     # Display configuration files
     st.subheader(f"⚙️ {st.session_state.get('selected_simulator', 'Flight Simulator')} Configuration File(s)")
     caption_text = "Ready to use - just download and install!"
-    if software_capable and software_manual_text:
+    if software_enhanced:
         caption_text += f" | Includes {software_name} optimizations"
     st.caption(caption_text)
 
     # Debug: Show what we found
-    st.info(f"🔍 Found {len(code_blocks)} code block(s)")
-
-    if code_blocks:
-        for idx, match in enumerate(code_blocks):
-            # Handle different match patterns
-            if match.lastindex == 2:  # Pattern with language
-                lang = match.group(1) or sim_info['file_format']
-                code = match.group(2).strip()
-            else:  # Pattern without language
-                lang = sim_info['file_format']
-                code = match.group(1).strip()
-
-            file_ext = sim_info['file_extension']
-            file_suffix = ""
-            file_type_name = file_ext
-
-            if st.session_state.get(
-                    'selected_simulator') == "War Thunder" and selected_hotas == "Thrustmaster HOTAS Warthog":
-                if idx == 0:
-                    file_ext = ".blk"
-                    file_suffix = "_controls"
-                    file_type_name = "BLK Controls"
-                elif idx == 1:
-                    file_ext = ".fcf"
-                    file_suffix = "_target"
-                    file_type_name = "FCF TARGET"
-
-            with st.expander(f"⚙️ Configuration File #{idx + 1}: {file_type_name} ({len(code)} chars)", expanded=True):
-                st.code(code, language=lang)
-                filename = f"{aircraft_name.replace('/', '-')}_{selected_hotas.replace(' ', '_')}_profile{file_suffix}{file_ext}"
+    st.info(f"🔍 Found {len(profile['files'])} code block(s)")
+
+    if profile['files']:
+        for file in profile['files']:
+            with st.expander(f"⚙️ Configuration File #{file['index'] + 1}: {file['file_type_name']} ({len(file['code'])} chars)", expanded=True):
+                st.code(file['code'], language=file['lang'])
+                for issue in st.session_state.validation['files'].get(file['index'], []):
+                    (st.error if issue['level'] == "error" else st.caption)(
+                        f"{'❌' if issue['level'] == 'error' else '⚠️'} {config_validators.format_issue(issue)}")
                 st.download_button(
-                    f"📥 Download {file_type_name} File",
-                    data=code,
-                    file_name=filename,
+                    f"📥 Download {file['file_type_name']} File",
+                    data=file['code'],
+                    file_name=file['file_name'],
                     mime="text/plain",
-                    key=f"dl_btn_{idx}",
+                    key=f"dl_btn_{file['index']}",
                     use_container_width=True
                 )
     else:
+        full_response = st.session_state.generated_response
         # No code blocks found - show raw response in expandable section
         st.warning("⚠️ No code blocks detected in response. Showing full output:")
         with st.expander("📄 Full AI Response", expanded=True):
@@ -794,10 +568,40 @@ if 'generated_response' in st.session_state:
             key="dl_raw_response"
         )
 
+    if profile['mapping_rows']:
+        st.markdown("---")
+        # Built locally from the mapping table: switching the target simulator costs no API call.
+        st.subheader("🔁 Export to Other Simulators")
+        generated_for = st.session_state.get('selected_simulator')
+        export_simulator = st.selectbox("Target simulator:",
+                                        options=[name for name in SIMULATOR_CONFIGS if name != generated_for],
+                                        key="export_simulator")
+        exported = exporters.export(profile, export_simulator, selected_hotas, aircraft_name)
+        report = exported['report']
+        st.caption(f"{report['exported']} binding(s) exported in {report['seconds'] * 1000:.1f} ms · "
+                   f"place in `{SIMULATOR_CONFIGS[export_simulator]['config_location']}`")
+        if report['untranslated']:
+            st.caption(f"⚠️ No {export_simulator} name known for {len(report['untranslated'])} command(s), "
+                       f"kept as written: {', '.join(report['untranslated'][:8])}"
+                       + ("..." if len(report['untranslated']) > 8 else ""))
+        for device_id, command, reason in report['skipped']:
+            st.caption(f"⚠️ Skipped {device_id} ({command}): {reason}")
+        for idx, file in enumerate(exported['files']):
+            with st.expander(f"⚙️ {file['file_name']} ({len(file['code'])} chars)", expanded=False):
+                st.code(file['code'], language=file['file_format'])
+            st.download_button(
+                f"📥 Download {file['file_name']}",
+                data=file['code'],
+                file_name=file['file_name'],
+                mime="text/plain",
+                key=f"dl_export_{idx}",
+                use_container_width=True
+            )
+
     st.markdown("---")
     device_list = ', '.join(hotas_devices.keys())
     device_msg = f"Connect your {selected_hotas}" if controller_type == "unified" else f"Connect all devices: {device_list}"
-    software_msg = f"\n8. 🔧 Configure {software_name} (if applicable)" if software_capable and software_manual_text else ""
+    software_msg = f"\n8. 🔧 Configure {software_name} (if applicable)" if software_enhanced else ""
     st.success(f"""
 ### ✅ Profile Generated Successfully!
 
@@ -813,4 +617,11 @@ if 'generated_response' in st.session_state:
 7. ✈️ Take to the skies!{software_msg}
 
 **Important:** Ensure all physical devices are connected BEFORE loading the profile.
-    """)
\ No newline at end of file
+    """)
+
+if 'diagnostics' in st.session_state:
+    diagnostics = st.session_state.diagnostics
+    with st.expander("🩺 Diagnostics", expanded=False):
+        st.dataframe(diagnostics['rows'], use_container_width=True)
+        st.caption(f"Run {diagnostics['run_id']}: {diagnostics['total_ms'] / 1000:.1f}s total"
+                   + (f" · logged to {instrumentation.LOG_PATH}" if instrumentation.LOG_PATH else ""))
\ No newline at end of file
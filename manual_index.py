@@ -0,0 +1,126 @@
+"""Prebuilt section index for the simulator manuals bundled with the app.
+
+Build all indexes offline with:
+    python manual_index.py
+Indexes missing at runtime are built on first use and shared by every session in the process.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import fitz
+
+import retrieval
+
+INDEX_DIR = os.environ.get("GAMECHANGER_MANUAL_INDEX_DIR", os.path.join(".cache", "manual_index"))
+INDEX_VERSION = 1
+SECTION_CHARS = 2500
+
+SECTION_QUERIES = {
+    "installation": """
+        install installation setup options menu profile load import save saved games folder directory
+        config file launcher settings
+    """,
+    "input_configuration": """
+        input controls joystick hotas controller axis axes bindings bind assign assignment configuration
+        mapping modifier device calibration curve curves deadzone tune
+    """,
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def _index_path(manual_file):
+    name = hashlib.sha1(os.path.abspath(manual_file).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, f"{name}.json")
+
+
+def _fingerprint(manual_file):
+    stat = os.stat(manual_file)
+    return {"version": INDEX_VERSION, "size": stat.st_size, "mtime": stat.st_mtime,
+            "section_chars": SECTION_CHARS}
+
+
+def build_index(manual_file):
+    """Rank every page of a bundled manual and persist the best pages for each section."""
+    pdf_document = fitz.open(manual_file)
+    try:
+        pages = [(page_num + 1, pdf_document[page_num].get_text()) for page_num in range(len(pdf_document))]
+    finally:
+        pdf_document.close()
+    page_index = retrieval.build_index(pages)
+    entry = {
+        "source": manual_file,
+        "fingerprint": _fingerprint(manual_file),
+        "page_count": len(pages),
+        "sections": {name: retrieval.select_pages(page_index, query, SECTION_CHARS)
+                     for name, query in SECTION_QUERIES.items()},
+    }
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    path = _index_path(manual_file)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+    return entry
+
+
+def _read_index(manual_file):
+    try:
+        with open(_index_path(manual_file), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("fingerprint") != _fingerprint(manual_file):
+        return None
+    return entry
+
+
+def _index_mtime(manual_file):
+    try:
+        return os.stat(_index_path(manual_file)).st_mtime
+    except OSError:
+        return None
+
+
+def get_sections(manual_file):
+    """Return {section_name: text} for a bundled manual, or None if the manual is missing.
+
+    The loaded index is reused until the manual or its index file changes on disk, so an updated manual or
+    an index rebuilt with `python manual_index.py` is picked up without a restart.
+    """
+    if not manual_file or not os.path.exists(manual_file):
+        return None
+    key = (_fingerprint(manual_file), _index_mtime(manual_file))
+    loaded = _loaded.get(manual_file)
+    if loaded is not None and loaded[0] == key:
+        return loaded[1]["sections"]
+    with _lock:
+        loaded = _loaded.get(manual_file)
+        if loaded is None or loaded[0] != key:
+            entry = _read_index(manual_file) or build_index(manual_file)
+            loaded = _loaded[manual_file] = ((_fingerprint(manual_file), _index_mtime(manual_file)), entry)
+    return loaded[1]["sections"]
+
+
+def build_all(simulator_configs):
+    built = []
+    for simulator, sim_config in simulator_configs.items():
+        manual_file = sim_config.get("user_manual")
+        if not manual_file:
+            continue
+        if not os.path.exists(manual_file):
+            print(f"Skipping {simulator}: {manual_file} not found")
+            continue
+        entry = build_index(manual_file)
+        print(f"Indexed {simulator}: {manual_file} ({entry['page_count']} pages) -> {_index_path(manual_file)}")
+        built.append(manual_file)
+    return built
+
+
+if __name__ == "__main__":
+    from configs import SIMULATOR_CONFIGS
+
+    build_all(SIMULATOR_CONFIGS)
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+CACHE_DIR = os.environ.get("GAMECHANGER_CACHE_DIR", os.path.join(".cache", "pdf_extraction"))
+MAX_CACHE_BYTES = int(os.environ.get("GAMECHANGER_PDF_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def cache_key(pdf_bytes, params):
+    """Content address for a PDF: SHA-256 of the bytes plus the extraction parameters."""
+    digest = hashlib.sha256(pdf_bytes)
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def file_cache_key(pdf_path, params, chunk_size=1024 * 1024):
+    """cache_key for a PDF on disk, hashed in chunks; equal to cache_key of the same bytes."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _entry_dir(key):
+    return os.path.join(CACHE_DIR, key[:2], key)
+
+
+def _entry_size(path):
+    total = 0
+    for name in os.listdir(path):
+        total += os.path.getsize(os.path.join(path, name))
+    return total
+
+
+def load(key):
+    """Return (text, images) for a cached extraction, or None on a miss."""
+    path = _entry_dir(key)
+    try:
+        with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        with open(os.path.join(path, "text.txt"), "r", encoding="utf-8") as f:
+            text = f.read()
+        images = []
+        for entry in index["images"]:
+            with open(os.path.join(path, entry["file"]), "rb") as f:
+                images.append({"mime_type": entry["mime_type"], "data": f.read(), "pages": entry.get("pages", [])})
+    except (OSError, ValueError, KeyError):
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    # Touch the entry so eviction sees it as recently used.
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    with _lock:
+        _stats["hits"] += 1
+    return text, images
+
+
+def store(key, text, images):
+    """Write an extraction result to disk atomically and evict old entries if over budget."""
+    final_path = _entry_dir(key)
+    if os.path.isdir(final_path):
+        return
+    tmp_path = f"{final_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        os.makedirs(tmp_path, exist_ok=True)
+        with open(os.path.join(tmp_path, "text.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        index = {"created": time.time(), "images": []}
+        for idx, image in enumerate(images):
+            file_name = f"{idx:05d}.jpg"
+            with open(os.path.join(tmp_path, file_name), "wb") as f:
+                f.write(image["data"])
+            index["images"].append({"file": file_name, "mime_type": image["mime_type"], "pages": image["pages"]})
+        with open(os.path.join(tmp_path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.rename(tmp_path, final_path)
+    except OSError as e:
+        # Another session may have stored the same key first; either way the cache stays usable.
+        print(f"Could not store extraction cache entry {key[:12]}: {e}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return
+    with _lock:
+        _stats["stores"] += 1
+    evict()
+
+
+def evict(max_bytes=None):
+    """Remove least recently used entries until the cache fits in max_bytes."""
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = []
+    total = 0
+    for shard in os.listdir(CACHE_DIR):
+        shard_path = os.path.join(CACHE_DIR, shard)
+        if not os.path.isdir(shard_path):
+            continue
+        for name in os.listdir(shard_path):
+            path = os.path.join(shard_path, name)
+            if ".tmp-" in name or not os.path.isdir(path):
+                continue
+            try:
+                size = _entry_size(path)
+                entries.append((os.path.getmtime(path), size, path))
+            except OSError:
+                continue
+            total += size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        with _lock:
+            _stats["evictions"] += 1
+
+
+def get_stats():
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def clear():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,370 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+from PIL import Image
+
+import pdf_cache
+
+THUMBNAIL_SIZE = (800, 800)
+JPEG_QUALITY = 85
+MAX_IMAGE_BYTES = 4 * 1024 * 1024
+PHASH_MAX_DISTANCE = 4
+# Images are reduced to this size before hashing, whatever size they were decoded at.
+HASH_SIZE = (64, 64)
+# Bump when the shape of extraction results changes so stale cache entries are not reused.
+EXTRACTION_VERSION = 5
+
+# Images are skipped from their xref metadata, before any decoding, when either side is shorter than
+# MIN_IMAGE_SIDE (icons, bullets, rules) or the stream compresses better than MIN_COMPRESSED_RATIO of its raw
+# sample size (blank masks and solid fills). Decoded images whose grey-level entropy is below MIN_ENTROPY bits
+# are dropped as well.
+MIN_IMAGE_SIDE = int(os.environ.get("GAMECHANGER_MIN_IMAGE_SIDE", "48"))
+MIN_COMPRESSED_RATIO = 0.002
+MIN_ENTROPY = float(os.environ.get("GAMECHANGER_MIN_IMAGE_ENTROPY", "0.05"))
+# JPEG sources that already fit the thumbnail and are no bigger than this are kept as-is, without a re-encode.
+PASSTHROUGH_MAX_BYTES = 256 * 1024
+RESAMPLE = os.environ.get("GAMECHANGER_IMAGE_RESAMPLE", "bicubic")
+JPEG_OPTIMIZE = os.environ.get("GAMECHANGER_JPEG_OPTIMIZE", "0") == "1"
+_RESAMPLE_FILTERS = {"nearest": Image.Resampling.NEAREST, "bilinear": Image.Resampling.BILINEAR,
+                     "bicubic": Image.Resampling.BICUBIC, "lanczos": Image.Resampling.LANCZOS}
+
+EXTRACT_WORKERS = int(os.environ.get("GAMECHANGER_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARALLEL_MIN_PAGES = 64
+CHUNKS_PER_WORKER = 4
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _dhash(pil_image):
+    """64-bit difference hash: cheap, and stable across re-encodes and small rescales."""
+    grey = pil_image.convert('L')
+    grey.thumbnail(HASH_SIZE, Image.Resampling.BILINEAR)
+    pixels = list(grey.resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def _find_near_duplicate(records, phash):
+    for record in records:
+        if bin(record['phash'] ^ phash).count('1') <= PHASH_MAX_DISTANCE:
+            return record
+    return None
+
+
+def _add_page_ref(record, page_ref):
+    if page_ref not in record['pages']:
+        record['pages'].append(page_ref)
+
+
+def _skip_from_metadata(pdf_document, info):
+    """True for images not worth decoding, judged from the page's image list and the stream length alone."""
+    xref, _, width, height, bpc = info[:5]
+    if min(width, height) < MIN_IMAGE_SIDE:
+        return True
+    try:
+        length = int(pdf_document.xref_get_key(xref, "Length")[1])
+    except (ValueError, RuntimeError):
+        return False
+    components = 1 if info[5] in ("DeviceGray", "") else 4 if info[5] == "DeviceCMYK" else 3
+    raw_size = width * height * components * max(bpc, 1) / 8
+    return raw_size > 0 and length / raw_size < MIN_COMPRESSED_RATIO
+
+
+def _decode_jpeg(pdf_document, xref, thumbnail_size):
+    """(pil_image, raw_bytes) for a plain DCT stream, decoded at the smallest scale that covers the thumbnail."""
+    data = pdf_document.xref_stream_raw(xref)
+    if not data or not data.startswith(b"\xff\xd8"):
+        return None, None
+    pil_image = Image.open(io.BytesIO(data))
+    width, height = pil_image.size
+    fits = width <= thumbnail_size[0] and height <= thumbnail_size[1]
+    passthrough = fits and pil_image.mode in ("RGB", "L") and len(data) <= PASSTHROUGH_MAX_BYTES
+    # draft() picks a 1/2, 1/4 or 1/8 DCT scale no smaller than the requested size, so most of the decoding
+    # work is skipped. A passed-through image is only decoded for the entropy check and hash, so it is
+    # decoded no larger than it takes to cover HASH_SIZE.
+    draft_size = HASH_SIZE if passthrough else thumbnail_size
+    pil_image.draft("L" if passthrough or pil_image.mode == "L" else "RGB", draft_size)
+    return pil_image, data if passthrough else None
+
+
+def _decode_pixmap(pdf_document, xref, thumbnail_size):
+    """Decode any other image straight to pixels (no PNG round trip), halving it while that still covers the thumbnail."""
+    pix = fitz.Pixmap(pdf_document, xref)
+    if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    factor = 0
+    while (pix.width >> (factor + 1)) >= thumbnail_size[0] and (pix.height >> (factor + 1)) >= thumbnail_size[1]:
+        factor += 1
+    if factor:
+        pix.shrink(factor)
+    return Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples)
+
+
+def _add_image(image_index, pdf_document, info, img_index, page_num, thumbnail_size, jpeg_quality):
+    """Record one image occurrence, decoding each xref at most once and skipping near-duplicates.
+
+    info is an entry of page.get_images(full=True).
+    """
+    xref = info[0]
+    by_xref = image_index['by_xref']
+    if xref in by_xref:
+        if by_xref[xref] is not None:
+            _add_page_ref(by_xref[xref], page_num + 1)
+        return
+    by_xref[xref] = None
+    try:
+        if _skip_from_metadata(pdf_document, info):
+            return
+        pil_image, passthrough = None, None
+        if info[8] == "DCTDecode":
+            pil_image, passthrough = _decode_jpeg(pdf_document, xref, thumbnail_size)
+        if pil_image is None:
+            pil_image = _decode_pixmap(pdf_document, xref, thumbnail_size)
+        pil_image.thumbnail(thumbnail_size, _RESAMPLE_FILTERS.get(RESAMPLE, Image.Resampling.BICUBIC))
+        grey = pil_image.convert('L')
+        if grey.entropy() < MIN_ENTROPY:
+            return
+        phash = _dhash(grey)
+        record = _find_near_duplicate(image_index['records'], phash)
+        if record is None:
+            if passthrough is not None:
+                data = passthrough
+            else:
+                buffered = io.BytesIO()
+                pil_image.convert('RGB').save(buffered, format="JPEG", quality=jpeg_quality, optimize=JPEG_OPTIMIZE)
+                data = buffered.getvalue()
+            # The encoded bytes are the only copy kept; they go into the request as-is.
+            if len(data) >= MAX_IMAGE_BYTES:
+                return
+            record = {'mime_type': 'image/jpeg', 'data': data, 'pages': [], 'xrefs': [], 'phash': phash}
+            image_index['records'].append(record)
+    except Exception as e:
+        print(f"Could not extract image {img_index} from page {page_num + 1}: {e}")
+        return
+    record['xrefs'].append(xref)
+    by_xref[xref] = record
+    _add_page_ref(record, page_num + 1)
+
+
+def _merge_records(image_index, records):
+    """Fold records from a later page chunk into image_index, matching by xref, then by hash."""
+    by_xref = image_index['by_xref']
+    for record in records:
+        existing = next((by_xref[xref] for xref in record['xrefs'] if by_xref.get(xref) is not None), None)
+        if existing is None:
+            existing = _find_near_duplicate(image_index['records'], record['phash'])
+        if existing is None:
+            existing = dict(record, pages=[], xrefs=[])
+            image_index['records'].append(existing)
+        for xref in record['xrefs']:
+            if xref not in existing['xrefs']:
+                existing['xrefs'].append(xref)
+            by_xref[xref] = existing
+        for page_ref in record['pages']:
+            _add_page_ref(existing, page_ref)
+
+
+def _public_images(records):
+    return [{'mime_type': record['mime_type'], 'data': record['data'], 'pages': sorted(record['pages'])}
+            for record in records]
+
+
+def iter_pages(pdf_document, start=0, stop=None):
+    """Yield (page_num, page_text, image_infos) one page at a time; images are not decoded here.
+
+    image_infos are the page.get_images(full=True) entries, (xref, smask, width, height, bpc, colorspace, ...).
+    """
+    stop = len(pdf_document) if stop is None else stop
+    for page_num in range(start, stop):
+        page = pdf_document[page_num]
+        yield page_num, page.get_text(), page.get_images(full=True)
+
+
+def _extract_pages(pdf_document, start, stop, thumbnail_size, jpeg_quality):
+    page_texts = []
+    image_index = {'by_xref': {}, 'records': []}
+    for page_num, page_text, image_infos in iter_pages(pdf_document, start, stop):
+        for img_index, info in enumerate(image_infos):
+            _add_image(image_index, pdf_document, info, img_index, page_num, thumbnail_size, jpeg_quality)
+        page_texts.append((page_num, page_text))
+    return page_texts, image_index['records']
+
+
+def _page_text(page_num, page_text):
+    return f"\n\n--- Page {page_num + 1} ---\n\n{page_text}"
+
+
+def extract_budgeted(pdf_document, max_chars=None, max_images=None, thumbnail_size=THUMBNAIL_SIZE,
+                     jpeg_quality=JPEG_QUALITY):
+    """Read pages only until the text and image budgets are filled.
+
+    Produces the same text prefix as a full extraction, so callers that slice to the budget see
+    identical prompt text. The image budget counts distinct images.
+    """
+    max_chars = float("inf") if max_chars is None else max_chars
+    max_images = float("inf") if max_images is None else max_images
+    text_parts = []
+    char_count = 0
+    image_index = {'by_xref': {}, 'records': []}
+    for page_num, page_text, image_infos in iter_pages(pdf_document):
+        if char_count < max_chars:
+            part = _page_text(page_num, page_text)
+            text_parts.append(part)
+            char_count += len(part)
+        for img_index, info in enumerate(image_infos):
+            # Already-seen xrefs only add a page reference, so they are cheap even with a full budget.
+            if info[0] in image_index['by_xref'] or len(image_index['records']) < max_images:
+                _add_image(image_index, pdf_document, info, img_index, page_num, thumbnail_size, jpeg_quality)
+        if char_count >= max_chars and len(image_index['records']) >= max_images:
+            break
+    text_content = "".join(text_parts)
+    if max_chars != float("inf"):
+        text_content = text_content[:max_chars]
+    return text_content, _public_images(image_index['records'])
+
+
+def _extract_range_from_file(pdf_path, start, stop, thumbnail_size, jpeg_quality):
+    """Worker entry point: each process opens its own document from the shared file."""
+    pdf_document = fitz.open(pdf_path)
+    try:
+        return _extract_pages(pdf_document, start, stop, thumbnail_size, jpeg_quality)
+    finally:
+        pdf_document.close()
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn avoids forking the Streamlit server with its threads and sockets.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _page_chunks(page_count, workers):
+    chunk_count = min(page_count, workers * CHUNKS_PER_WORKER)
+    bounds = [page_count * i // chunk_count for i in range(chunk_count + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(chunk_count) if bounds[i] < bounds[i + 1]]
+
+
+def _merge(chunks):
+    text_parts = []
+    image_index = {'by_xref': {}, 'records': []}
+    for page_texts, records in chunks:
+        text_parts.extend(_page_text(page_num, page_text) for page_num, page_text in page_texts)
+        _merge_records(image_index, records)
+    return "".join(text_parts), _public_images(image_index['records'])
+
+
+def extract_serial(pdf_bytes, thumbnail_size=THUMBNAIL_SIZE, jpeg_quality=JPEG_QUALITY):
+    pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return _merge([_extract_pages(pdf_document, 0, len(pdf_document), thumbnail_size, jpeg_quality)])
+    finally:
+        pdf_document.close()
+
+
+def extract_parallel_file(pdf_path, workers, thumbnail_size=THUMBNAIL_SIZE, jpeg_quality=JPEG_QUALITY,
+                          page_count=None):
+    """Split the page range across a process pool; pages are merged back in document order."""
+    if page_count is None:
+        with fitz.open(pdf_path) as pdf_document:
+            page_count = len(pdf_document)
+    pool = _get_pool(workers)
+    chunks = _page_chunks(page_count, workers)
+    futures = [pool.submit(_extract_range_from_file, pdf_path, start, stop, thumbnail_size, jpeg_quality)
+               for start, stop in chunks]
+    return _merge([future.result() for future in futures])
+
+
+def extract_parallel(pdf_bytes, workers, thumbnail_size=THUMBNAIL_SIZE, jpeg_quality=JPEG_QUALITY,
+                     page_count=None):
+    """extract_parallel_file for a PDF held in memory; it is written to a temporary file for the workers."""
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        return extract_parallel_file(pdf_path, workers, thumbnail_size, jpeg_quality, page_count)
+    finally:
+        os.remove(pdf_path)
+
+
+def _cache_params(thumbnail_size, jpeg_quality, max_chars, max_images):
+    params = {"version": EXTRACTION_VERSION, "thumbnail_size": thumbnail_size, "jpeg_quality": jpeg_quality,
+              "min_image_side": MIN_IMAGE_SIDE, "min_entropy": MIN_ENTROPY, "resample": RESAMPLE,
+              "jpeg_optimize": JPEG_OPTIMIZE}
+    if max_chars is not None or max_images is not None:
+        params.update({"max_chars": max_chars, "max_images": max_images})
+    return params
+
+
+def _extract_document(pdf_document, extract_parallel_pages, workers, thumbnail_size, jpeg_quality, max_chars,
+                      max_images):
+    workers = EXTRACT_WORKERS if workers is None else workers
+    page_count = len(pdf_document)
+    if workers > 1 and page_count >= PARALLEL_MIN_PAGES and max_chars is None:
+        # Every page is read for the text anyway, so the pool pays off; the image budget keeps the first
+        # distinct images in document order, as extract_budgeted would.
+        text_content, images = extract_parallel_pages(workers, thumbnail_size, jpeg_quality, page_count)
+        return text_content, images if max_images is None else images[:max_images]
+    if max_chars is not None or max_images is not None:
+        return extract_budgeted(pdf_document, max_chars, max_images, thumbnail_size, jpeg_quality)
+    return _merge([_extract_pages(pdf_document, 0, page_count, thumbnail_size, jpeg_quality)])
+
+
+def extract_pdf_bytes(pdf_bytes, workers=None, thumbnail_size=THUMBNAIL_SIZE, jpeg_quality=JPEG_QUALITY,
+                      max_chars=None, max_images=None):
+    """Extract (text, images) from a PDF, using the disk cache when possible.
+
+    Each image is {'mime_type', 'data', 'pages'}: repeated and near-identical images appear once,
+    with the 1-based pages they occur on.
+
+    With max_chars/max_images set, pages are read lazily and extraction stops once both budgets are met.
+    Large documents with no text budget are read on the process pool, and the image budget is applied to
+    the merged result.
+    """
+    key = pdf_cache.cache_key(pdf_bytes, _cache_params(thumbnail_size, jpeg_quality, max_chars, max_images))
+    cached = pdf_cache.load(key)
+    if cached is not None:
+        return cached
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+        text_content, images = _extract_document(
+            pdf_document, lambda *args: extract_parallel(pdf_bytes, *args), workers, thumbnail_size,
+            jpeg_quality, max_chars, max_images)
+    pdf_cache.store(key, text_content, images)
+    return text_content, images
+
+
+def extract_pdf_file(pdf_path, workers=None, thumbnail_size=THUMBNAIL_SIZE, jpeg_quality=JPEG_QUALITY,
+                     max_chars=None, max_images=None):
+    """extract_pdf_bytes for a PDF on disk.
+
+    The document is opened by path, so MuPDF reads pages from the file as it needs them instead of holding
+    the whole PDF in memory, and parallel workers open the same file. Shares cache entries with
+    extract_pdf_bytes.
+    """
+    key = pdf_cache.file_cache_key(pdf_path, _cache_params(thumbnail_size, jpeg_quality, max_chars, max_images))
+    cached = pdf_cache.load(key)
+    if cached is not None:
+        return cached
+    with fitz.open(pdf_path) as pdf_document:
+        text_content, images = _extract_document(
+            pdf_document, lambda *args: extract_parallel_file(pdf_path, *args), workers, thumbnail_size,
+            jpeg_quality, max_chars, max_images)
+    pdf_cache.store(key, text_content, images)
+    return text_content, images
@@ -0,0 +1,138 @@
+"""Process-wide request throttling and retry for model calls.
+
+One token bucket per API key is shared by every Streamlit session and batch worker in the process, so
+concurrent users of the same key queue up instead of colliding on 429s.
+"""
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+
+REQUESTS_PER_MINUTE = float(os.environ.get("GAMECHANGER_RPM", "15"))
+BURST = int(os.environ.get("GAMECHANGER_RPM_BURST", "1"))
+
+MAX_ATTEMPTS = 5
+BASE_DELAY = 2.0
+MAX_DELAY = 60.0
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_STATUSES = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED")
+# API errors read "429 RESOURCE_EXHAUSTED. {...}"; a number elsewhere in a message is not a status code.
+_STATUS_CODE = re.compile(r"^\s*(\d{3})\b")
+_STATUS_NAME = re.compile(r"\b(" + "|".join(RETRYABLE_STATUSES) + r")\b")
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Blocking FIFO token bucket: callers are served strictly in arrival order."""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, burst=BURST):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.next_ticket = 0
+        self.serving = 0
+        self.abandoned = set()
+        self.cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, on_wait=None):
+        """Block until a request may be sent; on_wait(position, seconds) reports queue position and wait."""
+        if self.rate <= 0:
+            return
+        with self.cond:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+        acquired = False
+        try:
+            while True:
+                with self.cond:
+                    self._refill()
+                    if ticket == self.serving and self.tokens >= 1:
+                        self.tokens -= 1
+                        self._advance()
+                        acquired = True
+                        return
+                    position = ticket - self.serving
+                    wait = (position + 1 - self.tokens) / self.rate
+                if on_wait:
+                    on_wait(position, wait)
+                with self.cond:
+                    self.cond.wait(timeout=min(max(wait, 0.05), 1.0))
+        finally:
+            if not acquired:
+                # The caller unwound (e.g. Streamlit stopped the script inside on_wait): give the ticket up so
+                # the callers behind it are not stuck waiting for it forever.
+                with self.cond:
+                    if ticket == self.serving:
+                        self._advance()
+                    else:
+                        self.abandoned.add(ticket)
+
+    def _advance(self):
+        """Move past the ticket being served and any abandoned tickets right behind it (cond held)."""
+        self.serving += 1
+        while self.serving in self.abandoned:
+            self.abandoned.discard(self.serving)
+            self.serving += 1
+        self.cond.notify_all()
+
+    def queue_length(self):
+        with self.cond:
+            return self.next_ticket - self.serving - len(self.abandoned)
+
+
+def get_limiter(api_key, requests_per_minute=REQUESTS_PER_MINUTE, burst=BURST):
+    """The shared bucket for an API key; keys are hashed so they are never held as registry keys."""
+    key_id = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    with _limiters_lock:
+        if key_id not in _limiters:
+            _limiters[key_id] = TokenBucket(requests_per_minute, burst)
+        return _limiters[key_id]
+
+
+def is_retryable(error):
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in RETRYABLE_CODES:
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    message = str(error)
+    match = _STATUS_CODE.match(message)
+    if match and int(match.group(1)) in RETRYABLE_CODES:
+        return True
+    return bool(_STATUS_NAME.search(message))
+
+
+def backoff_delay(attempt, base_delay=None, max_delay=None):
+    """Full-jitter exponential backoff for the given 0-based attempt."""
+    base_delay = BASE_DELAY if base_delay is None else base_delay
+    max_delay = MAX_DELAY if max_delay is None else max_delay
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retry(fn, max_attempts=None, on_retry=None, sleep=time.sleep):
+    """Call fn() until it succeeds, retrying throttled and transient errors with jittered backoff.
+
+    on_retry(attempt, delay, error) is called before each retry sleep; non-retryable errors and the last
+    failure are raised unchanged.
+    """
+    max_attempts = MAX_ATTEMPTS if max_attempts is None else max_attempts
+    for attempt in range(max_attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_attempts - 1 or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            if on_retry:
+                on_retry(attempt + 1, delay, e)
+            sleep(delay)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIR = os.environ.get("GAMECHANGER_RESPONSE_CACHE_DIR", os.path.join(".cache", "responses"))
+MAX_CACHE_BYTES = int(os.environ.get("GAMECHANGER_RESPONSE_CACHE_MAX_MB", "256")) * 1024 * 1024
+ENABLED = os.environ.get("GAMECHANGER_RESPONSE_CACHE", "1") != "0"
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def _json_default(value):
+    # Inline image data is hashed rather than embedded so keys stay cheap to compute.
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"sha256": hashlib.sha256(value).hexdigest()}
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    return repr(value)
+
+
+def cache_key(model, contents, config):
+    """Hash of the model name plus the fully built request contents and GenerateContentConfig."""
+    payload = json.dumps({"model": model, "contents": contents, "config": config}, sort_keys=True,
+                         default=_json_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def load(key):
+    """Return the list of streamed text chunks for a cached response, or None on a miss."""
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            chunks = json.load(f)["chunks"]
+        os.utime(path)
+    except (OSError, ValueError, KeyError):
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    with _lock:
+        _stats["hits"] += 1
+    return chunks
+
+
+def store(key, chunks):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "chunks": chunks}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not store response cache entry {key[:12]}: {e}")
+        return
+    with _lock:
+        _stats["stores"] += 1
+    evict()
+
+
+def evict(max_bytes=None):
+    """Remove least recently used responses until the cache fits in max_bytes."""
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    for name in os.listdir(CACHE_DIR) if os.path.isdir(CACHE_DIR) else []:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        with _lock:
+            _stats["evictions"] += 1
+
+
+def get_stats():
+    with _lock:
+        return dict(_stats)
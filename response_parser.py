@@ -0,0 +1,180 @@
+import re
+
+FENCE = "```"
+_LANG_PATTERN = re.compile(r"```\s*(\w+)?")
+_CODE_BLOCK_WITH_LANG = re.compile(r"```(\w+)?\s*\n(.*?)\n```", re.DOTALL)
+_CODE_BLOCK_PLAIN = re.compile(r"```\s*\n(.*?)\n```", re.DOTALL)
+_LIST_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*])\s+(.*\S)")
+
+
+def _section_for_heading(heading):
+    heading = heading.lower()
+    if "mapping" in heading or "part 1" in heading:
+        return "mapping"
+    if "installation" in heading or "part 2" in heading:
+        return "installation"
+    if "configuration file" in heading or "part 3" in heading:
+        return "config"
+    return None
+
+
+class StreamParser:
+    """Incremental parser for a streamed generation.
+
+    feed() takes chunks as they arrive and returns the events completed by that chunk:
+        ("section", name)      a Part 1/2/3 heading was seen ("mapping", "installation", "config")
+        ("table_row", line)    a mapping-table line (header and separator rows included)
+        ("line", line)         any other line of the current section
+        ("file", file)         a fenced code block closed; file is {"index", "lang", "code", "complete"}
+    Work per chunk is proportional to the chunk, not to the text received so far.
+    """
+
+    def __init__(self):
+        self.pending = ""
+        self.section = None
+        self.fence_lang = None
+        self.fence_lines = None
+        self.table_rows = []
+        self.files = []
+
+    def feed(self, chunk):
+        events = []
+        self.pending += chunk
+        *lines, self.pending = self.pending.split("\n")
+        for line in lines:
+            self._line(line, events)
+        return events
+
+    def close(self):
+        """Flush the last partial line; an unterminated code block is returned with complete=False."""
+        events = []
+        if self.pending:
+            self._line(self.pending, events)
+            self.pending = ""
+        if self.fence_lines is not None:
+            self._emit_file(events, complete=False)
+        return events
+
+    def _emit_file(self, events, complete):
+        file = {"index": len(self.files), "lang": self.fence_lang, "code": "\n".join(self.fence_lines).strip(),
+                "complete": complete}
+        self.files.append(file)
+        self.fence_lang = None
+        self.fence_lines = None
+        events.append(("file", file))
+
+    def _line(self, line, events):
+        stripped = line.strip()
+        if self.fence_lines is not None:
+            if stripped.startswith(FENCE):
+                self._emit_file(events, complete=True)
+            else:
+                self.fence_lines.append(line)
+            return
+        if stripped.startswith(FENCE):
+            self.fence_lang = _LANG_PATTERN.match(stripped).group(1)
+            self.fence_lines = []
+            return
+        if stripped.startswith("#"):
+            section = _section_for_heading(stripped)
+            if section and section != self.section:
+                self.section = section
+                events.append(("section", section))
+                return
+        if self.section == "mapping" and stripped.startswith("|"):
+            self.table_rows.append(stripped)
+            events.append(("table_row", stripped))
+        else:
+            events.append(("line", line))
+
+
+def file_naming(simulator, hotas_name, sim_info, idx):
+    """Return (file_ext, file_suffix, file_type_name) for the idx-th generated configuration file."""
+    file_ext = sim_info['file_extension']
+    file_suffix = ""
+    file_type_name = file_ext
+    if simulator == "War Thunder" and hotas_name == "Thrustmaster HOTAS Warthog":
+        if idx == 0:
+            file_ext = ".blk"
+            file_suffix = "_controls"
+            file_type_name = "BLK Controls"
+        elif idx == 1:
+            file_ext = ".fcf"
+            file_suffix = "_target"
+            file_type_name = "FCF TARGET"
+    return file_ext, file_suffix, file_type_name
+
+
+def profile_file_name(aircraft_name, hotas_name, file_suffix, file_ext):
+    return f"{aircraft_name.replace('/', '-')}_{hotas_name.replace(' ', '_')}_profile{file_suffix}{file_ext}"
+
+
+def code_blocks(text):
+    """[(start, end, lang, code)] for the fenced blocks of a response, in the order they become files."""
+    blocks = [(match.start(), match.end(), match.group(1), match.group(2))
+              for match in _CODE_BLOCK_WITH_LANG.finditer(text)]
+    if not blocks:
+        blocks = [(match.start(), match.end(), None, match.group(1)) for match in _CODE_BLOCK_PLAIN.finditer(text)]
+    return blocks
+
+
+def first_code_block(text):
+    """Return (lang, code) for the first fenced block in text; unfenced text is returned whole as (None, text)."""
+    match = _CODE_BLOCK_WITH_LANG.search(text)
+    if match:
+        # Leading indentation is kept so the block can be spliced back into a file.
+        return match.group(1), match.group(2).strip("\n").rstrip()
+    return None, text.strip().strip("`").strip()
+
+
+def _table_cells(line):
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def parse_profile(response_text, simulator, hotas_name, sim_info, aircraft_name):
+    """Parse a finished generation once into the structure the results view renders.
+
+    Returns {"response_chars", "mapping_section", "mapping_header", "mapping_rows", "installation_section",
+    "install_steps", "files"}; sections are the markdown shown as-is, the header and rows are lists of cell
+    strings, and each file is
+    {"index", "lang", "code", "file_ext", "file_suffix", "file_type_name", "file_name"}.
+    """
+    sections = response_text.split("###")
+    mapping_section = next((section for section in sections
+                            if "mapping" in section.lower() and "|" in section), None)
+    installation_section = next((section for section in sections if "installation" in section.lower()), None)
+
+    mapping_header = []
+    mapping_rows = []
+    if mapping_section:
+        table_lines = [line for line in mapping_section.splitlines() if line.strip().startswith("|")]
+        mapping_header = _table_cells(table_lines[0]) if table_lines else []
+        # Drop the header row and the |---| separator.
+        mapping_rows = [_table_cells(line) for line in table_lines[1:] if not set(line) <= set("|-: ")]
+    install_steps = []
+    if installation_section:
+        install_steps = [match.group(1) for match in map(_LIST_ITEM.match, installation_section.splitlines())
+                         if match]
+
+    files = []
+    for idx, (_, _, lang, code) in enumerate(code_blocks(response_text)):
+        file_ext, file_suffix, file_type_name = file_naming(simulator, hotas_name, sim_info, idx)
+        files.append({
+            "index": idx,
+            "lang": lang or sim_info['file_format'],
+            "code": code.strip(),
+            "file_ext": file_ext,
+            "file_suffix": file_suffix,
+            "file_type_name": file_type_name,
+            "file_name": profile_file_name(aircraft_name, hotas_name, file_suffix, file_ext),
+        })
+
+    return {
+        "response_chars": len(response_text),
+        "mapping_section": "###" + mapping_section if mapping_section else None,
+        "mapping_header": mapping_header,
+        "mapping_rows": mapping_rows,
+        "installation_section": "###" + installation_section if installation_section else None,
+        "install_steps": install_steps,
+        "files": files,
+    }
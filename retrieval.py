@@ -0,0 +1,92 @@
+import math
+import re
+from collections import Counter
+
+PAGE_MARKER = re.compile(r"\n\n--- Page (\d+) ---\n\n")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+# Terms that identify the HOTAS, weapons-employment and sensor chapters of a flight manual.
+COMBAT_QUERY = """
+hotas stick throttle grip trigger pickle button switch hat castle coolie china slew cursor tdc
+weapon weapons release select master arm gun cannon missile bomb rocket station pylon jettison
+sensor radar targeting pod tgp designate lock track boresight fov zoom countermeasures chaff flare
+dispenser ecm rwr speedbrake speed brake trim autopilot gear flaps nosewheel steering nws
+controls control input bindings assignment axis axes
+"""
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_pages(text_content):
+    """Split extract_pdf_content text back into [(page_number, page_text), ...]."""
+    parts = PAGE_MARKER.split(text_content)
+    return [(int(parts[i]), parts[i + 1]) for i in range(1, len(parts) - 1, 2)]
+
+
+def build_index(pages):
+    """Build an inverted BM25 index over [(page_number, page_text), ...]."""
+    postings = {}
+    lengths = []
+    for doc_id, (_, page_text) in enumerate(pages):
+        term_counts = Counter(tokenize(page_text))
+        lengths.append(sum(term_counts.values()))
+        for term, count in term_counts.items():
+            postings.setdefault(term, []).append((doc_id, count))
+    return {
+        "pages": pages,
+        "postings": postings,
+        "lengths": lengths,
+        "avg_length": (sum(lengths) / len(lengths)) if lengths else 0.0,
+    }
+
+
+def score_pages(index, query):
+    """BM25 score for every page; only postings of query terms are visited."""
+    page_count = len(index["pages"])
+    scores = [0.0] * page_count
+    avg_length = index["avg_length"] or 1.0
+    lengths = index["lengths"]
+    for term in set(tokenize(query)):
+        term_postings = index["postings"].get(term)
+        if not term_postings:
+            continue
+        idf = math.log(1 + (page_count - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+        for doc_id, count in term_postings:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / avg_length)
+            scores[doc_id] += idf * count * (BM25_K1 + 1) / (count + norm)
+    return scores
+
+
+def select_pages(index, query, max_chars):
+    """Fill max_chars with the highest-scoring pages, returned in document order with page markers."""
+    scores = score_pages(index, query)
+    ranked = sorted(range(len(scores)), key=lambda doc_id: (-scores[doc_id], doc_id))
+    chosen = []
+    used = 0
+    for doc_id in ranked:
+        if used >= max_chars or scores[doc_id] <= 0:
+            break
+        page_number, page_text = index["pages"][doc_id]
+        part = f"\n\n--- Page {page_number} ---\n\n{page_text}"
+        chosen.append((doc_id, part[:max_chars - used]))
+        used += len(chosen[-1][1])
+    chosen.sort()
+    return "".join(part for _, part in chosen)
+
+
+def relevant_text(text_content, query, max_chars):
+    """Most relevant pages of an extracted manual within max_chars; falls back to the prefix."""
+    if len(text_content) <= max_chars:
+        return text_content
+    pages = split_pages(text_content)
+    selected = select_pages(build_index(pages), query, max_chars) if pages else ""
+    return selected or text_content[:max_chars]
@@ -0,0 +1,246 @@
+"""Render configuration files locally from a template plus a compact list of control assignments.
+
+Instead of asking the model to reproduce a whole template, the template is parsed into a tree of blocks and
+parameters, the model is shown the blocks it may bind and returns only assignments such as
+    {"path": "hotkeys/ID_FIRE_MGUNS", "param": "joyButton", "type": "i", "value": "3"}
+and the file is rendered here by rewriting the matching values in the template text. An assignment may
+change a parameter its block already has, or add a parameter whose name and type appear somewhere else in
+the template; everything else in the template is left exactly as it is. Assignments that do not fit are
+rejected, so the output is always structurally the same as the template.
+
+Only War Thunder's DataBlock (.blk) text format has a parser so far; other template types are still
+generated in full by the model.
+"""
+import json
+import re
+
+# One token per match: comments, a block opening "name{", a closing "}", or a "name:type=value" parameter.
+_BLK_TOKEN = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<open>(?:"[^"]*"|[\w.\-]+)\s*\{)
+  | (?P<close>\})
+  | (?P<param>(?P<name>"[^"]*"|[\w.\-]+):(?P<type>\w+)\s*=\s*(?P<value>"(?:[^"\\]|\\.)*"|[^\s;},]+(?:\s*,\s*[^\s;},]+)*))
+  | (?P<space>[\s;]+)
+""", re.VERBOSE | re.DOTALL)
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?")
+_VECTOR_SIZES = {"p2": 2, "p3": 3, "p4": 4, "ip2": 2, "ip3": 3, "c": 4}
+_TRUE_WORDS = {"yes", "true", "on", "1"}
+_FALSE_WORDS = {"no", "false", "off", "0"}
+
+ASSIGNMENTS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "path": {"type": "STRING"},
+            "param": {"type": "STRING"},
+            "type": {"type": "STRING"},
+            "value": {"type": "STRING"},
+        },
+        "required": ["path", "param", "value"],
+    },
+}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def _line_indent(text, pos):
+    line_start = text.rfind("\n", 0, pos) + 1
+    line = text[line_start:pos]
+    return line[:len(line) - len(line.lstrip(" \t"))]
+
+
+def _own_line_indent(text, pos):
+    """The indent before pos if nothing else precedes it on its line, else None."""
+    line_start = text.rfind("\n", 0, pos) + 1
+    return text[line_start:pos] if not text[line_start:pos].strip() else None
+
+
+def parse_blk(text):
+    """Parse DataBlock text into a tree of blocks.
+
+    Each block is {"name", "path", "params", "blocks", "close", "indent"}; params are
+    {"name", "type", "value", "start", "end", "indent"} where start/end is the span of the value in `text`
+    and indent is None when the parameter does not start its line. "close" is the offset of the block's
+    closing brace (len(text) for the root). A block repeating the name of an earlier sibling gets a numbered path segment ("axes/axis#2"), so every block has its own path.
+    """
+    root = {"name": "", "path": "", "params": [], "blocks": [], "close": len(text), "indent": ""}
+    stack = [root]
+    pos = 0
+    while pos < len(text):
+        match = _BLK_TOKEN.match(text, pos)
+        if not match:
+            line = text.count("\n", 0, pos) + 1
+            raise TemplateError(f"Unexpected text on line {line}: {text[pos:pos + 40]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == "open":
+            name = match.group("open")[:-1].strip().strip('"')
+            parent = stack[-1]
+            count = sum(1 for sibling in parent["blocks"] if sibling["name"] == name)
+            segment = f"{name}#{count + 1}" if count else name
+            block = {"name": name, "path": f"{parent['path']}/{segment}" if parent["path"] else segment,
+                     "params": [], "blocks": [], "close": None, "indent": _line_indent(text, match.start())}
+            parent["blocks"].append(block)
+            stack.append(block)
+        elif kind == "close":
+            if len(stack) == 1:
+                raise TemplateError(f"Unbalanced '}}' on line {text.count(chr(10), 0, match.start()) + 1}")
+            stack.pop()["close"] = match.start()
+        elif kind == "param":
+            stack[-1]["params"].append({"name": match.group("name").strip('"'), "type": match.group("type"),
+                                        "value": match.group("value"), "start": match.start("value"),
+                                        "end": match.end("value"), "indent": _own_line_indent(text, match.start())})
+    if len(stack) != 1:
+        raise TemplateError(f"Unclosed block '{stack[-1]['path']}'")
+    return root
+
+
+PARSERS = {"blk": parse_blk}
+
+
+def can_render(file_type):
+    return file_type in PARSERS
+
+
+def parse(file_type, text):
+    return PARSERS[file_type](text)
+
+
+def iter_blocks(tree):
+    for block in tree["blocks"]:
+        yield block
+        yield from iter_blocks(block)
+
+
+def param_vocabulary(tree):
+    """{param name: type} for every parameter used anywhere in the template."""
+    vocabulary = {}
+    for block in [tree, *iter_blocks(tree)]:
+        for param in block["params"]:
+            vocabulary.setdefault(param["name"], param["type"])
+    return vocabulary
+
+
+def describe_slots(tree):
+    """Compact listing of the template for the prompt: one line per bindable block with its current parameters."""
+    lines = []
+    for block in iter_blocks(tree):
+        if block["blocks"] and not block["params"]:
+            continue
+        params = "; ".join(f"{param['name']}:{param['type']}={param['value']}" for param in block["params"])
+        lines.append(f"{block['path']} {{ {params} }}" if params else f"{block['path']} {{ }}")
+    vocabulary = ", ".join(f"{name}:{param_type}" for name, param_type in sorted(param_vocabulary(tree).items()))
+    return "\n".join(lines) + f"\n\nParameters: {vocabulary}"
+
+
+def format_value(param_type, value):
+    """Format an assignment value as DataBlock text for the parameter type; raises TemplateError."""
+    value = str(value).strip()
+    if param_type == "t":
+        value = value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    if param_type in ("i", "i64"):
+        if not re.fullmatch(r"-?\d+", value):
+            raise TemplateError(f"{value!r} is not an integer")
+        return value
+    if param_type == "r":
+        if not _NUMBER.fullmatch(value):
+            raise TemplateError(f"{value!r} is not a number")
+        return value
+    if param_type == "b":
+        if value.lower() in _TRUE_WORDS:
+            return "yes"
+        if value.lower() in _FALSE_WORDS:
+            return "no"
+        raise TemplateError(f"{value!r} is not a boolean")
+    if param_type in _VECTOR_SIZES:
+        parts = [part.strip() for part in value.strip("[]()").split(",")]
+        if len(parts) != _VECTOR_SIZES[param_type] or not all(_NUMBER.fullmatch(part) for part in parts):
+            raise TemplateError(f"{value!r} is not a {param_type} vector")
+        return ", ".join(parts)
+    return value
+
+
+def parse_assignment_block(text):
+    """(declared file type or None, assignments) from the model's JSON: a list, or {"file", "assignments"}
+    (optionally fenced). Raises ValueError when the JSON holds no assignments, e.g. a prose example."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    data = json.loads(text)
+    file_type = None
+    if isinstance(data, dict):
+        if "assignments" not in data:
+            raise TemplateError("No \"assignments\" in the JSON object")
+        file_type = str(data.get("file") or "").strip().lstrip(".").lower() or None
+        data = data["assignments"]
+    if not isinstance(data, list):
+        raise TemplateError("Assignments must be a JSON list")
+    assignments = [item for item in data if isinstance(item, dict)]
+    if data and not any("path" in item for item in assignments):
+        raise TemplateError("The JSON list holds no assignments")
+    return file_type, assignments
+
+
+def parse_assignments(text):
+    """Read the model's assignments from JSON (see parse_assignment_block)."""
+    return parse_assignment_block(text)[1]
+
+
+def render(text, tree, assignments):
+    """Apply assignments to the template text; returns (rendered_text, rejected) with reasons for rejects."""
+    blocks = {block["path"]: block for block in iter_blocks(tree)}
+    vocabulary = param_vocabulary(tree)
+    replacements = {}
+    additions = {}
+    rejected = []
+    for assignment in assignments:
+        path = str(assignment.get("path", "")).strip().strip("/")
+        name = str(assignment.get("param", "")).strip()
+        block = blocks.get(path)
+        if block is None:
+            rejected.append((assignment, f"no block '{path}' in the template"))
+            continue
+        param = next((param for param in block["params"] if param["name"] == name), None)
+        param_type = param["type"] if param else vocabulary.get(name)
+        if param_type is None:
+            rejected.append((assignment, f"parameter '{name}' is not used in the template"))
+            continue
+        try:
+            value = format_value(param_type, assignment.get("value", ""))
+        except TemplateError as e:
+            rejected.append((assignment, str(e)))
+            continue
+        if param:
+            replacements[(param["start"], param["end"])] = value
+        else:
+            additions.setdefault(block["close"], {})[name] = (param_type, value, block)
+
+    edits = [(start, end, value) for (start, end), value in replacements.items()]
+    for close, params in additions.items():
+        block = next(iter(params.values()))[2]
+        line_start = text.rfind("\n", 0, close) + 1
+        content_end = len(text[:close].rstrip(" \t"))
+        shares_line = bool(text[line_start:close].strip())
+        if shares_line and block["params"] and all(param["indent"] is None for param in block["params"]):
+            # A one-line block ("name{ a:i=1 }") stays on one line.
+            inserted = "".join(f" {name}:{param_type}={value}" for name, (param_type, value, _) in params.items())
+            edits.append((content_end, content_end, inserted))
+            continue
+        child_indent = next((param["indent"] for param in block["params"] if param["indent"]),
+                            block["indent"] + "  ")
+        inserted = "".join(f"{child_indent}{name}:{param_type}={value}\n"
+                           for name, (param_type, value, _) in params.items())
+        if shares_line:
+            # The closing brace shares a line with other content ("name{}"): break it onto its own line.
+            edits.append((content_end, close, "\n" + inserted + block["indent"]))
+        else:
+            edits.append((line_start, line_start, inserted))
+    for start, end, value in sorted(edits, reverse=True):
+        text = text[:start] + value + text[end:]
+    return text, rejected
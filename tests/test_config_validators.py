@@ -0,0 +1,46 @@
+import config_validators
+
+
+def _summary(issues):
+    return [(issue["level"], issue["kind"], issue["line"]) for issue in issues]
+
+
+def test_check_lua():
+    assert config_validators.check_lua('local t = { ["a"] = "}", -- } in a comment\n}\nreturn t') == []
+    assert _summary(config_validators.check_lua("local t = {\n  a = 1,\n")) == [("error", "truncated", 1)]
+    assert _summary(config_validators.check_lua("local t = {\n  a = 1 )\n}")) == [("error", "syntax", 2)]
+    assert _summary(config_validators.check_lua('local s = "open\nx = 1')) == [("error", "syntax", 1)]
+
+
+def test_check_xml():
+    assert config_validators.check_xml("<Root><A Key=\"1\" /></Root>") == []
+    assert _summary(config_validators.check_xml("<Root>\n  <A>\n"))[0][:2] == ("error", "truncated")
+    assert _summary(config_validators.check_xml("<Root>\n  <A></B>\n</Root>"))[0][:2] == ("error", "syntax")
+
+
+def test_check_blk_levels():
+    assert config_validators.check_blk("controls{\n  fire{ joyButton:i=1 }\n}\n") == []
+    assert _summary(config_validators.check_blk("controls{\n  fire{ joyButton:i=1 }\n")) == \
+        [("error", "truncated", None)]
+    assert _summary(config_validators.check_blk("controls{\n}\n}\n")) == [("error", "syntax", 3)]
+    # Text the tokenizer does not know may still load in the game.
+    assert _summary(config_validators.check_blk("controls{\n  @include other.blk\n}\n")) == [("warning", "syntax", 2)]
+
+
+def test_check_lines_and_check_syntax():
+    assert _summary(config_validators.check_syntax("map", 'fire=joy0_b1\ngear\nname="open')) == \
+        [("warning", "syntax", 2), ("error", "truncated", 3)]
+    assert _summary(config_validators.check_syntax("lua", "  \n")) == [("error", "truncated", None)]
+    assert config_validators.check_syntax("fcf", "anything goes") == []
+
+
+def test_check_mapping_and_file_coverage():
+    header = ["Component", "Physical Input", "Device ID", "Command"]
+    rows = [["Flight Stick", "Trigger", "JOY_BTN1", "Gun"], ["Flight Stick", "Pickle", "JOY_BTN1", "Bombs"],
+            ["Flight Stick", "Hat up", "JOY_BTN_POV1_U", "Trim up"]]
+    issues = config_validators.check_mapping(rows, header, "Thrustmaster HOTAS Warthog")
+    assert [issue["kind"] for issue in issues] == ["duplicate", "unmapped"]
+    assert "Throttle" in issues[1]["message"]
+    coverage = config_validators.check_file_coverage('["key"] = "JOY_BTN1"', rows, header)
+    assert _summary(coverage) == [("warning", "unmapped", None)] and "JOY_BTN_POV1_U" in coverage[0]["message"]
+    assert config_validators.check_file_coverage("no identifiers here", rows, header) == []
@@ -0,0 +1,42 @@
+import exporters
+from configs import SIMULATOR_CONFIGS
+
+HOTAS = "Thrustmaster HOTAS Warthog"
+
+ODD_DEVICE_IDS = [
+    "JOY_BTN3", "JOY_BTN0", "JOY_Y", "JOY_RZ", "JOY_SLIDER", "JOY_SLIDER2", "JOY_SLIDER0", "JOY_SLIDER3",
+    "JOY_BTN_POV1_U", "JOY_BTN_POV1_UR", "POV_DL", "JOY_BTN_POV0_U", "HAT2_LEFT", "KEYBOARD_F1", "",
+]
+
+
+def _profile(device_ids):
+    return {"mapping_header": ["Component", "Physical Input", "Device ID", "Command"],
+            "mapping_rows": [["Flight Stick", f"Input {idx}", device_id, f"Command {idx}"]
+                             for idx, device_id in enumerate(device_ids, 1)]}
+
+
+def test_parse_device_id_rejects_numbers_no_exporter_can_write():
+    assert exporters.parse_device_id("JOY_SLIDER") == {"kind": "axis", "axis": "SLIDER1"}
+    assert exporters.parse_device_id("JOY_BTN_POV2_UR") == {"kind": "hat", "number": 2, "direction": "UR"}
+    assert exporters.parse_device_id("HAT_LEFT") == {"kind": "hat", "number": 1, "direction": "L"}
+    for device_id in ("JOY_SLIDER0", "JOY_SLIDER3", "JOY_BTN0", "JOY_BTN_POV0_U"):
+        assert exporters.parse_device_id(device_id) is None
+
+
+def test_every_exporter_handles_odd_device_ids():
+    for simulator in exporters.WRITERS:
+        exported = exporters.export(_profile(ODD_DEVICE_IDS), simulator, HOTAS, "F-16C")
+        report = exported["report"]
+        skipped_ids = [device_id for device_id, _, _ in report["skipped"]]
+        for device_id in ("JOY_BTN0", "JOY_SLIDER0", "JOY_SLIDER3", "JOY_BTN_POV0_U", "KEYBOARD_F1"):
+            assert device_id in skipped_ids, (simulator, device_id)
+        assert report["exported"] + len(report["skipped"]) == len(ODD_DEVICE_IDS) - 1
+        assert exported["files"] and all(file["code"] for file in exported["files"])
+        assert all(file["file_format"] == SIMULATOR_CONFIGS[simulator]["file_format"] for file in exported["files"])
+
+
+def test_diagonal_hats_are_skipped_where_the_format_has_no_name_for_them():
+    for simulator in ("Star Citizen", "Elite Dangerous"):
+        report = exporters.export(_profile(["JOY_BTN_POV1_UR", "JOY_BTN_POV1_U"]), simulator, HOTAS, "F-16C")["report"]
+        assert [device_id for device_id, _, _ in report["skipped"]] == ["JOY_BTN_POV1_UR"]
+        assert report["exported"] == 1
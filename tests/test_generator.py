@@ -0,0 +1,155 @@
+import re
+import threading
+import time
+
+import generator
+import response_cache
+import template_renderer
+from configs import HOTAS_COMPONENTS
+from fake_client import FakeClient
+
+BLK_TEMPLATE = """controls{
+  hotkeys{
+    ID_FIRE_MGUNS{ joyButton:i=0 }
+    ID_BOMBS{ joyButton:i=0 }
+  }
+}
+"""
+FCF_TEMPLATE = "[Profile]\nName=Template\n"
+HOTAS = "Thrustmaster HOTAS Warthog"
+SECTION = re.compile(r"^## SECTION: (\S+)", re.MULTILINE)
+
+
+def _generate_sectioned(client, monkeypatch, on_chunk=None):
+    monkeypatch.setattr(response_cache, "ENABLED", False)
+    monkeypatch.setattr(generator, "load_template_files",
+                        lambda simulator, hotas_name, notify: {"blk": BLK_TEMPLATE, "fcf": FCF_TEMPLATE})
+    return generator.generate_sectioned_config(
+        client, "Aircraft manual text", [], {}, None, [], HOTAS, HOTAS_COMPONENTS[HOTAS]["devices"], "F-16C",
+        "War Thunder", "multi_device", False, "", use_response_cache=False, notify=lambda level, message: None, on_chunk=on_chunk)
+
+
+def _timed(client, slow_section=None):
+    """Record when each section's stream starts and ends; slow_section streams last."""
+    spans = {}
+    lock = threading.Lock()
+    generate_content_stream = client.models.generate_content_stream
+
+    def timed(model, contents, config=None):
+        section = SECTION.search(contents[0].parts[0].text).group(1)
+        stream = generate_content_stream(model, contents, config)
+
+        def chunks():
+            start = time.perf_counter()
+            if section == slow_section:
+                time.sleep(0.3)
+            yield from stream
+            with lock:
+                spans[section] = (start, time.perf_counter())
+        return chunks()
+
+    client.models.generate_content_stream = timed
+    return spans
+
+
+def test_sectioned_generation_overlaps_sections_and_keeps_their_order(monkeypatch):
+    client = FakeClient(tokens_per_second=2000, chunk_tokens=20)
+    spans = _timed(client, slow_section="installation")
+    chunks = []
+    text = _generate_sectioned(client, monkeypatch, on_chunk=chunks.append)
+
+    assert text is not None
+    assert set(spans) == {"mapping", "installation", "assignments:blk", "file:fcf"}
+    parallel = [spans[name] for name in ("installation", "assignments:blk", "file:fcf")]
+    # Every parallel section starts after the mapping table and before any other one has finished.
+    assert all(start >= spans["mapping"][1] for start, _ in parallel)
+    assert max(start for start, _ in parallel) < min(end for _, end in parallel)
+    # The installation guide finishes last but is still merged first, then the files in template order.
+    part2, part3 = text.index("### Part 2"), text.index("### Part 3")
+    blk, fcf = text.index("```blk\n"), text.index("```fcf\n")
+    assert text.index("### Part 1") < part2 < part3 < blk < fcf
+    assert "".join(chunks) == text
+    assert "ID_FIRE_MGUNS{ joyButton:i=" in text
+
+
+def _template_request():
+    return {"template_files": {"blk": BLK_TEMPLATE, "fcf": FCF_TEMPLATE},
+            "template_trees": {"blk": template_renderer.parse_blk(BLK_TEMPLATE)}}
+
+
+def test_render_templates_skips_blocks_that_hold_no_assignments():
+    response = ("### Part 3: COMPLETE Configuration Files\n\nAn example of the format:\n"
+                '```json\n{"example": "not assignments"}\n```\n\n'
+                "```lua\nprint('unrelated')\n```\n\n"
+                '```json\n[{"path": "controls/hotkeys/ID_BOMBS", "param": "joyButton", "value": "5"}]\n```\n\n'
+                "```fcf\n[Profile]\nName=F-16C\n```\n")
+    rendered = generator.render_templates(_template_request(), response, notify=lambda level, message: None)
+    assert '{"example": "not assignments"}' in rendered
+    assert "print('unrelated')" in rendered
+    assert "```blk\ncontrols{\n  hotkeys{\n    ID_FIRE_MGUNS{ joyButton:i=0 }\n    ID_BOMBS{ joyButton:i=5 }" in rendered
+    assert "```fcf\n[Profile]\nName=F-16C\n```" in rendered
+
+
+def test_render_templates_follows_the_declared_file():
+    request = _template_request()
+    request["template_files"] = {"fcf": FCF_TEMPLATE, "blk": BLK_TEMPLATE}
+    response = ('```json\n{"file": "fcf", "assignments": []}\n```\n\n'
+                '```json\n{"file": "blk", "assignments": '
+                '[{"path": "controls/hotkeys/ID_FIRE_MGUNS", "param": "joyButton", "value": "2"}]}\n```\n')
+    rendered = generator.render_templates(request, response, notify=lambda level, message: None)
+    assert rendered.startswith('```json\n{"file": "fcf", "assignments": []}\n```')
+    assert "ID_FIRE_MGUNS{ joyButton:i=2 }" in rendered
+
+
+BROKEN_LUA = 'local diff = {\n\t["keyDiffs"] = {\n\t\t["d1"] = { ["name"] = "Gun" ),\n\t},\n}\nreturn diff'
+FIXED_LUA = 'local diff = {\n\t["keyDiffs"] = {\n\t\t["d1"] = { ["name"] = "Gun" },\n\t},\n}\nreturn diff'
+VALID_LUA = 'local diff = {\n\t["axisDiffs"] = {},\n}\nreturn diff'
+RESPONSE = ("### Part 1: Complete Technical Mapping Table\n\n| Physical Input | Device ID | Command |\n|---|---|---|\n"
+            "| Trigger | JOY_BTN1 | Gun |\n\n### Part 3: COMPLETE Configuration Files\n\n"
+            f"```lua\n{BROKEN_LUA}\n```\n\nAxes:\n\n```lua\n{VALID_LUA}\n```\n")
+
+
+def test_repair_response_replaces_only_the_failing_file(monkeypatch):
+    monkeypatch.setattr(response_cache, "ENABLED", False)
+    client = FakeClient(response_text=f"```lua\n{FIXED_LUA}\n```")
+    repaired = generator.repair_response(client, RESPONSE, "DCS World", HOTAS, "F-16C", use_response_cache=False,
+                                         notify=lambda level, message: None)
+    assert repaired == RESPONSE.replace(BROKEN_LUA, FIXED_LUA)
+    assert len(client.calls) == 1
+    prompt = client.calls[0]["contents"][0].parts[0].text
+    assert "Fix lines 1-6" in prompt and VALID_LUA not in prompt
+
+
+def test_repair_response_leaves_valid_responses_alone():
+    client = FakeClient(response_text="unused")
+    valid = RESPONSE.replace(BROKEN_LUA, FIXED_LUA)
+    assert generator.repair_response(client, valid, "DCS World", HOTAS, "F-16C",
+                                     notify=lambda level, message: None) == valid
+    assert client.calls == []
+
+
+def test_failed_repair_is_kept_out_of_the_response_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(response_cache, "ENABLED", True)
+    monkeypatch.setattr(response_cache, "CACHE_DIR", str(tmp_path))
+    notices = []
+    still_broken = FakeClient(response_text=f"```lua\n{BROKEN_LUA}\n```")
+    assert generator.repair_response(still_broken, RESPONSE, "DCS World", HOTAS, "F-16C",
+                                     notify=lambda level, message: notices.append(message)) == RESPONSE
+    assert any("Repair did not fix" in notice for notice in notices)
+    assert list(tmp_path.iterdir()) == []
+    fixed = FakeClient(response_text=f"```lua\n{FIXED_LUA}\n```")
+    assert FIXED_LUA in generator.repair_response(fixed, RESPONSE, "DCS World", HOTAS, "F-16C",
+                                                  notify=lambda level, message: None)
+    assert len(fixed.calls) == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_rejected_assignments_are_reported_through_notify(capsys):
+    notices = []
+    rendered = generator.render_template_file(
+        _template_request(), "blk", '[{"path": "controls/hotkeys/ID_EJECT", "param": "joyButton", "value": "1"}]',
+        notify=lambda level, message: notices.append((level, message)))
+    assert rendered == BLK_TEMPLATE
+    assert notices[-1] == ("caption", "Rejected BLK assignment controls/hotkeys/ID_EJECT/joyButton: "
+                                      "no block 'controls/hotkeys/ID_EJECT' in the template")
+    assert capsys.readouterr().out == ""
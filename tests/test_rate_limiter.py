@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+import generator
+import rate_limiter
+import response_cache
+from fake_client import FakeAPIError, FakeClient
+
+
+class Stop(Exception):
+    pass
+
+
+def test_cancelled_waiter_does_not_block_the_queue():
+    bucket = rate_limiter.TokenBucket(requests_per_minute=600, burst=1)
+    bucket.acquire()
+    # The bucket is empty: the next caller waits, and unwinds from on_wait like a stopped Streamlit script.
+
+    def stop(position, wait):
+        raise Stop()
+
+    try:
+        bucket.acquire(on_wait=stop)
+    except Stop:
+        pass
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (bucket.acquire(), done.set()), daemon=True)
+    thread.start()
+    assert done.wait(timeout=2.0)
+    assert bucket.queue_length() == 0
+
+
+def test_cancelled_waiter_behind_another_is_skipped():
+    bucket = rate_limiter.TokenBucket(requests_per_minute=300, burst=1)
+    bucket.acquire()
+    first_waiting = threading.Event()
+    order = []
+
+    def first():
+        bucket.acquire(on_wait=lambda position, wait: first_waiting.set())
+        order.append("first")
+
+    threading.Thread(target=first, daemon=True).start()
+    assert first_waiting.wait(timeout=2.0)
+
+    def stop(position, wait):
+        raise Stop()
+
+    try:
+        bucket.acquire(on_wait=stop)
+    except Stop:
+        pass
+    started = time.monotonic()
+    bucket.acquire()
+    order.append("third")
+    assert order == ["first", "third"]
+    assert time.monotonic() - started < 2.0
+
+
+def test_is_retryable_matches_status_codes_and_names_only():
+    assert rate_limiter.is_retryable(Exception("429 RESOURCE_EXHAUSTED. Quota exceeded"))
+    assert rate_limiter.is_retryable(Exception("503 Service Unavailable"))
+    assert rate_limiter.is_retryable(Exception("The model is UNAVAILABLE right now"))
+    assert not rate_limiter.is_retryable(Exception("400 INVALID_ARGUMENT: image 4291 of 5030 is too large"))
+    assert not rate_limiter.is_retryable(ValueError("page 503 could not be parsed"))
+
+
+def test_backoff_delay_stays_within_the_capped_exponential_bound():
+    for attempt in range(10):
+        bound = min(8.0, 0.5 * 2 ** attempt)
+        delays = [rate_limiter.backoff_delay(attempt, base_delay=0.5, max_delay=8.0) for _ in range(200)]
+        assert all(0 <= delay <= bound for delay in delays)
+        # Full jitter: delays spread over the whole range instead of clustering at the bound.
+        assert min(delays) < bound / 4 and max(delays) > bound * 3 / 4
+
+
+def test_call_with_retry_retries_throttled_fake_client_calls():
+    client = FakeClient(response_text="ok", failures=[FakeAPIError(429), FakeAPIError(503, "UNAVAILABLE")])
+    sleeps = []
+    retries = []
+
+    def call():
+        return "".join(chunk.text for chunk in client.models.generate_content_stream(model="m", contents=[]))
+
+    result = rate_limiter.call_with_retry(call, on_retry=lambda attempt, delay, error: retries.append(error.code),
+                                          sleep=sleeps.append)
+    assert result == "ok"
+    assert retries == [429, 503]
+    assert len(client.calls) == 3
+    assert sleeps[0] <= rate_limiter.BASE_DELAY and sleeps[1] <= rate_limiter.BASE_DELAY * 2
+
+
+def test_call_with_retry_gives_up_after_max_attempts():
+    client = FakeClient(failures=[FakeAPIError(429) for _ in range(5)])
+    sleeps = []
+    with pytest.raises(FakeAPIError):
+        rate_limiter.call_with_retry(lambda: client.models.generate_content_stream(model="m", contents=[]),
+                                     max_attempts=3, sleep=sleeps.append)
+    assert len(client.calls) == 3
+    assert len(sleeps) == 2
+    assert len(client.failures) == 2
+
+
+def test_call_with_retry_raises_other_errors_at_once():
+    client = FakeClient(failures=[FakeAPIError(400, "INVALID_ARGUMENT")])
+    sleeps = []
+    with pytest.raises(FakeAPIError):
+        rate_limiter.call_with_retry(lambda: client.models.generate_content_stream(model="m", contents=[]),
+                                     sleep=sleeps.append)
+    assert len(client.calls) == 1
+    assert sleeps == []
+
+
+def test_stream_generation_recovers_from_a_429(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "BASE_DELAY", 0.01)
+    monkeypatch.setattr(response_cache, "ENABLED", False)
+    client = FakeClient(response_text="x" * 500, failures=[FakeAPIError(429)])
+    notices = []
+    text = generator.stream_generation(client, "m", [], None, use_response_cache=False,
+                                       notify=lambda level, message: notices.append(level))
+    assert text == "x" * 500
+    assert notices == ["warning"]
+    assert len(client.calls) == 2
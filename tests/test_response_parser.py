@@ -0,0 +1,55 @@
+import response_parser
+from configs import SIMULATOR_CONFIGS
+from fake_client import synthetic_response
+
+RESPONSE = (synthetic_response("lua", rows=4) + "\nAnd the axis file:\n\n```lua\nlocal axes = {}\nreturn axes\n```\n"
+            "\n### Notes\n| not | the mapping table |\n")
+
+
+def _stream(chunks):
+    parser = response_parser.StreamParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    events.extend(parser.close())
+    return parser, events
+
+
+def _split(text, *positions):
+    bounds = [0, *positions, len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def _one_shot():
+    return response_parser.parse_profile(RESPONSE, "DCS World", "Thrustmaster HOTAS Warthog",
+                                         SIMULATOR_CONFIGS["DCS World"], "F-16C")
+
+
+def test_stream_matches_a_one_shot_parse():
+    parser, events = _stream([RESPONSE])
+    profile = _one_shot()
+    assert [event[1] for event in events if event[0] == "section"] == ["mapping", "installation", "config"]
+    rows = [[cell.strip() for cell in row.strip("|").split("|")]
+            for row in parser.table_rows if not set(row) <= set("|-: ")]
+    assert rows == [profile["mapping_header"], *profile["mapping_rows"]]
+    assert [(file["lang"], file["code"]) for file in parser.files] == \
+        [(file["lang"], file["code"]) for file in profile["files"]]
+    assert all(file["complete"] for file in parser.files)
+
+
+def test_chunk_boundaries_do_not_change_the_events():
+    _, expected = _stream([RESPONSE])
+    fence = RESPONSE.index("```lua")
+    row = RESPONSE.index("| Button 2")
+    for positions in [(fence + 1,), (fence + 2, fence + 4), (row + 5,), (row + 1, row + 2, fence + 3)]:
+        assert _stream(_split(RESPONSE, *positions))[1] == expected, positions
+    # Every single split point, and a character at a time.
+    for position in range(1, len(RESPONSE)):
+        assert _stream(_split(RESPONSE, position))[1] == expected, position
+    assert _stream(list(RESPONSE))[1] == expected
+
+
+def test_unterminated_fence_is_flushed_as_incomplete():
+    parser, events = _stream(["### Part 3: COMPLETE Configuration Files\n```lua\nlocal t = {\n", "  a = 1"])
+    assert events[-1] == ("file", {"index": 0, "lang": "lua", "code": "local t = {\n  a = 1", "complete": False})
+    assert parser.files == [events[-1][1]]
@@ -0,0 +1,83 @@
+import pytest
+
+import template_renderer
+
+TEMPLATE = """// Warthog preset
+controls{
+  hotkeys{
+    ID_FIRE_MGUNS{ joyButton:i=0 }
+    ID_FIRE_MGUNS{ joyButton:i=0 }
+    ID_GEAR{}
+    ID_FLAPS{
+      joyButton:i=0
+    }
+  }
+  axes{
+    elevator{ axisId:i=1; inverse:b=no }
+  }
+}
+"""
+
+
+def test_parse_blk_numbers_repeated_siblings():
+    tree = template_renderer.parse_blk(TEMPLATE)
+    paths = [block["path"] for block in template_renderer.iter_blocks(tree)]
+    assert paths == ["controls", "controls/hotkeys", "controls/hotkeys/ID_FIRE_MGUNS",
+                     "controls/hotkeys/ID_FIRE_MGUNS#2", "controls/hotkeys/ID_GEAR", "controls/hotkeys/ID_FLAPS",
+                     "controls/axes", "controls/axes/elevator"]
+
+
+def test_parse_blk_reports_unclosed_and_unbalanced_blocks():
+    with pytest.raises(template_renderer.TemplateError, match="Unclosed block 'controls/hotkeys'"):
+        template_renderer.parse_blk("controls{\n  hotkeys{\n")
+    with pytest.raises(template_renderer.TemplateError, match="Unbalanced"):
+        template_renderer.parse_blk("controls{\n}\n}\n")
+
+
+def test_describe_slots_lists_every_bindable_block():
+    listing = template_renderer.describe_slots(template_renderer.parse_blk(TEMPLATE))
+    assert "controls/hotkeys/ID_FIRE_MGUNS { joyButton:i=0 }" in listing
+    assert "controls/hotkeys/ID_FIRE_MGUNS#2 { joyButton:i=0 }" in listing
+    assert "controls/hotkeys/ID_GEAR { }" in listing
+    assert "controls/hotkeys {" not in listing
+    assert listing.endswith("Parameters: axisId:i, inverse:b, joyButton:i")
+
+
+def test_render_rewrites_values_and_inserts_parameters():
+    tree = template_renderer.parse_blk(TEMPLATE)
+    rendered, rejected = template_renderer.render(TEMPLATE, tree, [
+        {"path": "controls/hotkeys/ID_FIRE_MGUNS#2", "param": "joyButton", "value": "4"},
+        {"path": "controls/hotkeys/ID_FIRE_MGUNS", "param": "joyButton", "value": "3"},
+        {"path": "controls/hotkeys/ID_GEAR", "param": "joyButton", "value": "7"},
+        {"path": "controls/hotkeys/ID_FLAPS", "param": "axisId", "value": "2"},
+        {"path": "/controls/axes/elevator/", "param": "inverse", "value": "true"},
+        {"path": "controls/axes/elevator", "param": "joyButton", "value": "9"},
+    ])
+    assert rejected == []
+    assert "ID_FIRE_MGUNS{ joyButton:i=3 }\n    ID_FIRE_MGUNS{ joyButton:i=4 }" in rendered
+    assert "ID_GEAR{\n      joyButton:i=7\n    }" in rendered
+    assert "ID_FLAPS{\n      joyButton:i=0\n      axisId:i=2\n    }" in rendered
+    assert "elevator{ axisId:i=1; inverse:b=yes joyButton:i=9 }" in rendered
+    assert rendered.startswith("// Warthog preset\n")
+    template_renderer.parse_blk(rendered)
+
+
+def test_render_rejects_assignments_that_do_not_fit():
+    tree = template_renderer.parse_blk(TEMPLATE)
+    assignments = [
+        {"path": "controls/hotkeys/ID_EJECT", "param": "joyButton", "value": "1"},
+        {"path": "controls/hotkeys/ID_GEAR", "param": "keyCode", "value": "1"},
+        {"path": "controls/hotkeys/ID_GEAR", "param": "joyButton", "value": "one"},
+    ]
+    rendered, rejected = template_renderer.render(TEMPLATE, tree, assignments)
+    assert rendered == TEMPLATE
+    assert [assignment for assignment, _ in rejected] == assignments
+
+
+def test_parse_assignment_block_reads_lists_and_declared_files():
+    assert template_renderer.parse_assignment_block('[{"path": "a", "param": "b", "value": "1"}]') == \
+        (None, [{"path": "a", "param": "b", "value": "1"}])
+    assert template_renderer.parse_assignment_block('{"file": ".BLK", "assignments": []}') == ("blk", [])
+    for text in ('{"example": true}', '[{"name": "not an assignment"}]', '"text"', "not json"):
+        with pytest.raises(ValueError):
+            template_renderer.parse_assignment_block(text)
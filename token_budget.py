@@ -0,0 +1,52 @@
+import os
+
+# Gemini averages roughly four characters of English per token; each inline image costs a fixed 258 tokens
+# at the 800px thumbnail size used by extraction.
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258
+# Instruction text around the variable sections of the generate_adaptive_config prompt.
+INSTRUCTION_TOKENS = 1500
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get("GAMECHANGER_PROMPT_TOKEN_BUDGET", "24000"))
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def tokens_to_chars(tokens):
+    return tokens * CHARS_PER_TOKEN
+
+
+def section(name, tokens, priority, min_tokens=0):
+    """A prompt section asking for `tokens`; lower priority numbers are served first."""
+    return {"name": name, "tokens": tokens, "priority": priority, "min_tokens": min(min_tokens, tokens)}
+
+
+def plan(sections, total_budget=None):
+    """Split total_budget across sections.
+
+    Every section first receives its minimum (in priority order, while budget remains), then the
+    rest of the budget tops sections up to their full request in priority order.
+    """
+    total_budget = PROMPT_TOKEN_BUDGET if total_budget is None else total_budget
+    ordered = sorted(sections, key=lambda s: s["priority"])
+    allocation = {s["name"]: 0 for s in ordered}
+    remaining = total_budget
+    for s in ordered:
+        grant = min(s["min_tokens"], remaining)
+        allocation[s["name"]] += grant
+        remaining -= grant
+    for s in ordered:
+        grant = min(s["tokens"] - allocation[s["name"]], remaining)
+        allocation[s["name"]] += grant
+        remaining -= grant
+    return allocation
+
+
+def format_allocation(sections, allocation, total_budget=None):
+    total_budget = PROMPT_TOKEN_BUDGET if total_budget is None else total_budget
+    parts = [f"{s['name']} {allocation[s['name']]}/{s['tokens']}" for s in sorted(sections, key=lambda s: s["priority"])]
+    return f"Prompt token plan ({sum(allocation.values())}/{total_budget}): " + ", ".join(parts)
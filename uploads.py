@@ -0,0 +1,75 @@
+"""Spool uploaded files to per-session temporary files, so PDFs are opened by path instead of as bytes.
+
+Each browser session gets its own directory under UPLOAD_DIR. A spooled file is removed as soon as its
+extraction finishes, and sweep() removes directories left by sessions that ended more than
+STALE_SECONDS ago (Streamlit gives no hook when a session closes).
+"""
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+UPLOAD_DIR = os.environ.get("GAMECHANGER_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "gamechanger-uploads"))
+STALE_SECONDS = 6 * 3600
+CHUNK_SIZE = 1024 * 1024
+
+
+def session_dir():
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix="session-", dir=UPLOAD_DIR)
+
+
+def spool(uploaded_file, directory, suffix=".pdf", digest=None):
+    """Copy an upload to a file in directory in fixed-size chunks; returns the path.
+
+    A hashlib object passed as digest is updated with the contents on the way, so the file is hashed
+    without a second read.
+    """
+    os.makedirs(directory, exist_ok=True)
+    # Marks the session as alive for sweep().
+    os.utime(directory)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    uploaded_file.seek(0)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: uploaded_file.read(CHUNK_SIZE), b""):
+                if digest is not None:
+                    digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    finally:
+        uploaded_file.seek(0)
+    return path
+
+
+@contextmanager
+def spooled(uploaded_file, directory, suffix=".pdf"):
+    path = spool(uploaded_file, directory, suffix)
+    try:
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def clear_session(directory):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def sweep(max_age=STALE_SECONDS):
+    """Remove session directories that have not been used for max_age seconds."""
+    if not os.path.isdir(UPLOAD_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(UPLOAD_DIR):
+        path = os.path.join(UPLOAD_DIR, name)
+        try:
+            if name.startswith("session-") and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue